@@ -1,7 +1,9 @@
 import streamlit as st
 from src.auth import auth_guard
+from src.memory import share_column_buffers
 
 auth_guard()
+share_column_buffers()
 # PAGE CONFIG
 st.set_page_config(page_title="Finance Visualizer & Summarizer", layout="wide")
 
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# Seeded generator of messy finance tables for the benchmarks
+# Columns look like a raw export: dates in mixed formats, currency strings ("$1,234.50", "$-"), percentages,
+# duration phrases, yes/no flags, categories and free text, with NaNs, outliers and duplicate rows mixed in.
+# The same (rows, width, seed) always gives the same table
+
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%b %Y"]
+TENURES = ["less than 1 year", "1-3 years", "3-5 years", "more than 5 years"]
+CATEGORIES = ["Rent", "Payroll", "Travel", "Software", "Utilities", "Marketing", "Tax", "Misc"]
+WORDS = ["invoice", "payment", "refund", "transfer", "vendor", "client", "monthly", "quarterly", "fee", "adjustment"]
+
+BASE_COLUMNS = 9
+NAN_FRACTION = 0.03
+OUTLIER_FRACTION = 0.005
+DUPLICATE_FRACTION = 0.01
+
+
+def _with_nans(values, rng, fraction=NAN_FRACTION):
+    values = pd.Series(values, dtype=object)
+    values[rng.random(len(values)) < fraction] = np.nan
+    return values
+
+
+def _dates(rng, rows, fmt):
+    days = rng.integers(0, 5 * 365, rows)
+    dates = pd.Timestamp("2019-01-01") + pd.to_timedelta(days, unit="D")
+    text = pd.Series(dates.strftime(fmt), dtype=object)
+    # A few rows in another format, like hand-edited exports
+    other = rng.random(rows) < 0.02
+    text[other] = pd.Series(dates[other].strftime(DATE_FORMATS[(DATE_FORMATS.index(fmt) + 1) % len(DATE_FORMATS)]),
+                            index=np.flatnonzero(other))
+    return text
+
+
+def _currency(rng, rows):
+    amounts = np.round(rng.lognormal(7, 1.2, rows), 2)
+    # Outliers: a few amounts off by orders of magnitude
+    outliers = rng.random(rows) < OUTLIER_FRACTION
+    amounts[outliers] *= rng.choice([100, 1000], outliers.sum())
+    amounts[rng.random(rows) < 0.1] *= -1
+    text = pd.Series(amounts).map("${:,.2f}".format).str.replace("$-", "-$", regex=False)
+    text[rng.random(rows) < 0.02] = "$-"
+    return text
+
+
+def _percent(rng, rows):
+    return pd.Series(np.round(rng.normal(5, 2, rows), 2)).astype(str) + "%"
+
+
+def _numbers(rng, rows):
+    values = rng.normal(100, 15, rows)
+    outliers = rng.random(rows) < OUTLIER_FRACTION
+    values[outliers] = rng.normal(100, 15, outliers.sum()) * 50
+    values[rng.random(rows) < NAN_FRACTION] = np.nan
+    return values
+
+
+# Free text with a letters-only reference, so memos stay (mostly) unique text instead of looking numeric
+def _memo(rng, rows):
+    picks = rng.integers(0, len(WORDS), (rows, 3))
+    words = np.asarray(WORDS, dtype=object)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"), dtype=object)
+    reference = letters[rng.integers(0, 26, rows)]
+    for _ in range(5):
+        reference = reference + letters[rng.integers(0, 26, rows)]
+    return pd.Series(words[picks[:, 0]] + " " + words[picks[:, 1]] + " " + words[picks[:, 2]] + " ref " + reference)
+
+
+# Column number i (0-based) of the generated table - the first BASE_COLUMNS cover every kind once,
+# wider tables repeat them with a suffix
+def _column(rng, rows, i):
+    kind = i % BASE_COLUMNS
+    suffix = "" if i < BASE_COLUMNS else f"_{i // BASE_COLUMNS}"
+    if kind == 0:
+        return "Txn Date" + suffix, _with_nans(_dates(rng, rows, DATE_FORMATS[(i // BASE_COLUMNS) % len(DATE_FORMATS)]), rng)
+    if kind == 1:
+        return "Amount" + suffix, _with_nans(_currency(rng, rows), rng)
+    if kind == 2:
+        return "Interest Rate" + suffix, _with_nans(_percent(rng, rows), rng)
+    if kind == 3:
+        return "Tenure" + suffix, _with_nans(rng.choice(TENURES, rows), rng)
+    if kind == 4:
+        # Yes/No flags are complete - a missing value would make them categorical
+        return "Approved" + suffix, pd.Series(rng.choice(["Yes", "No"], rows), dtype=object)
+    if kind == 5:
+        return "Category" + suffix, _with_nans(rng.choice(CATEGORIES, rows), rng)
+    if kind == 6:
+        return "Quantity" + suffix, _numbers(rng, rows)
+    if kind == 7:
+        return "Memo" + suffix, _with_nans(_memo(rng, rows), rng)
+    return "Mostly Empty" + suffix, _with_nans(rng.normal(0, 1, rows), rng, fraction=0.8)
+
+
+# Raw table with `rows` rows (duplicates included) and `width` columns (default: one of each kind)
+def generate_finance_table(rows, width=BASE_COLUMNS, seed=0):
+    rng = np.random.default_rng(seed)
+    unique_rows = rows - int(rows * DUPLICATE_FRACTION)
+    df = pd.DataFrame(dict(_column(rng, unique_rows, i) for i in range(width)))
+
+    duplicates = df.iloc[rng.integers(0, unique_rows, rows - unique_rows)]
+    df = pd.concat([df, duplicates], ignore_index=True)
+    return df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+
+# The table as CSV bytes, the way an upload reaches preprocess()
+def generate_finance_csv(rows, width=BASE_COLUMNS, seed=0):
+    return generate_finance_table(rows, width, seed).to_csv(index=False).encode()
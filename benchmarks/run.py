@@ -0,0 +1,207 @@
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import BASE_COLUMNS, generate_finance_csv
+from src.diff import highlight_cleaned_changes
+from src.figure_cache import FigureCache
+from src.instrument import StageRecorder
+from src.memory import share_column_buffers
+from src.plots import build_figure
+from src.preprocess import (
+    load_dataframe,
+    drop_sparse_columns,
+    profile_columns,
+    apply_datetime_profiles,
+    drop_duplicate_rows,
+    safe_parse_datetime_column,
+    convert_erroneous_numeric_columns,
+    detect_column_types,
+    fill_nan_cells,
+    iqr_outliers,
+    remove_outliers_iqr,
+    compact_dtypes,
+    clear_datetime_formats,
+)
+
+# Benchmark of every preprocessing stage and plot type on generated finance tables
+# Each stage runs once through the app's StageRecorder, timed and - unless --no-memory - traced for its peak memory in
+# the same run (tracing slows the stages down, use --no-memory for clean timings). Stages run once: running them again
+# would see the caches their first run filled, so every case starts with cold module caches.
+# Results are written as JSON + CSV to benchmarks/results/ so runs can be compared.
+#
+#   python -m benchmarks.run --rows 10000 100000 --width 9 40
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_ROWS = [10_000, 100_000]
+PLOT_COLORS = ["#636EFA", "#EF553B", "#00CC96", "#AB63FA"]
+
+
+class NamedBytes(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+# Plot specs covering every builder / plot type for the generated columns
+def plot_specs(column_types):
+    numeric = [col for col, kind in column_types.items() if kind == "numeric"]
+    categorical = [col for col, kind in column_types.items() if kind == "categorical"]
+    boolean = [col for col, kind in column_types.items() if kind == "boolean"]
+    dates = [col for col, kind in column_types.items() if kind == "datetime"]
+    text = [col for col, kind in column_types.items() if kind == "text"]
+
+    specs = []
+    if numeric:
+        pair = numeric[:2] if len(numeric) > 1 else numeric * 2
+        specs += [
+            {"type": "numeric", "plot": "Histogram", "columns": numeric[:1]},
+            {"type": "numeric", "plot": "Box Plot", "columns": numeric[:3]},
+            {"type": "numeric", "plot": "Line Plot", "columns": numeric[:2]},
+            {"type": "numeric", "plot": "Scatter Plot", "columns": pair},
+            {"type": "numeric", "plot": "Correlation Heatmap", "columns": numeric},
+            {"type": "numeric", "plot": "Pair Plot", "columns": numeric[:3]},
+            {"type": "numeric", "plot": "Area Plot", "columns": numeric[:2]},
+        ]
+    for col in categorical[:1]:
+        specs += [{"type": "categorical", "column": col, "plot": plot, "value_col": numeric[0] if numeric else None}
+                  for plot in ["Bar Plot", "Pie Chart", "Treemap"] if plot != "Treemap" or numeric]
+    specs += [{"type": "boolean", "column": col} for col in boolean[:1]]
+    for col in dates[:1]:
+        specs += [{"type": "datetime", "column": col, "freq": "ME", "agg": "count"}]
+        if numeric:
+            specs += [{"type": "datetime", "column": col, "freq": "ME", "agg": agg, "value_col": numeric[0]}
+                      for agg in ["sum", "mean", "std"]]
+    if len(categorical) > 1:
+        specs.append({"type": "cat_heatmap", "row": categorical[0], "col": categorical[1]})
+    specs += [{"type": "text", "column": col, "top_n": 20} for col in text[:1]]
+    return specs
+
+
+def _plot_name(spec):
+    detail = spec.get("plot") or spec.get("agg") or ""
+    return f"plot:{spec['type']}:{detail}".rstrip(":")
+
+
+# Every stage of preprocess() in order, then the change highlight and each plot type
+def run_case(rows, width, seed=0, memory=True):
+    data = generate_finance_csv(rows, width, seed)
+    # Formats remembered by an earlier case would let this one skip datetime detection
+    clear_datetime_formats()
+    recorder = StageRecorder(trace_memory=memory, structured_logs=False)
+    _run_stages(data, recorder)
+
+    records = recorder.records
+    for record in records:
+        record.update(rows=rows, width=width, seed=seed)
+    return records
+
+
+def _run_stages(data, recorder):
+    step = recorder.run
+
+    df = step("load_dataframe", lambda: load_dataframe(NamedBytes(data, "benchmark.csv")))
+    raw_df = df.copy()
+
+    df, _ = step("drop_sparse_columns", lambda: drop_sparse_columns(df), df)
+
+    # Datetime parsing on its own, for every text column (the way profiling tries it first)
+    text_cols = [col for col in df.columns if df[col].dtype == "object"]
+    step("safe_parse_datetime_column",
+         lambda: [safe_parse_datetime_column(df[col], None) for col in text_cols], df[text_cols])
+
+    profiles = step("profile_columns", lambda: profile_columns(df), df)
+    df = step("apply_datetime_profiles", lambda: apply_datetime_profiles(df.copy(), profiles), df)
+    df, _ = step("drop_duplicate_rows", lambda: drop_duplicate_rows(df), df)
+    df = step("convert_erroneous_numeric_columns",
+              lambda: convert_erroneous_numeric_columns(df, threshold=0.7, profiles=profiles), df)
+    column_types, df = step("detect_column_types", lambda: detect_column_types(df, profiles=profiles), df)
+    df, _ = step("fill_nan_cells", lambda: fill_nan_cells(df, column_types), df)
+    step("iqr_outliers_independent", lambda: iqr_outliers(df, column_types, "independent"), df)
+    df, _ = step("remove_outliers_iqr", lambda: remove_outliers_iqr(df, column_types), df)
+    df = step("compact_dtypes", lambda: compact_dtypes(df, column_types), df)
+
+    step("highlight_cleaned_changes", lambda: highlight_cleaned_changes(raw_df, df), df)
+
+    # Plots are built with a fresh per-dataset cache, like the first render of the visualization page
+    for spec in plot_specs(column_types):
+        step(_plot_name(spec), lambda: build_figure(df, spec, PLOT_COLORS, derived=FigureCache()), df)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# Writes <name>.json (environment + records) and <name>.csv (one row per stage), returns both paths
+def write_results(records, env, results_dir=RESULTS_DIR, name=None):
+    os.makedirs(results_dir, exist_ok=True)
+    name = name or "benchmark-" + env["timestamp"].replace(":", "").replace("+0000", "Z")
+    json_path = os.path.join(results_dir, name + ".json")
+    csv_path = os.path.join(results_dir, name + ".csv")
+
+    with open(json_path, "w") as f:
+        json.dump({"environment": env, "results": records}, f, indent=2)
+
+    fields = ["rows", "width", "seed", "stage", "seconds", "peak_traced_mb", "rss_high_water_growth_mb",
+              "rows_in", "cols_in", "rows_out", "cols_out"]
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(records)
+    return json_path, csv_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing stages and plot builders.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS,
+                        help="table sizes to run, e.g. 10000 100000 1000000 10000000")
+    parser.add_argument("--width", type=int, nargs="+", default=[BASE_COLUMNS], help="column counts to run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="don't trace memory (faster, timings without tracing overhead)")
+    parser.add_argument("--output", default=RESULTS_DIR, help="directory for the JSON / CSV results")
+    parser.add_argument("--name", help="file name (without extension) for the results")
+    args = parser.parse_args(argv)
+
+    share_column_buffers()
+    records = []
+    for width in args.width:
+        for rows in args.rows:
+            case = run_case(rows, width, args.seed, memory=not args.no_memory)
+            records += case
+            total = sum(record["seconds"] for record in case)
+            print(f"{rows:>12,} rows × {width:>3} cols  {total:8.2f}s")
+            for record in sorted(case, key=lambda record: -record["seconds"])[:5]:
+                peak = f"{record['peak_traced_mb']:9.1f} MB" if record["peak_traced_mb"] is not None else ""
+                print(f"    {record['stage']:<40} {record['seconds']:8.3f}s {peak}")
+
+    json_path, csv_path = write_results(records, environment(), args.output, args.name)
+    print(f"Results written to {json_path} and {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
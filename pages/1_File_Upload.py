@@ -1,36 +1,126 @@
 import streamlit as st
 import pandas as pd
-from src.preprocess import preprocess
+from src.cache import file_hash
+from src.columnar import COLUMNAR_EXTENSIONS
+from src.batch import BatchPipeline
+from src.excel import is_excel, sheet_names
+from src.memory import enforce_memory_budget, share_column_buffers
+from src.pipeline import PreprocessPipeline
+from src.streaming import choose_chunksize
 from src.auth import auth_guard
 
 st.set_page_config(page_title="Overview of Finance Analyzer & Visualiser", layout="wide")
 
 auth_guard()
+share_column_buffers()
 
 st.title(f"🔸Upload File to Clean")
 st.markdown("---")
  
  
-# File uploader that takes csv/xlsx as input 
-uploaded_file = st.file_uploader(
-    " Upload a .csv or .xlsx file here:",
-    type=["csv", "xlsx"],
-    accept_multiple_files=False
+# Batch mode combines several files (e.g. monthly statements) into one dataset
+batch_mode = st.toggle("Batch mode (combine several files)", key="batch_mode")
+
+# File uploader that takes csv/excel/parquet/feather as input 
+uploaded = st.file_uploader(
+    " Upload a .csv, Excel (.xlsx, .xlsm, .xlsb, .xls), .parquet or .feather file here:",
+    type=["csv", "xlsx", "xlsm", "xlsb", "xls"] + [ext.lstrip(".") for ext in COLUMNAR_EXTENSIONS],
+    accept_multiple_files=batch_mode
 )
 
+
+def upload_key(file):
+    return getattr(file, "file_id", None) or (file.name, file.size)
+
+
+# Content hash of an upload - hashed once per uploaded file, not on every rerun
+def upload_hash(file):
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    key = upload_key(file)
+    if key not in hashes:
+        hashes[key] = file_hash(file)
+    return hashes[key]
+
+
+# One pipeline per file content - kept across reruns so adding a file doesn't reprocess the others
+def file_pipeline(file, sheets=None):
+    pipelines = st.session_state.setdefault("file_pipelines", {})
+    content_hash = upload_hash(file)
+    key = (content_hash, tuple(sheets) if sheets else None)
+    if key not in pipelines:
+        # Very large CSVs are cleaned chunk by chunk to keep memory bounded
+        pipelines[key] = PreprocessPipeline(file, chunksize=choose_chunksize(file), sheets=sheets,
+                                            content_hash=content_hash)
+    return pipelines[key]
+
+
 # Call preprocess function and store returned values
-if uploaded_file:
+if uploaded:
+    # Files no longer in the uploader don't need their hashes
+    current = {upload_key(file) for file in (uploaded if batch_mode else [uploaded])}
+    st.session_state["upload_hashes"] = {key: value for key, value in st.session_state.get("upload_hashes", {}).items()
+                                         if key in current}
     try:
-        raw_df, clean_df, column_types, logs = preprocess(uploaded_file)
+        if batch_mode:
+            # Every file is cleaned on its own (concurrently), then the results are stacked
+            batch = BatchPipeline([file_pipeline(file) for file in uploaded], [file.name for file in uploaded])
+            # The same files keep the same batch, so reruns get back the combined result they already built
+            pipeline = st.session_state.get("pipeline")
+            if not isinstance(pipeline, BatchPipeline) or pipeline.key != batch.key:
+                pipeline = batch
+            # Files removed from the uploader don't need their pipelines any more
+            keep = {file_pipeline.content_hash for file_pipeline in pipeline.pipelines}
+            st.session_state["file_pipelines"] = {
+                key: value for key, value in st.session_state["file_pipelines"].items() if key[0] in keep
+            }
+        else:
+            uploaded_file = uploaded
+
+            # Workbooks: pick the sheets to clean, several sheets are combined into one dataset
+            sheets = None
+            if is_excel(uploaded_file.name):
+                available = sheet_names(uploaded_file)
+                sheets = st.multiselect("Sheets", available, default=available[:1], key="sheets")
+                if not sheets:
+                    st.warning("⚠️ Select at least one sheet.")
+                    st.stop()
+
+            # Keep one pipeline per uploaded file (and sheet selection) so later option changes reuse its stages
+            pipeline = st.session_state.get("pipeline")
+            content_hash = upload_hash(uploaded_file)
+            if (not isinstance(pipeline, PreprocessPipeline) or pipeline.content_hash != content_hash
+                    or pipeline.sheets != (sheets or None)):
+                # Very large CSVs are cleaned chunk by chunk to keep memory bounded
+                pipeline = PreprocessPipeline(uploaded_file, chunksize=choose_chunksize(uploaded_file), sheets=sheets,
+                                              content_hash=content_hash)
+
+        # Arrow-backed dtypes use less memory and are written to Parquet without conversion
+        arrow_dtypes = st.checkbox("Use Arrow-backed dtypes for the clean data", key="arrow_dtypes")
+
+        remove_outliers = st.session_state.get("remove_outliers", True)
+        raw_df, clean_df, column_types, logs = pipeline.result(remove_outliers=remove_outliers,
+                                                               arrow_dtypes=arrow_dtypes,
+                                                               outlier_method=st.session_state.get("outlier_method",
+                                                                                                   "sequential"),
+                                                               approximate_quantiles=st.session_state.get(
+                                                                   "approximate_quantiles", False))
+        # Over the session's memory budget the raw frame is kept on disk - a prepared Parquet export counts too
+        export = st.session_state.get("clean_parquet")
+        raw_df = enforce_memory_budget(pipeline, raw_df, clean_df, extra_bytes=len(export[1]) if export else 0)
 
         # Save everything in session state
-        st.session_state["uploaded_file"] = uploaded_file  # ✅ Needed for reprocessing
+        st.session_state["pipeline"] = pipeline  # ✅ Needed for reprocessing
         st.session_state["raw_df"] = raw_df
         st.session_state["clean_df"] = clean_df
         st.session_state["column_types"] = column_types
         st.session_state["logs"] = logs  # ✅ Needed for log display
 
-        st.success("✅ File processed successfully!")
+        if logs.get("type_conflicts"):
+            conflicts = ", ".join(f"{col} → {conflict['resolved']}" for col, conflict in logs["type_conflicts"].items())
+            st.warning(f"⚠️ Files disagree on column types, converted: {conflicts}")
+
+        st.success(f"✅ {len(uploaded)} files processed successfully!" if batch_mode
+                   else "✅ File processed successfully!")
 
     except Exception as e:
         st.error(f"❌ Error: {e}")
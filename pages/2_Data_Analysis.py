@@ -1,14 +1,17 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from src.auth import auth_guard
-from src.preprocess import preprocess
-
-pd.set_option("styler.render.max_elements", 300000)
-
+from src.columnar import parquet_bytes
+from src.diff import compute_change_mask, highlight_cleaned_changes, surviving_rows
+from src.memory import SpilledFrame, enforce_memory_budget, materialize, share_column_buffers
+from src.preprocess import OUTLIER_METHODS
 
 st.set_page_config(page_title="Data Analyser", layout="wide")
 
 auth_guard()
+share_column_buffers()
 
 st.title("📄Data Analysis")
 
@@ -25,18 +28,34 @@ if "remove_outliers" not in st.session_state:
 
 remove_outliers = st.checkbox("Remove Outliers?", value=st.session_state["remove_outliers"])
 
-
-# Reprocess if uploaded file is available and outlier checkbox state has changed
-if "uploaded_file" in st.session_state:
-    uploaded_file = st.session_state["uploaded_file"]
-    
-    # Ensure the stream is rewound before re-reading
-    uploaded_file.seek(0)
-
-    # Compare if outlier option has changed since last run
-    if remove_outliers != st.session_state.get("remove_outliers", True):
-        # Reprocess the file with updated outlier setting
-        raw_df, clean_df, column_types, logs = preprocess(uploaded_file, remove_outliers=remove_outliers)
+# Sequential: each column's quartiles come from the rows earlier columns kept, independent: from all rows
+outlier_method = st.session_state.get("outlier_method", "sequential")
+if remove_outliers:
+    outlier_method = st.radio("Outlier bounds", OUTLIER_METHODS, index=OUTLIER_METHODS.index(outlier_method),
+                              horizontal=True, format_func=str.capitalize,
+                              help="Sequential filters columns one after another, independent bounds every column on all rows")
+approximate_quantiles = remove_outliers and st.checkbox(
+    "Approximate quartiles", value=st.session_state.get("approximate_quantiles", False),
+    help="Quartiles from a sample of rows - faster on very large files, bounds may differ slightly"
+)
+
+
+# Reprocess if the upload's pipeline is available and outlier checkbox state has changed
+if "pipeline" in st.session_state:
+    pipeline = st.session_state["pipeline"]
+
+    # Compare if outlier options have changed since last run
+    if (remove_outliers != st.session_state.get("remove_outliers", True)
+            or outlier_method != st.session_state.get("outlier_method", "sequential")
+            or approximate_quantiles != st.session_state.get("approximate_quantiles", False)):
+        # Only the outlier mask is (re)applied - earlier stages are reused by the pipeline
+        raw_df, clean_df, column_types, logs = pipeline.result(remove_outliers=remove_outliers,
+                                                               arrow_dtypes=st.session_state.get("arrow_dtypes", False),
+                                                               outlier_method=outlier_method,
+                                                               approximate_quantiles=approximate_quantiles)
+        # An export prepared for the previous clean frame is stale now
+        st.session_state.pop("clean_parquet", None)
+        raw_df = enforce_memory_budget(pipeline, raw_df, clean_df)
 
         # Update session state with new results
         st.session_state["raw_df"] = raw_df
@@ -44,6 +63,8 @@ if "uploaded_file" in st.session_state:
         st.session_state["column_types"] = column_types
         st.session_state["logs"] = logs
         st.session_state["remove_outliers"] = remove_outliers
+        st.session_state["outlier_method"] = outlier_method
+        st.session_state["approximate_quantiles"] = approximate_quantiles
         
     else:
         # Use existing cached values
@@ -53,7 +74,7 @@ if "uploaded_file" in st.session_state:
         logs = st.session_state.get("logs", {})
         
 else:
-    # Fallback if no uploaded_file exists
+    # Fallback if no pipeline exists
     raw_df = st.session_state["raw_df"]
     clean_df = st.session_state["clean_df"]
     column_types = st.session_state["column_types"]
@@ -65,35 +86,44 @@ with st.expander("Detected Column Types : "):
         st.write(f"**{col}** → `{ctype}`")
 
 
-# Function to highlight changes in clean dataframe
-def highlight_cleaned_changes(raw, cleaned):
-    def style_func(val_raw, val_clean):
-        if pd.isna(val_raw) and pd.isna(val_clean):
-            return ""
-        elif val_raw != val_clean:
-            return "background-color: #ffcccc"  # light red
-        return ""
+st.markdown("---")
 
-    styles = pd.DataFrame("", index=cleaned.index, columns=cleaned.columns)
-    for col in cleaned.columns:
-        for i in cleaned.index:
-            styles.loc[i, col] = style_func(raw.loc[i, col], cleaned.loc[i, col])
+# Only one page of rows is sent to the browser - pages run over the raw rows, so rows cleaning dropped (duplicates,
+# outliers) stay visible, and the clean table shows the rows of the same page that were kept
+page_col1, page_col2, page_col3 = st.columns([1, 1, 2])
+with page_col1:
+    page_size = st.selectbox("Rows per page", [50, 100, 250, 500], index=1, key="page_size")
 
-    return cleaned.style.apply(lambda _: styles, axis=None)
+n_pages = max(1, -(-len(raw_df) // page_size))
+if st.session_state.get("page_number", 1) > n_pages:
+    st.session_state["page_number"] = n_pages
+with page_col2:
+    page_number = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key="page_number")
 
-st.markdown("---")
+start = (page_number - 1) * page_size
+raw_window = raw_df.take(np.arange(start, min(start + page_size, len(raw_df))))
+clean_window = surviving_rows(clean_df, raw_window.index)
+
+with page_col3:
+    st.caption(f"Showing raw rows {start + 1 if len(raw_window) else 0}–{start + len(raw_window)} "
+               f"of {len(raw_df)}, {len(clean_window)} of them kept ({len(clean_df)} clean rows)")
+    if isinstance(raw_df, SpilledFrame):
+        st.caption("Raw data is kept on disk and read a page at a time")
+
+table_height = min(len(raw_window), 20) * 35 + 38
 
 # 2 columns for raw and clean df
 col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("### Raw Data: ")
-    st.dataframe(raw_df, use_container_width=True)
+    st.dataframe(raw_window, use_container_width=True, height=table_height)
 
 with col2:
     st.markdown("### Clean Data:")
-    styled_clean = highlight_cleaned_changes(raw_df, clean_df)
-    st.dataframe(styled_clean, use_container_width=True)
+    # Changes are only diffed for the rows on screen
+    styled_clean = highlight_cleaned_changes(raw_window, clean_window)
+    st.dataframe(styled_clean, use_container_width=True, height=table_height)
 
 st.markdown("---")
 
@@ -106,6 +136,79 @@ if logs:
     if remove_outliers:
         st.warning(f"> Outliers removed: {logs.get('outliers_removed', 0)}")
 
+    # IQR bounds and rows removed per numeric column
+    if remove_outliers and logs.get("outliers", {}).get("columns"):
+        with st.expander("📏 Outlier bounds per column"):
+            st.dataframe(pd.DataFrame(logs["outliers"]["columns"]).T, use_container_width=True)
+            note = ", quartiles from a sample of rows" if logs["outliers"]["approximate"] else ""
+            st.caption(f"{logs['outliers']['method'].capitalize()} method{note}")
+
+    # Batch uploads: what each file contributed and the columns the files disagreed on
+    if logs.get("files"):
+        with st.expander("📂 Files in this batch"):
+            st.dataframe(pd.DataFrame(logs["files"]).T, use_container_width=True)
+            for col, conflict in logs.get("type_conflicts", {}).items():
+                types = ", ".join(f"{name}: {col_type}" for name, col_type in conflict["types"].items())
+                st.caption(f"{col} ({types}) → {conflict['resolved']}")
+
+    # Time / memory per stage and the columns that took longest to profile
+    if logs.get("stages"):
+        with st.expander("⏱️ Stage timings"):
+            stages_df = pd.DataFrame(logs["stages"]).set_index("stage").dropna(axis=1, how="all")
+            st.dataframe(stages_df, use_container_width=True)
+            st.caption(
+                f"Total: {stages_df['seconds'].sum():.2f}s. peak_traced_mb is the most memory a stage allocated; "
+                "rss_high_water_growth_mb is how far it raised the process's peak memory (0 when an earlier "
+                "stage had already gone higher)."
+            )
+
+            if logs.get("column_costs"):
+                st.markdown("**Slowest columns to profile**")
+                costs = pd.Series(logs["column_costs"], name="seconds").head(10)
+                st.dataframe(costs, use_container_width=True)
+
+    # How each text column of numbers was read (separators, currencies) and how many values didn't parse
+    if logs.get("number_parsing"):
+        with st.expander("🔢 Number formats"):
+            formats_df = pd.DataFrame({
+                col: {
+                    "decimal": stats["format"]["decimal"],
+                    "thousands": stats["format"]["thousands"],
+                    "currency": ", ".join(stats["format"]["currency"]),
+                    **{key: stats[key] for key in ["parsed", "failed", "negative", "percent", "scaled"]},
+                }
+                for col, stats in logs["number_parsing"].items()
+            }).T
+            st.dataframe(formats_df, use_container_width=True)
+
+# Whole-dataset diff is opt-in, computed once per clean_df and reused on reruns
+if st.checkbox("Count changed cells in every column", key="count_changes"):
+    cached_diff = st.session_state.get("change_mask")
+    if cached_diff is None or cached_diff[0] is not clean_df:
+        change_mask, change_counts = compute_change_mask(materialize(raw_df), clean_df)
+        st.session_state["change_mask"] = (clean_df, change_mask, change_counts)
+    else:
+        _, change_mask, change_counts = cached_diff
+
+    changed = change_counts[change_counts > 0]
+    st.info(f"> Changed cells: {int(changed.sum())}")
+    if not changed.empty:
+        st.dataframe(changed.rename("changed_cells"), use_container_width=True)
+
+# Parquet export keeps the detected column types - written only when asked for, and dropped once downloaded
+cached_export = st.session_state.get("clean_parquet")
+if cached_export is not None and cached_export[0] is not clean_df:
+    st.session_state.pop("clean_parquet")
+    cached_export = None
+if cached_export is None and st.button("Prepare Clean Data (.parquet)"):
+    try:
+        cached_export = (clean_df, parquet_bytes(clean_df))
+        st.session_state["clean_parquet"] = cached_export
+    except (pa.ArrowException, ValueError) as e:
+        st.error(f"❌ Couldn't write Parquet: {e}")
+if cached_export is not None and st.download_button("Download Clean Data (.parquet)", cached_export[1],
+                                                    file_name="clean_data.parquet", mime="application/octet-stream"):
+    st.session_state.pop("clean_parquet", None)
 
 st.markdown("---")
 # Links for multiple pages
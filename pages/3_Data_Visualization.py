@@ -1,9 +1,11 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from collections import Counter
 from src.auth import auth_guard
+from src.figure_cache import FigureCache, dataframe_fingerprint
+from src.memory import share_column_buffers
+from src.downsample import POINT_BUDGET
+from src.plots import build_figure
+from src.stats_store import DatasetStats
 
 
 # Theme-aware colors
@@ -12,6 +14,7 @@ PLOTLY_COLORS = px.colors.qualitative.Dark24 if THEME_BASE == "dark" else px.col
 
 st.set_page_config(layout="wide")
 auth_guard()
+share_column_buffers()
 
 st.title("📊 Dynamic Financial Visualizations")
 
@@ -41,6 +44,8 @@ text_cols = [col for col, typ in column_types.items() if typ == "text"]
 
 # Sidebar: Column type selector
 st.sidebar.header("🔧 Plot Controls")
+point_budget = st.sidebar.number_input("Max points per plot", min_value=500, max_value=200000,
+                                       value=POINT_BUDGET, step=500, key="point_budget")
 col_type = st.sidebar.radio("Column Type", ["Numeric", "Categorical", "Boolean", "Datetime", "Text", "Mixed"])
 
 # Plot Controls 
@@ -94,10 +99,10 @@ elif col_type == "Boolean" and boolean_cols:
 elif col_type == "Datetime" and datetime_cols:
     selected_col = st.sidebar.selectbox("Select datetime column", datetime_cols, key="dt_col")
     freq = st.sidebar.selectbox("Resample Frequency", ["D", "W", "ME", "QE", "YE"], index=2, key="dt_freq")
-    agg_method = st.sidebar.selectbox("Aggregation", ["Count", "Sum", "Mean"], key="agg_method")
+    agg_method = st.sidebar.selectbox("Aggregation", ["Count", "Sum", "Mean", "Std"], key="agg_method")
 
     value_col = None
-    if agg_method in ["Sum", "Mean"] and numeric_cols:
+    if agg_method in ["Sum", "Mean", "Std"] and numeric_cols:
         value_col = st.sidebar.selectbox("Numeric Column to Aggregate", numeric_cols, key="value_col")
 
     if st.sidebar.button("➕ Add Plot", key="add_datetime_plot"):
@@ -132,6 +137,25 @@ elif col_type == "Mixed":
         })
 
 # Plot Rendering
+# Figures are cached per plot spec + dataset fingerprint, so reruns only build new plots
+if "figure_cache" not in st.session_state:
+    st.session_state["figure_cache"] = FigureCache()
+figure_cache = st.session_state["figure_cache"]
+
+cached_fingerprint = st.session_state.get("clean_df_fingerprint")
+if cached_fingerprint is None or cached_fingerprint[0] is not df:
+    cached_fingerprint = (df, dataframe_fingerprint(df))
+    st.session_state["clean_df_fingerprint"] = cached_fingerprint
+df_fingerprint = cached_fingerprint[1]
+
+# Intermediate data shared between plots of this dataset (e.g. daily rollups) and its statistics, seeded with the
+# value counts preprocessing kept - both dropped when the data changes
+derived_cache = st.session_state.get("derived_cache")
+if derived_cache is None or derived_cache[0] != df_fingerprint:
+    derived_cache = (df_fingerprint, FigureCache(),
+                     DatasetStats(df, st.session_state.get("logs", {}).get("value_counts", {})))
+    st.session_state["derived_cache"] = derived_cache
+
 left_col, right_col = st.columns(2)
 
 for i, plot_data in enumerate(st.session_state["plots"]):
@@ -139,137 +163,20 @@ for i, plot_data in enumerate(st.session_state["plots"]):
     with col:
         with st.expander(f"🔸 Plot {i+1}", expanded=True):
             try:
-                if plot_data["type"] == "numeric":
-                    cols = plot_data["columns"]
-                    plot = plot_data["plot"]
-
-                    if plot == "Histogram" and len(cols) == 1:
-                        fig = px.histogram(df, x=cols[0], nbins=30, color_discrete_sequence=PLOTLY_COLORS)
-                        st.subheader(f"🔸 Histogram of {cols[0]}")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                    elif plot == "Box Plot":
-                        fig = px.box(df, y=cols, color_discrete_sequence=PLOTLY_COLORS)
-                        st.subheader(f"🔸 Box Plot of {', '.join(cols)}")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                    elif plot == "Line Plot":
-                        melted = df[cols].reset_index().melt(id_vars="index", var_name="Variable", value_name="Value")
-                        fig = px.line(melted, x="index", y="Value", color="Variable",
-                                      color_discrete_sequence=PLOTLY_COLORS)
-                        st.subheader(f"🔸 Line Plot of {', '.join(cols)}")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                    elif plot == "Scatter Plot" and len(cols) == 2:
-                        fig = px.scatter(df, x=cols[0], y=cols[1], color_discrete_sequence=PLOTLY_COLORS)
-                        st.subheader(f"🔸 Scatter Plot: {cols[0]} vs {cols[1]}")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                    elif plot == "Correlation Heatmap":
-                        corr = df[cols].corr()
-                        fig = px.imshow(corr, text_auto=True, color_continuous_scale="RdBu_r")
-                        st.subheader("🔸 Correlation Heatmap")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                    elif plot == "Pair Plot":
-                        fig = px.scatter_matrix(df, dimensions=cols, color_discrete_sequence=PLOTLY_COLORS)
-                        st.subheader("🔸 Pair Plot")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                    elif plot == "Area Plot":
-                        melted = df[cols].reset_index().melt(id_vars="index", var_name="Variable", value_name="Value")
-                        fig = px.area(melted, x="index", y="Value", color="Variable",
-                                      color_discrete_sequence=PLOTLY_COLORS)
-                        st.subheader(f"🔸 Area Plot of {', '.join(cols)}")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                elif plot_data["type"] == "categorical":
-                    colname = plot_data["column"]
-                    plot_type = plot_data.get("plot", "Bar Plot")
-                    value_col = plot_data.get("value_col", None)
-                    counts = df[colname].value_counts().reset_index()
-                    counts.columns = [colname, 'count']
-
-                    if plot_type == "Bar Plot":
-                        fig = px.bar(counts, x=colname, y='count',
-                                     color=colname, color_discrete_sequence=PLOTLY_COLORS)
-                        st.subheader(f"🔸 Bar Plot of {colname}")
-
-                    elif plot_type == "Pie Chart":
-                        fig = px.pie(counts, names=colname, values='count',
-                                     color=colname, color_discrete_sequence=PLOTLY_COLORS, hole=0.4)
-                        st.subheader(f"🔸 Pie Chart of {colname}")
-
-                    elif plot_type == "Treemap" and value_col:
-                        fig = px.treemap(df, path=[colname], values=value_col,
-                                         color=colname, color_discrete_sequence=PLOTLY_COLORS)
-                        st.subheader(f"🔸 Treemap: {colname} by {value_col}")
-
-                    st.plotly_chart(fig, use_container_width=True)
-
-                elif plot_data["type"] == "boolean":
-                    colname = plot_data["column"]
-                    counts = df[colname].value_counts().reset_index()
-                    # Keep 0 and 1 as labels
-                    counts.columns = [colname, 'count']
-                    counts[colname] = counts[colname].astype(str)  # ensure string labels
-                    fig = px.pie(counts, names=colname, values='count',
-                        color=colname, color_discrete_sequence=PLOTLY_COLORS, hole=0.4)
-
-                    st.subheader(f"🔸 Pie Chart of Boolean Column {colname}")
-                    st.plotly_chart(fig, use_container_width=True)
-
-                elif plot_data["type"] == "datetime":
-                    colname = plot_data["column"]
-                    freq = plot_data.get("freq", "ME")
-                    agg = plot_data.get("agg", "count")
-                    value_col = plot_data.get("value_col", None)
-
-                    ts_df = df[[colname]].copy()
-
-                    if agg == "count":
-                        ts_df["__count"] = 1
-                        ts = ts_df.set_index(colname).resample(freq)["__count"].count().reset_index()
-                        y_col = "__count"
-                        title = "Count"
-                    elif agg in ["sum", "mean"] and value_col:
-                        ts_df[value_col] = df[value_col]
-                        resampled = ts_df.set_index(colname).resample(freq)[value_col]
-                        ts = resampled.sum().reset_index() if agg == "sum" else resampled.mean().reset_index()
-                        y_col = value_col
-                        title = f"{agg.title()} of {value_col}"
-                    else:
-                        st.warning("⚠️ Missing value column or invalid aggregation.")
-                        continue
-
-                    fig = px.line(ts, x=colname, y=y_col, markers=True,
-                                  title=f"> Time Series ({freq}) – {title}",
-                                  labels={y_col: title, colname: "Date"},
-                                  color_discrete_sequence=PLOTLY_COLORS)
-                    fig.update_layout(xaxis_title="Date", yaxis_title=title, hovermode="x unified")
-                    st.plotly_chart(fig, use_container_width=True)
-
-                elif plot_data["type"] == "cat_heatmap":
-                    row = plot_data["row"]
-                    col_ = plot_data["col"]
-                    heat_df = pd.crosstab(df[row], df[col_])
-                    fig = px.imshow(heat_df, text_auto=True, color_continuous_scale="Viridis")
-                    st.subheader(f" 🔸Heatmap: {row} × {col_}")
-                    st.plotly_chart(fig, use_container_width=True)
-
-                elif plot_data["type"] == "text":
-                    colname = plot_data["column"]
-                    top_n = plot_data["top_n"]
-                    text_data = df[colname].dropna().astype(str).str.cat(sep=' ')
-                    words = [word.lower() for word in text_data.split()]
-                    word_counts = Counter(words)
-                    most_common = word_counts.most_common(top_n)
-                    freq_df = pd.DataFrame(most_common, columns=['Word', 'Frequency'])
-                    fig = px.bar(freq_df, x='Word', y='Frequency', color='Word',
-                                 color_discrete_sequence=PLOTLY_COLORS)
-                    st.subheader(f"🔸 Word Frequency for {colname}")
-                    st.plotly_chart(fig, use_container_width=True)
-
+                key = FigureCache.key({**plot_data, "point_budget": point_budget}, df_fingerprint)
+                subheader, fig, note = figure_cache.get_or_build(
+                    key, lambda: build_figure(df, plot_data, PLOTLY_COLORS, point_budget, *derived_cache[1:])
+                )
+                if fig is None:
+                    continue
+                if subheader:
+                    st.subheader(subheader)
+                st.plotly_chart(fig, use_container_width=True)
+                if note:
+                    st.caption(note)
+
+            except ValueError as e:
+                st.warning(str(e))
             except Exception as e:
                 st.error(f"⚠️ Error rendering plot: {e}")
 
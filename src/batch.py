@@ -0,0 +1,194 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.columnar import to_arrow_dtypes
+from src.memory import SpilledFrame
+from src.preprocess import compact_dtypes, summarize_value_counts
+from src.workers import MAX_WORKERS
+
+# Batch preprocessing of several uploaded files into one dataset
+# Every file keeps its own PreprocessPipeline (so its stages and disk-cache entries are reused when files are added
+# or options change), the files are processed concurrently and their clean frames are stacked with a source_file
+# column. Columns line up by their normalized names; when files disagree on a column's type the type covering
+# the most rows wins, the column is converted to it and the conflict is reported in logs["type_conflicts"].
+# The combined raw frame is spilled to disk a file (or streamed chunk) at a time, and the combined result is kept
+# until the files or options change
+
+SOURCE_COLUMN = "source_file"
+
+
+# Values that can't be the winning type become missing - numbers aren't read as epoch timestamps, nor dates as
+# nanosecond counts
+def _convert(series, col_type):
+    if col_type == "numeric":
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return pd.Series(np.nan, index=series.index, name=series.name)
+        return pd.to_numeric(series, errors="coerce")
+    if col_type == "datetime":
+        if pd.api.types.is_numeric_dtype(series):
+            return pd.Series(pd.NaT, index=series.index, name=series.name, dtype="datetime64[ns]")
+        return pd.to_datetime(series, errors="coerce")
+    return series.astype(object)
+
+
+# Winning type per column + the conflicts, from each file's (name, rows, column_types)
+def reconcile_column_types(file_types):
+    rows_by_type = {}
+    for _, rows, column_types in file_types:
+        for col, col_type in column_types.items():
+            rows_by_type.setdefault(col, Counter())[col_type] += rows
+
+    resolved, conflicts = {}, {}
+    for col, counts in rows_by_type.items():
+        # most_common keeps first-seen order on ties, so the earliest file decides
+        resolved[col] = counts.most_common(1)[0][0]
+        if len(counts) > 1:
+            conflicts[col] = {
+                "types": {name: column_types[col] for name, _, column_types in file_types if col in column_types},
+                "resolved": resolved[col],
+            }
+    return resolved, conflicts
+
+
+# A file's raw frame a part at a time - frames spilled to the memory budget or streamed in chunks are never read
+# back whole
+def _raw_parts(raw_df):
+    if isinstance(raw_df, SpilledFrame):
+        yield from raw_df.iter_parts()
+    else:
+        yield raw_df
+
+
+# Stack per-file results - indexes are offset by the raw row counts so raw and clean rows stay aligned.
+# The raw frame comes back as a SpilledFrame with a part per file part
+def combine_results(named_results):
+    raw_df_all, clean_frames = SpilledFrame(), []
+    offset = 0
+    for name, (raw_df, clean_df, _, _) in named_results:
+        lookup = pd.Series(pd.RangeIndex(offset, offset + len(raw_df)), index=raw_df.index)
+        for part in _raw_parts(raw_df):
+            raw_df_all.append(part.set_axis(pd.RangeIndex(offset, offset + len(part))).assign(**{SOURCE_COLUMN: name}))
+            offset += len(part)
+        clean_frames.append(clean_df.set_axis(pd.Index(lookup[clean_df.index].to_numpy()))
+                            .assign(**{SOURCE_COLUMN: name}))
+
+    file_types = [(name, len(result[1]), result[2]) for name, result in named_results]
+    column_types, conflicts = reconcile_column_types(file_types)
+
+    # Columns that changed type are brought to the winning type before stacking
+    for i, (name, result) in enumerate(named_results):
+        for col in conflicts:
+            if col in clean_frames[i].columns and result[2].get(col) != column_types[col]:
+                clean_frames[i][col] = _convert(clean_frames[i][col], column_types[col])
+        # Categories differ between files - stack plain values, compact_dtypes builds the combined categories
+        for col in clean_frames[i].columns:
+            if isinstance(clean_frames[i][col].dtype, pd.CategoricalDtype):
+                clean_frames[i][col] = clean_frames[i][col].astype(object)
+
+    clean_df = pd.concat(clean_frames)
+    column_types[SOURCE_COLUMN] = "categorical"
+    column_types = {col: column_types[col] for col in clean_df.columns}
+    return raw_df_all, clean_df, column_types, conflicts
+
+
+def _merged_logs(named_results, conflicts):
+    all_columns = list(dict.fromkeys(col for _, result in named_results for col in result[1].columns))
+    logs = {
+        "dropped_columns": sorted({col for _, result in named_results for col in result[3].get("dropped_columns", [])}),
+        "duplicates_removed": sum(result[3].get("duplicates_removed", 0) for _, result in named_results),
+        "outliers_removed": sum(result[3].get("outliers_removed", 0) for _, result in named_results),
+        "type_conflicts": conflicts,
+        "files": {
+            name: {
+                "rows": len(result[1]),
+                "duplicates_removed": result[3].get("duplicates_removed", 0),
+                "outliers_removed": result[3].get("outliers_removed", 0),
+                "dropped_columns": result[3].get("dropped_columns", []),
+                # Each file is filled with its own statistics and parsed with its own number formats
+                "fill_values": result[3].get("fill_values", {}),
+                "number_parsing": result[3].get("number_parsing", {}),
+                "missing_columns": [col for col in all_columns if col not in result[1].columns],
+            }
+            for name, result in named_results
+        },
+        "stages": [{"file": name, **record} for name, result in named_results for record in result[3].get("stages", [])],
+    }
+    # Bounds are per file, the batch only adds up what each column removed
+    outlier_logs = [result[3]["outliers"] for _, result in named_results if "outliers" in result[3]]
+    if outlier_logs:
+        removed = Counter()
+        for outlier_log in outlier_logs:
+            removed.update({col: stats["removed"] for col, stats in outlier_log["columns"].items()})
+        logs["outliers"] = {
+            "method": outlier_logs[0]["method"],
+            "approximate": any(outlier_log["approximate"] for outlier_log in outlier_logs),
+            "columns": {col: {"removed": count} for col, count in removed.items()},
+        }
+
+    costs = Counter()
+    for _, result in named_results:
+        costs.update(result[3].get("column_costs", {}))
+    logs["column_costs"] = {col: round(seconds, 4) for col, seconds in costs.most_common()}
+    return logs
+
+
+class BatchPipeline:
+    # pipelines: one PreprocessPipeline per file, names: label used in the source_file column
+    def __init__(self, pipelines, names, workers=None):
+        self.pipelines = list(pipelines)
+        self.names = list(names)
+        self.workers = workers
+        # (key, result) of the last combined result
+        self._combined = None
+
+    # Files (content + sheets, in upload order) and their labels - a session keeps its batch while this stays the same
+    @property
+    def key(self):
+        return tuple((pipeline.content_hash, tuple(pipeline.sheets or ()), name)
+                     for pipeline, name in zip(self.pipelines, self.names))
+
+    # Same return values as PreprocessPipeline.result(), for all files together.
+    # The same options give back the same frames, so pages keyed on them (exports, diffs, figure caches) keep working
+    def result(self, remove_outliers=True, arrow_dtypes=False, outlier_method="sequential", approximate_quantiles=False):
+        key = (self.key, remove_outliers, arrow_dtypes, outlier_method, approximate_quantiles)
+        if self._combined is None or self._combined[0] != key:
+            self._combined = (key, self._combine(remove_outliers, arrow_dtypes, outlier_method, approximate_quantiles))
+        return self._combined[1]
+
+    def _combine(self, remove_outliers, arrow_dtypes, outlier_method, approximate_quantiles):
+        workers = min(self.workers or MAX_WORKERS, len(self.pipelines)) or 1
+        # Threads: each pipeline reuses its memoized stages, heavy column work already runs on the process pool
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda pipeline: pipeline.result(remove_outliers=remove_outliers,
+                                                                         outlier_method=outlier_method,
+                                                                         approximate_quantiles=approximate_quantiles),
+                                        self.pipelines))
+        named_results = list(zip(self.names, results))
+
+        raw_df, clean_df, column_types, conflicts = combine_results(named_results)
+        clean_df = compact_dtypes(clean_df, column_types)
+
+        logs = _merged_logs(named_results, conflicts)
+        logs["value_counts"] = summarize_value_counts(clean_df, column_types)
+        if arrow_dtypes:
+            clean_df = to_arrow_dtypes(clean_df)
+        return raw_df, clean_df, column_types, logs
+
+    def held_frames(self):
+        return [frame for pipeline in self.pipelines for frame in pipeline.held_frames()]
+
+    def shared_frames(self):
+        return [frame for pipeline in self.pipelines for frame in pipeline.shared_frames()]
+
+    # The combined raw frame is already on disk
+    def spill_raw(self, raw_df):
+        return raw_df if isinstance(raw_df, SpilledFrame) else SpilledFrame(raw_df)
+
+    # Over the memory budget: every file drops its intermediate frames and spills its raw frame
+    # (raw_df is the combined frame, spilled by spill_raw())
+    def trim(self, raw_df=None):
+        for pipeline in self.pipelines:
+            pipeline.trim(spill=True)
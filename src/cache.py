@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.memory import SPILL_ROW_GROUP_SIZE, SpilledFrame
+
+# Disk cache of preprocessing results
+# Entries are keyed by the file's content hash + the preprocessing options + CACHE_VERSION, frames are stored as Parquet
+# (pickle when a column can't be written as Parquet) and the least recently used entries are evicted past the size limit.
+# Frames that were on disk when stored (the raw frame of a chunked upload) come back on disk, as a SpilledFrame
+
+CACHE_DIR = os.environ.get("FINANCE_CACHE_DIR", os.path.join(".cache", "preprocess"))
+CACHE_MAX_BYTES = int(os.environ.get("FINANCE_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+FRAMES = ["raw_df", "clean_df"]
+
+# Bump whenever the cleaning output or the stored format changes - entries written by older code are never read again
+# (they age out through eviction)
+CACHE_VERSION = 2
+
+
+# SHA-256 of the uploaded file's bytes, stream is rewound afterwards
+def file_hash(file):
+    file.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(1 << 20), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash, options):
+    payload = json.dumps({"version": CACHE_VERSION, "file": content_hash, "options": options}, sort_keys=True,
+                         default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# numpy scalars / timestamps in logs aren't JSON serializable
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _write_frame(df, path):
+    try:
+        df.to_parquet(path + ".parquet")
+    except Exception:
+        if os.path.exists(path + ".parquet"):
+            os.remove(path + ".parquet")
+        df.to_pickle(path + ".pkl")
+
+
+def _read_frame(path, spilled=False):
+    if not os.path.exists(path + ".parquet"):
+        df = pd.read_pickle(path + ".pkl")
+        return SpilledFrame(df) if spilled else df
+    if spilled:
+        return _spill_parquet(path + ".parquet")
+    return pd.read_parquet(path + ".parquet")
+
+
+# Copy a cached Parquet file into a SpilledFrame a batch of rows at a time - the entry can be evicted while the
+# frame is still in use, so it gets its own files
+def _spill_parquet(path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    # Frames stored without their index (a default one) read back with none
+    index = pd.read_parquet(path, columns=[]).index
+    if len(index) != parquet.metadata.num_rows:
+        index = pd.RangeIndex(parquet.metadata.num_rows)
+    spilled = SpilledFrame()
+    offset = 0
+    for batch in parquet.iter_batches(batch_size=SPILL_ROW_GROUP_SIZE):
+        df = pa.Table.from_batches([batch], schema=parquet.schema_arrow).to_pandas()
+        spilled.append(df.set_axis(index[offset:offset + len(df)]))
+        offset += len(df)
+    return spilled if spilled.parts else SpilledFrame(pd.read_parquet(path))
+
+
+def _entry_size(entry_dir):
+    return sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+
+
+# Returns (raw_df, clean_df, column_types, logs) or None on a miss
+def load_cached(key, cache_dir=CACHE_DIR):
+    entry_dir = os.path.join(cache_dir, key)
+    meta_path = os.path.join(entry_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        spilled = meta.get("spilled", [])
+        raw_df, clean_df = (_read_frame(os.path.join(entry_dir, name), name in spilled) for name in FRAMES)
+    except Exception:
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+
+    # mtime marks the last use, eviction removes the oldest entries first
+    os.utime(entry_dir)
+    return raw_df, clean_df, meta["column_types"], meta["logs"]
+
+
+def store_cached(key, result, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    raw_df, clean_df, column_types, logs = result
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Write into a temp dir and rename, so other sessions never see a half written entry
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-")
+    try:
+        for name, df in zip(FRAMES, (raw_df, clean_df)):
+            _write_frame(df, os.path.join(tmp_dir, name))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            spilled = [name for name, df in zip(FRAMES, (raw_df, clean_df)) if isinstance(df, SpilledFrame)]
+            json.dump({"column_types": column_types, "logs": logs, "spilled": spilled}, f, default=_json_default)
+        os.replace(tmp_dir, os.path.join(cache_dir, key))
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    evict(cache_dir, max_bytes)
+
+
+# Drop least recently used entries until the cache fits in max_bytes
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_dir() and not entry.name.startswith("."):
+            entries.append((entry.stat().st_mtime, _entry_size(entry.path), entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
@@ -0,0 +1,38 @@
+import io
+
+import pandas as pd
+
+# Columnar (Parquet / Arrow IPC) input and output
+# These files carry their own column types, so numeric and datetime columns are used as stored and text columns
+# are not re-parsed into numbers or dates. The cleaned frame can optionally use Arrow-backed dtypes
+
+COLUMNAR_EXTENSIONS = (".parquet", ".feather", ".arrow")
+
+
+def is_columnar(name):
+    return name.lower().endswith(COLUMNAR_EXTENSIONS)
+
+
+def read_columnar(file):
+    file.seek(0)
+    try:
+        if file.name.lower().endswith(".parquet"):
+            return pd.read_parquet(file)
+        return pd.read_feather(file)
+    except ImportError as e:
+        raise ImportError("Install 'pyarrow' to handle Parquet / Arrow files.") from e
+
+
+# Arrow-backed dtypes - less memory for strings / nullable columns and no conversion when written to Parquet
+# Categories stay pandas categoricals and floats stay floats (whole-number amounts aren't turned into ints)
+def to_arrow_dtypes(df):
+    floats = df.select_dtypes("float").columns
+    converted = df.convert_dtypes(dtype_backend="pyarrow")
+    converted[floats] = df[floats].convert_dtypes(dtype_backend="pyarrow", convert_integer=False)
+    return converted
+
+
+def parquet_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer)
+    return buffer.getvalue()
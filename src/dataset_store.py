@@ -0,0 +1,188 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+
+from src.memory import SpilledFrame, frame_memory
+
+# Process-wide store of preprocessing results, shared by every session
+# Results are keyed like the disk cache (content hash + options), so ten sessions opening the same export hold one
+# parsed copy and run preprocess() once - a session asking for a result that is still being computed waits for it.
+# Sessions hold handles: an entry stays while a handle references it. Once the store is over FINANCE_DATASET_STORE_MB
+# (0 turns sharing off), unreferenced entries are evicted least recently used first, then referenced entries have their
+# raw frame spilled to disk. Clean frames of referenced entries stay in memory - sessions are working on them - so the
+# cap is a soft limit: it can be exceeded by the clean frames in use
+
+DATASET_STORE_BYTES = int(os.environ.get("FINANCE_DATASET_STORE_MB", "2048")) * 1024 * 1024
+
+
+class _Entry:
+    def __init__(self, result):
+        self.result = result
+        self.nbytes = frame_memory(result[0], result[1])
+        self.refs = 0
+        # Held while the raw frame is written to disk
+        self.spill_lock = threading.Lock()
+
+    def raw_in_memory(self):
+        return isinstance(self.result[0], pd.DataFrame)
+
+
+# A session's reference to a stored result - released explicitly or when the session drops it
+class DatasetHandle:
+    def __init__(self, store, key, entry):
+        self.key = key
+        self._store = store
+        self._entry = entry
+        raw_df, clean_df, column_types, logs = entry.result
+        # Shallow copies share the stored columns - replacing one puts a new array in the copy only, so a session
+        # replacing a column never changes what other sessions see
+        self._result = (
+            raw_df.copy(deep=False) if isinstance(raw_df, pd.DataFrame) else raw_df,
+            clean_df.copy(deep=False),
+            dict(column_types),
+            dict(logs),
+        )
+        self._finalizer = weakref.finalize(self, store._release, key)
+
+    # Once the stored raw frame is spilled, the handle hands out the spilled copy too
+    @property
+    def result(self):
+        if not self._entry.raw_in_memory() and isinstance(self._result[0], pd.DataFrame):
+            self._result = (self._entry.result[0],) + self._result[1:]
+        return self._result
+
+    # Sessions holding the stored result, this one included
+    @property
+    def sharers(self):
+        return max(self._entry.refs, 1)
+
+    # Spill the stored raw frame, for every session holding it - returns the spilled frame
+    def spill_raw(self):
+        self._store.spill_raw(self.key, self._entry)
+        return self.result[0]
+
+    def release(self):
+        self._finalizer()
+
+
+class DatasetStore:
+    def __init__(self, max_bytes=DATASET_STORE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+        self.spills = 0
+
+    # Handle to the result for key - compute() runs once per key even when several sessions ask at the same time
+    def acquire(self, key, compute):
+        if not self.max_bytes:
+            return DatasetHandle(self, key, _Entry(compute()))
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    return self._reference(key, entry)
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = Future()
+                    break
+                self.waits += 1
+            # Someone else is computing this result - its error is ours too, otherwise look the entry up again
+            pending.result()
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+
+        entry = _Entry(result)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            handle = self._reference(key, entry)
+            del self._pending[key]
+            spill = self._evict()
+        pending.set_result(None)
+        # Writing to disk happens outside the lock, other sessions keep acquiring and releasing meanwhile
+        for spill_key, spill_entry in spill:
+            self.spill_raw(spill_key, spill_entry)
+        return handle
+
+    def _reference(self, key, entry):
+        entry.refs += 1
+        self._entries.move_to_end(key)
+        return DatasetHandle(self, key, entry)
+
+    # Releasing only ever evicts - spilling is left to the next acquire()
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs -= 1
+                self._evict()
+
+    # Drop unreferenced entries, least recently used first, until the store fits its cap.
+    # Returns the referenced entries whose raw frames have to be spilled to get there
+    def _evict(self):
+        over = self._bytes - self.max_bytes
+        spill = []
+        for key, entry in list(self._entries.items()):
+            if over <= 0:
+                break
+            if entry.refs == 0:
+                del self._entries[key]
+                self._bytes -= entry.nbytes
+                over -= entry.nbytes
+                self.evictions += 1
+        for key, entry in self._entries.items():
+            if over <= 0:
+                break
+            if entry.raw_in_memory():
+                spill.append((key, entry))
+                over -= entry.nbytes - frame_memory(entry.result[1])
+        return spill
+
+    # Replace an entry's raw frame with a copy on disk - sessions pick it up through their handles
+    def spill_raw(self, key, entry):
+        with entry.spill_lock:
+            if not entry.raw_in_memory():
+                return
+            spilled = SpilledFrame(entry.result[0])
+            with self._lock:
+                entry.result = (spilled,) + entry.result[1:]
+                nbytes = frame_memory(entry.result[1])
+                if self._entries.get(key) is entry:
+                    self._bytes -= entry.nbytes - nbytes
+                entry.nbytes = nbytes
+                self.spills += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "referenced": sum(entry.refs > 0 for entry in self._entries.values()),
+                "mb": round(self._bytes / 2 ** 20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "evictions": self.evictions,
+                "spills": self.spills,
+            }
+
+
+dataset_store = DatasetStore()
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Cell-level diff between the raw and the cleaned dataframe
+# Whole columns are compared at once, NaN counts as equal to NaN, and raw rows are lined up with the
+# cleaned index first so rows dropped by dedup / outlier removal are simply skipped
+
+HIGHLIGHT_STYLE = "background-color: #ffcccc"  # light red
+
+
+# Boolean array - True where the cleaned value differs from the raw one
+def _column_changes(raw_col, clean_col):
+    raw_na = raw_col.isna().to_numpy()
+    clean_na = clean_col.isna().to_numpy()
+
+    # Exactly one side missing is a change, both missing is not
+    changed = raw_na ^ clean_na
+    valid = ~(raw_na | clean_na)
+    if not valid.any():
+        return changed
+
+    same_kind = (
+        (pd.api.types.is_numeric_dtype(raw_col) and pd.api.types.is_numeric_dtype(clean_col))
+        or (pd.api.types.is_datetime64_any_dtype(raw_col) and pd.api.types.is_datetime64_any_dtype(clean_col))
+    )
+    if same_kind:
+        raw_values = raw_col.to_numpy()[valid]
+        clean_values = clean_col.to_numpy()[valid]
+    else:
+        # dtype changed during cleaning (e.g. "$1,234" → 1234.0) - compare the python values like the old cell loop did
+        raw_values = np.asarray(raw_col, dtype=object)[valid]
+        clean_values = np.asarray(clean_col, dtype=object)[valid]
+
+    changed[valid] = np.asarray(raw_values != clean_values, dtype=bool)
+    return changed
+
+
+# Returns (mask, counts): a boolean frame shaped like cleaned and the number of changed cells per column
+def compute_change_mask(raw, cleaned):
+    if not raw.index.equals(cleaned.index):
+        raw = raw.reindex(cleaned.index)
+
+    mask = {}
+    for col in cleaned.columns:
+        if col in raw.columns:
+            mask[col] = _column_changes(raw[col], cleaned[col])
+        else:
+            mask[col] = np.ones(len(cleaned), dtype=bool)
+
+    mask = pd.DataFrame(mask, index=cleaned.index, columns=cleaned.columns)
+    counts = mask.sum().astype(int)
+    return mask, counts
+
+
+# Rows of the cleaned frame that came from these raw rows - a slice when both indexes are sorted
+def surviving_rows(cleaned, raw_index):
+    if not len(raw_index):
+        return cleaned.iloc[:0]
+    if cleaned.index.is_monotonic_increasing and raw_index.is_monotonic_increasing:
+        start = cleaned.index.searchsorted(raw_index[0])
+        stop = cleaned.index.searchsorted(raw_index[-1], side="right")
+        return cleaned.iloc[start:stop]
+    return cleaned[cleaned.index.isin(raw_index)]
+
+
+# Function to highlight changes in clean dataframe - pass a precomputed mask to skip the diff
+def highlight_cleaned_changes(raw, cleaned, mask=None):
+    if mask is None:
+        mask, _ = compute_change_mask(raw, cleaned)
+    styles = np.where(mask.to_numpy(), HIGHLIGHT_STYLE, "")
+    return cleaned.style.apply(lambda _: styles, axis=None)
@@ -0,0 +1,119 @@
+import numpy as np
+
+# Server-side downsampling for large plots
+# Series keep their visual shape (largest-triangle-three-buckets / min-max per bucket),
+# scatter plots keep sparse regions and outliers while thinning dense clusters
+
+POINT_BUDGET = 5000
+DENSITY_GRID_BINS = 64
+
+
+# Largest-Triangle-Three-Buckets - returns sorted positions of the n_out points that best keep the line's shape
+def lttb_indices(x, y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    # First and last points are always kept, the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_stop].mean() if next_stop > next_start else x[-1]
+        avg_y = y[next_start:next_stop].mean() if next_stop > next_start else y[-1]
+
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (avg_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+
+    return selected
+
+
+# Min/max per bucket - keeps every peak and trough, good for filled areas
+def minmax_indices(y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype="float64")
+    n_buckets = n_out // 2
+    bucket = np.arange(n) * n_buckets // n
+    starts = np.searchsorted(bucket, np.arange(n_buckets))
+
+    # argmin / argmax within each bucket via a stable sort on (bucket, value)
+    order = np.lexsort((y, bucket))
+    ends = np.append(starts[1:], n)
+    picks = np.concatenate([order[starts], order[ends - 1]])
+    return np.unique(picks)
+
+
+# Density-aware sample of rows from an (n, d) array
+# Points are binned on a grid and every cell keeps at most k points, with k chosen so ~n_out points survive -
+# sparse cells (outliers, tails) are kept whole and only dense clusters are thinned
+def density_sample_indices(values, n_out, bins=DENSITY_GRID_BINS, seed=0):
+    values = np.asarray(values, dtype="float64")
+    if values.ndim == 1:
+        values = values[:, None]
+    n = len(values)
+    if n_out >= n:
+        return np.arange(n)
+
+    finite = np.isfinite(values).all(axis=1)
+    positions = np.flatnonzero(finite)
+    values = values[finite]
+
+    low = values.min(axis=0)
+    span = values.max(axis=0) - low
+    span[span == 0] = 1
+    cells = np.minimum(((values - low) / span * bins).astype(np.int64), bins - 1)
+
+    # Cell ids are built a column at a time - renumbered densely (fewer ids than points) whenever the next column
+    # could overflow int64, so wide Pair Plots don't wrap around
+    cell_id = np.zeros(len(values), dtype=np.int64)
+    id_count = 1
+    for j in range(values.shape[1]):
+        if id_count * bins > 2 ** 62:
+            _, cell_id = np.unique(cell_id, return_inverse=True)
+            id_count = int(cell_id.max()) + 1
+        cell_id = cell_id * bins + cells[:, j]
+        id_count *= bins
+
+    _, inverse, counts = np.unique(cell_id, return_inverse=True, return_counts=True)
+
+    # Largest per-cell cap that stays within the budget
+    lo, hi = 0, int(counts.max())
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if np.minimum(counts, mid).sum() <= n_out:
+            lo = mid
+        else:
+            hi = mid - 1
+    cap = max(lo, 1)
+
+    # Random rank of every point inside its cell, keep ranks below the cap
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(inverse)), inverse))
+    rank = np.empty(len(inverse), dtype=np.int64)
+    cell_starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank[order] = np.arange(len(inverse)) - cell_starts[inverse[order]]
+    keep = rank < cap
+
+    # More occupied cells than the budget (many columns, most points alone in their cell) - one point of a random
+    # subset of the cells
+    if len(counts) > n_out:
+        cells_kept = np.zeros(len(counts), dtype=bool)
+        cells_kept[rng.choice(len(counts), n_out, replace=False)] = True
+        keep &= cells_kept[inverse]
+
+    return np.sort(positions[keep])
@@ -0,0 +1,220 @@
+import io
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from src.parallel import _release
+from src.workers import MAX_WORKERS, worker_map
+
+# Excel ingestion
+# Workbooks are opened read-only and rows are streamed into the frame in chunks, so the full cell object model
+# (and the full list of python rows) is never held in memory. Cells are converted the way pd.read_excel does,
+# several sheets can be read and combined, and sheets are read in parallel on the shared worker pool - the workbook
+# goes to the workers once, through shared memory.
+# .xlsx / .xlsm go through openpyxl, .xlsb through pyxlsb, legacy .xls through pd.read_excel (xlrd), a whole sheet
+# at once
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xlsb", ".xls")
+EXCEL_CHUNK_ROWS = 50_000
+SHEET_COLUMN = "source_sheet"
+
+
+def is_excel(name):
+    return name.lower().endswith(EXCEL_EXTENSIONS)
+
+
+def _is_xlsb(name):
+    return name.lower().endswith(".xlsb")
+
+
+def _is_xls(name):
+    return name.lower().endswith(".xls")
+
+
+def _open_openpyxl(data):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("Install 'openpyxl' to handle Excel files.") from e
+    return load_workbook(io.BytesIO(data), read_only=True, data_only=True, keep_links=False)
+
+
+def _open_pyxlsb(data):
+    try:
+        from pyxlsb import open_workbook
+    except ImportError as e:
+        raise ImportError("Install 'pyxlsb' to handle .xlsb files.") from e
+    return open_workbook(io.BytesIO(data))
+
+
+def _open_xls(data):
+    try:
+        return pd.ExcelFile(io.BytesIO(data), engine="xlrd")
+    except ImportError as e:
+        raise ImportError("Install 'xlrd' to handle .xls files.") from e
+
+
+# Cell value as pd.read_excel sees it - blanks are "", error cells NaN, whole floats int
+def _convert_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        as_int = int(value)
+        return as_int if as_int == value else value
+    return value
+
+
+def _openpyxl_rows(data, sheet):
+    from openpyxl.cell.cell import TYPE_ERROR
+
+    book = _open_openpyxl(data)
+    try:
+        ws = book[sheet]
+        # Dimensions stored in the file are often wrong, let the reader find the real ones
+        ws.reset_dimensions()
+        for row in ws.rows:
+            yield [np.nan if cell.data_type == TYPE_ERROR else _convert_value(cell.value) for cell in row]
+    finally:
+        book.close()
+
+
+def _pyxlsb_rows(data, sheet):
+    with _open_pyxlsb(data) as book:
+        with book.get_sheet(sheet) as ws:
+            for row in ws.rows():
+                yield [_convert_value(cell.v) for cell in row]
+
+
+# Trailing blanks trimmed, trailing empty rows skipped, rows grouped into chunks of EXCEL_CHUNK_ROWS
+def _row_chunks(rows, chunk_rows):
+    chunk = []
+    pending_empty = []
+    for row in rows:
+        while row and row[-1] == "":
+            row.pop()
+        if not row:
+            pending_empty.append(row)
+            continue
+        # Empty rows only count when data follows them
+        chunk.extend(pending_empty)
+        pending_empty = []
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Parse a list of rows with the same parser pd.read_excel uses, so dtypes are inferred the same way
+def _parse_rows(rows, columns=None):
+    width = max(len(row) for row in rows)
+    if columns is not None and width > len(columns):
+        columns = list(columns) + [f"Unnamed: {i}" for i in range(len(columns), width)]
+    if columns is not None:
+        width = len(columns)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+
+    if columns is None:
+        return TextParser(rows, header=0, skip_blank_lines=False).read()
+    return TextParser(rows, header=None, names=columns, skip_blank_lines=False).read()
+
+
+# Chunks infer dtypes on their own rows - columns whose chunks disagree (e.g. ints in one chunk, a blank in
+# another) are re-inferred over the whole column, so the result matches parsing every row at once
+def _concat_chunks(frames):
+    if len(frames) == 1:
+        return frames[0]
+    columns = frames[-1].columns
+    mixed = [col for col in columns if len({frame[col].dtype for frame in frames if col in frame}) > 1]
+    if mixed:
+        frames = [frame.astype({col: object for col in mixed if col in frame}) for frame in frames]
+    df = pd.concat(frames, ignore_index=True)
+    for col in mixed:
+        values = [[value] for value in df[col].tolist()]
+        df[col] = TextParser(values, header=None, names=[col], skip_blank_lines=False).read()[col]
+    return df
+
+
+# One sheet as a dataframe (first row is the header)
+def read_sheet(data, name, sheet, chunk_rows=EXCEL_CHUNK_ROWS):
+    if _is_xls(name):
+        with _open_xls(data) as book:
+            return book.parse(sheet)
+    rows = _pyxlsb_rows(data, sheet) if _is_xlsb(name) else _openpyxl_rows(data, sheet)
+
+    frames = []
+    columns = None
+    for chunk in _row_chunks(rows, chunk_rows):
+        frame = _parse_rows(chunk, columns)
+        columns = frame.columns
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame()
+    return _concat_chunks(frames)
+
+
+def _read_bytes(file):
+    file.seek(0)
+    data = file.read()
+    file.seek(0)
+    return data
+
+
+# Sheet names of an uploaded workbook, in workbook order
+def sheet_names(file):
+    data = _read_bytes(file)
+    if _is_xlsb(file.name):
+        with _open_pyxlsb(data) as book:
+            return list(book.sheets)
+    if _is_xls(file.name):
+        with _open_xls(data) as book:
+            return list(book.sheet_names)
+    book = _open_openpyxl(data)
+    try:
+        return list(book.sheetnames)
+    finally:
+        book.close()
+
+
+# Worker side of read_sheets() - the workbook is read from the caller's shared memory block
+def _read_shared_sheet(handle, name, sheet):
+    block = shared_memory.SharedMemory(name=handle["block"])
+    try:
+        data = bytes(block.buf[:handle["size"]])
+    finally:
+        block.close()
+    return read_sheet(data, name, sheet)
+
+
+# Read the given sheets (default: the first one), several sheets at once on the worker pool
+# Returns a list of (sheet, dataframe) in the requested order
+def read_sheets(file, sheets=None, workers=None):
+    data = _read_bytes(file)
+    sheets = list(sheets) if sheets else sheet_names(file)[:1]
+    names = [file.name] * len(sheets)
+
+    workers = workers or MAX_WORKERS
+    if workers <= 1 or len(sheets) <= 1:
+        return list(zip(sheets, map(read_sheet, [data] * len(sheets), names, sheets)))
+
+    # Every task gets the name of one shared copy of the workbook, not the workbook itself
+    block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    try:
+        block.buf[:len(data)] = data
+        handle = {"block": block.name, "size": len(data)}
+        frames = list(worker_map(_read_shared_sheet, [handle] * len(sheets), names, sheets, workers=workers))
+    finally:
+        _release([block])
+    return list(zip(sheets, frames))
+
+
+# One frame from several sheets - columns are aligned by name and every row keeps the sheet it came from
+def combine_sheets(frames):
+    if len(frames) == 1:
+        return frames[0][1]
+    tagged = [frame.assign(**{SHEET_COLUMN: sheet}) for sheet, frame in frames]
+    return pd.concat(tagged, ignore_index=True)
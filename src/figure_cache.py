@@ -0,0 +1,45 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+import pandas as pd
+
+# LRU cache of built plotly figures
+# Keyed by the plot spec + a fingerprint of the dataframe, so reruns only build new or invalidated plots
+
+FIGURE_CACHE_SIZE = 32
+
+
+# Content fingerprint of a dataframe - changes whenever a value, column or dtype changes
+def dataframe_fingerprint(df):
+    values = int(pd.util.hash_pandas_object(df, index=True).sum()) if len(df.columns) else 0
+    schema = json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()])
+    return f"{len(df)}:{values}:{hashlib.md5(schema.encode()).hexdigest()}"
+
+
+class FigureCache:
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(plot_data, fingerprint):
+        return json.dumps(plot_data, sort_keys=True, default=str), fingerprint
+
+    # Return the cached value for key, building (and storing) it on a miss
+    def get_or_build(self, key, build):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        value = build()
+        self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,197 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.parallel import _string_buffers
+
+# Finance number parser
+# Amounts come as "$1,234.50", "(1,234.50)", "1.234,50 €", "USD 12.5M", "1 234-" or "15.4%". A column's convention -
+# which character is the decimal separator and which groups thousands - is decided once from a sample of its values,
+# then the whole column is parsed in one pass over its Arrow strings: currency symbols and codes, accounting
+# parentheses and trailing minus signs, % and K/M/B suffixes, scientific notation ("1.5e6"). Anything else (words,
+# dates, ranges like "1-3") is NaN
+
+NUMBER_FORMAT_SAMPLE_SIZE = 1000
+NUMERIC_NA_VALUES = ['$', '-', 'None', 'none', 'nan', 'NaN', '']
+
+CURRENCY_SYMBOLS = "€£¥₹₩₽₺₪₫฿₦₱"
+CURRENCY_CODES = ["USD", "EUR", "GBP", "JPY", "CNY", "INR", "CHF", "CAD", "AUD", "NZD", "HKD", "SGD", "SEK", "NOK",
+                  "DKK", "PLN", "CZK", "HUF", "ZAR", "BRL", "MXN", "RUB", "KRW", "TRY", "AED", "SAR", "RS"]
+# Longest first, so "MM" isn't read as "M" + garbage
+SUFFIX_MULTIPLIERS = {"MM": 1e6, "MN": 1e6, "BN": 1e9, "K": 1e3, "M": 1e6, "B": 1e9}
+# Spaces (incl. no-break / thin) and apostrophes only ever group thousands
+GROUPING_CHARACTERS = " '\u2019\u00a0\u202f"
+
+_CODES = rf"(?i:{'|'.join(CURRENCY_CODES)})\.?"
+_CURRENCY = rf"[A-Z]{{0,2}}\$|[{CURRENCY_SYMBOLS}]|{_CODES}"
+_EXPONENT = r"(?:[eE][-+]?\d+)?"
+_CORE = rf"(?P<number>(?:\d[\d,.{GROUPING_CHARACTERS}]*|[.,]\d+){_EXPONENT})"
+# Accounting blanks ("$ -", "€–") - empty cells, like NUMERIC_NA_VALUES
+_BLANK = rf"^(?:{_CURRENCY}|[\s\-−–—])+$"
+_SUFFIX = rf"(?i)\d\s*(?P<suffix>{'|'.join(SUFFIX_MULTIPLIERS)})\b"
+
+
+# Regex of the number forms a convention allows - without one, of every form the parser knows.
+# Only checks a value's form (no capture groups, so it runs as a DFA); the parts are read with cheaper passes
+def _number_pattern(number_format=None):
+    if number_format is None:
+        currency, suffixes, parentheses, percent = _CURRENCY, list(SUFFIX_MULTIPLIERS), True, True
+    else:
+        # Detected currencies are upper-cased - "usd" and "USD" are the same code
+        currency = "|".join(re.escape(value) for value in number_format["currency"])
+        currency = f"(?i:{currency})" if currency else ""
+        suffixes, parentheses, percent = number_format["suffixes"], number_format["parentheses"], number_format["percent"]
+
+    def optional(content):
+        return rf"(?:{content})?\s*" if content else ""
+
+    suffix = f"(?i:{'|'.join(sorted(suffixes, key=len, reverse=True))})" if suffixes else ""
+    body = (rf"{optional('[-−+]')}{optional(currency)}{optional('[-−]')}(?:\d[\d,.{GROUPING_CHARACTERS}]*|[.,]\d+)"
+            rf"{_EXPONENT}\s*"
+            rf"{optional(suffix)}{optional('%' if percent else '')}{optional(currency)}{optional('[-−]')}")
+    if parentheses:
+        # Accounting negatives, the currency inside or outside: "(1,234.50)", "$(1,234.50)"
+        return rf"^(?:{body}|{optional(currency)}\(\s*{body}\)\s*{optional(currency)})$"
+    return rf"^{body}$"
+
+
+# Stripped Arrow strings of a column - mixed columns (numbers next to text) go through str() like astype(str)
+def _text(series):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    buffers = _string_buffers(series)
+    array = buffers[0] if buffers is not None else pa.array(series.astype(str).to_numpy(dtype=object))
+    return pc.utf8_trim_whitespace(array)
+
+
+def _matches(text, pattern):
+    import pyarrow.compute as pc
+
+    return pc.match_substring_regex(text, pattern).fill_null(False).to_numpy(zero_copy_only=False)
+
+
+# Decimal separator a number votes for - None when it reads either way ("1,234" / "1.234")
+def _decimal_vote(number):
+    commas, points = number.count(","), number.count(".")
+    if commas and points:
+        return "," if number.rfind(",") > number.rfind(".") else "."
+    for separator, other in [(",", "."), (".", ",")]:
+        if number.count(separator) > 1:
+            return other
+        if number.count(separator) == 1:
+            digits_after = len(number) - number.index(separator) - 1
+            return None if digits_after == 3 else separator
+    return None
+
+
+# Upper-cased matches of a one-group pattern, without the values that don't have one
+def _found(text, pattern):
+    import pyarrow.compute as pc
+
+    found = pc.extract_regex(text, pattern).field(0)
+    return sorted(value for value in pc.unique(pc.utf8_upper(found)).to_pylist() if value)
+
+
+# A column's number convention, decided from up to NUMBER_FORMAT_SAMPLE_SIZE evenly spaced values.
+# Ambiguous samples ("1,234") keep the point as decimal separator
+def detect_number_format(series):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    text = pc.drop_null(_text(series))
+    step = max(len(text) // NUMBER_FORMAT_SAMPLE_SIZE, 1)
+    sample = text.take(np.arange(0, len(text), step)[:NUMBER_FORMAT_SAMPLE_SIZE])
+    sample = sample.filter(pa.array(_matches(sample, _number_pattern())))
+
+    numbers = pc.replace_substring_regex(sample, r"[^\d.,]", "").to_pylist()
+    votes = [_decimal_vote(number) for number in numbers]
+    decimal = "," if votes.count(",") > votes.count(".") else "."
+    return {
+        "decimal": decimal,
+        "thousands": "." if decimal == "," else ",",
+        "currency": _found(sample, rf"(?P<currency>{_CURRENCY})"),
+        "parentheses": bool(_matches(sample, r"\(").any()),
+        "percent": bool(_matches(sample, "%").any()),
+        "suffixes": _found(sample, _SUFFIX),
+    }
+
+
+# Parse a text column with its convention (detected from the column when not given).
+# Returns (float values, is_percent mask or None when no value has a %, parse statistics)
+def parse_finance_numbers(series, number_format=None):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    number_format = number_format or detect_number_format(series)
+    text = _text(series)
+    missing = pc.or_kleene(pc.is_null(text), pc.is_in(text, pa.array(NUMERIC_NA_VALUES)))
+    missing = missing.fill_null(True).to_numpy(zero_copy_only=False) | _matches(text, _BLANK)
+
+    # The column's own pattern is cheap to match - values in a form the sample didn't show are checked again
+    # against every known form
+    valid = _matches(text, _number_pattern(number_format)) & ~missing
+    retry = ~valid & ~missing
+    if retry.any():
+        valid[retry] = _matches(text.filter(pa.array(retry)), _number_pattern())
+
+    # Only values in a known form are read, digits and the decimal separator are all that's left of them.
+    # Currency codes and exponents take the slower way: codes go first (the dot of "Rs. 500" isn't a decimal point),
+    # then the number is cut out so an exponent keeps its sign
+    numbers = text.filter(pa.array(valid))
+    decimal = re.escape(number_format["decimal"])
+    signs = numbers
+    if _matches(numbers, rf"{_CODES}|\d[eE]").any():
+        core = pc.extract_regex(pc.replace_substring_regex(numbers, _CODES, ""), _CORE).field(0)
+        digits = pc.replace_substring_regex(core, rf"[^\d{decimal}eE+\-]", "")
+        signs = pc.replace_substring_regex(numbers, r"\d[eE][-+]", "")
+    else:
+        digits = pc.replace_substring_regex(numbers, rf"[^\d{decimal}]", "")
+    if number_format["decimal"] == ",":
+        digits = pc.replace_substring(digits, ",", ".")
+    readable = _matches(digits, rf"^(?:\d+\.?\d*|\.\d+){_EXPONENT}$")
+    parsed = pc.cast(pc.if_else(pa.array(readable), digits, pa.scalar(None, pa.string())), pa.float64())
+    parsed = parsed.to_numpy(zero_copy_only=False)
+
+    # A known form only has a minus (other than an exponent's) or a parenthesis when it's negative
+    # ("(0.00)" stays 0.0, not -0.0)
+    minus = _matches(signs, "[-−(]")
+    parsed = np.where(minus, -parsed, parsed) + 0.0
+    has_suffix = _matches(numbers, _SUFFIX)
+    if has_suffix.any():
+        suffix = pc.extract_regex(numbers.filter(pa.array(has_suffix)), _SUFFIX).field(0)
+        positions = pc.index_in(pc.utf8_upper(suffix), pa.array(list(SUFFIX_MULTIPLIERS))).to_numpy()
+        parsed[has_suffix] *= np.array(list(SUFFIX_MULTIPLIERS.values()))[positions]
+
+    values = np.full(len(text), np.nan)
+    values[valid] = parsed
+    valid[valid] = readable
+    negative, scaled, is_percent = (np.zeros(len(text), dtype=bool) for _ in range(3))
+    negative[valid] = minus[readable]
+    scaled[valid] = has_suffix[readable]
+    is_percent[valid] = _matches(numbers, "%")[readable]
+
+    stats = {
+        "format": number_format,
+        "values": int((~missing).sum()),
+        "parsed": int(valid.sum()),
+        "failed": int((~missing & ~valid).sum()),
+        "negative": int(negative.sum()),
+        "percent": int(is_percent.sum()),
+        "scaled": int(scaled.sum()),
+    }
+
+    # Whole numbers without gaps stay integers, like pd.to_numeric() reads them
+    if valid.all() and not (_matches(digits, r"[.eE]").any() or scaled.any()) and np.abs(values).max(initial=0) < 2 ** 53:
+        values = values.astype("int64")
+    coerced = pd.Series(values, index=series.index, name=series.name)
+    is_percent = pd.Series(is_percent, index=series.index, name=series.name) if is_percent.any() else None
+    return coerced, is_percent, stats
+
+
+# Parse statistics of many chunks of one column, parsed with the same convention
+def merge_parse_stats(total, stats):
+    if total is None:
+        return dict(stats)
+    return {key: value if key == "format" else total[key] + value for key, value in stats.items()}
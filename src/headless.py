@@ -0,0 +1,263 @@
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+import pyarrow as pa
+
+from src.cache import _json_default, file_hash
+from src.columnar import COLUMNAR_EXTENSIONS
+from src.excel import EXCEL_EXTENSIONS
+from src.memory import share_column_buffers
+from src.preprocess import OUTLIER_METHODS, preprocess
+from src.streaming import choose_chunksize
+from src.workers import MAX_WORKERS, worker_map
+
+# Headless batch preprocessing - the same cleaning as the upload page, for files on disk
+# Every input file gets a cleaned output (<name>.parquet or <name>.csv) and a <name>.meta.json sidecar with its
+# content hash, options, column_types and logs. Files whose hash and options match their sidecar are skipped,
+# so a nightly run over thousands of files only cleans the new / changed ones. Files are spread over the worker pool.
+#
+#   python -m src.headless data/2024/ "exports/*.xlsx" --output cleaned/ --workers 8
+
+INPUT_EXTENSIONS = (".csv",) + EXCEL_EXTENSIONS + COLUMNAR_EXTENSIONS
+OUTPUT_FORMATS = ["parquet", "csv"]
+META_SUFFIX = ".meta.json"
+
+
+# A file on disk that looks like an upload - .name for the format checks, .size for choose_chunksize()
+class PathFile(io.BufferedReader):
+    def __init__(self, path):
+        super().__init__(io.FileIO(path, "rb"))
+        self.size = os.path.getsize(path)
+
+
+# preprocess() for a path instead of an upload object
+def preprocess_path(path, remove_outliers=True, **options):
+    with PathFile(path) as file:
+        options.setdefault("chunksize", choose_chunksize(file))
+        return preprocess(file, remove_outliers=remove_outliers, **options)
+
+
+def _is_input(path):
+    return os.path.isfile(path) and path.lower().endswith(INPUT_EXTENSIONS)
+
+
+# (path, output name) for every supported file in the inputs - directories keep their relative layout,
+# files and glob matches are named after the file
+def find_inputs(inputs, recursive=False):
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                paths = [os.path.join(root, name) for root, _, names in os.walk(item) for name in names]
+            else:
+                paths = [os.path.join(item, name) for name in os.listdir(item)]
+            found += [(path, os.path.relpath(path, item)) for path in sorted(paths) if _is_input(path)]
+        elif glob.has_magic(item):
+            found += [(path, os.path.basename(path)) for path in sorted(glob.glob(item, recursive=True))
+                      if _is_input(path)]
+        elif _is_input(item):
+            found.append((item, os.path.basename(item)))
+        else:
+            raise ValueError(f"Not a supported file or a directory: {item}")
+
+    # The same file listed twice is processed once, two files with one output name would overwrite each other
+    unique = dict((os.path.abspath(path), (path, name)) for path, name in found)
+    names = [name for _, name in unique.values()]
+    clashes = sorted({name for name in names if names.count(name) > 1})
+    if clashes:
+        raise ValueError(f"Several inputs would write the same output: {', '.join(clashes)}")
+    return list(unique.values())
+
+
+def output_paths(output_dir, name, output_format):
+    base = os.path.join(output_dir, name)
+    return base + "." + output_format, base + META_SUFFIX
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Write to a temp file next to the target and rename, so a crash never leaves a half written output
+def _write_atomic(path, write):
+    tmp_path = path + ".tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_output(df, path, output_format):
+    if output_format == "parquet":
+        try:
+            _write_atomic(path, df.to_parquet)
+            return path
+        except (pa.ArrowException, ValueError, TypeError):
+            # Columns Arrow can't store (mixed object values) - fall back to CSV next to where parquet would be
+            path = path[:-len(".parquet")] + ".csv"
+    _write_atomic(path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+    return path
+
+
+# Clean one file - returns a result record, the file is skipped when its sidecar matches the hash and options
+def process_file(path, output_dir, name=None, remove_outliers=True, arrow_dtypes=False, output_format="parquet",
+                 force=False, outlier_method="sequential", approximate_quantiles=False):
+    name = name or os.path.basename(path)
+    output_path, meta_path = output_paths(output_dir, name, output_format)
+    options = {"remove_outliers": remove_outliers, "arrow_dtypes": arrow_dtypes, "format": output_format}
+    # Only a non-default method is recorded, so sidecars written before it existed still match
+    if remove_outliers and outlier_method != "sequential":
+        options["outlier_method"] = outlier_method
+    if remove_outliers and approximate_quantiles:
+        options["approximate_quantiles"] = True
+    record = {"source": path, "name": name, "status": "processed", "rows": 0, "seconds": 0.0}
+
+    start = time.perf_counter()
+    try:
+        with PathFile(path) as file:
+            content_hash = file_hash(file)
+            meta = None if force else _read_meta(meta_path)
+            if (meta and meta.get("content_hash") == content_hash and meta.get("options") == options
+                    and os.path.exists(meta.get("output", ""))):
+                record.update(status="skipped", output=meta["output"], rows=meta.get("rows_in", 0))
+                return record
+
+            # One process per file already - the columns of a file aren't spread over the pool again
+            raw_df, clean_df, column_types, logs = preprocess(file, remove_outliers=remove_outliers,
+                                                              chunksize=choose_chunksize(file),
+                                                              arrow_dtypes=arrow_dtypes, workers=1,
+                                                              outlier_method=outlier_method,
+                                                              approximate_quantiles=approximate_quantiles)
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        written = _write_output(clean_df, output_path, output_format)
+        seconds = time.perf_counter() - start
+        meta = {
+            "source": os.path.abspath(path),
+            "content_hash": content_hash,
+            "options": options,
+            "output": written,
+            "rows_in": len(raw_df),
+            "rows_out": len(clean_df),
+            "seconds": round(seconds, 4),
+            "column_types": column_types,
+            "logs": logs,
+        }
+        # Sidecar last - it only exists once the output is complete
+        _write_atomic(meta_path, lambda tmp_path: _dump_meta(meta, tmp_path))
+        record.update(output=written, rows=len(raw_df), rows_out=len(clean_df))
+    except Exception as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def _dump_meta(meta, path):
+    with open(path, "w") as f:
+        json.dump(meta, f, indent=2, default=_json_default)
+
+
+def _process_task(args):
+    path, output_dir, name, options = args
+    return process_file(path, output_dir, name, **options)
+
+
+# Clean every file in the inputs (directories, globs, files) into output_dir - returns the run report
+def process_paths(inputs, output_dir, remove_outliers=True, arrow_dtypes=False, output_format="parquet",
+                  workers=None, force=False, recursive=False, progress=None, outlier_method="sequential",
+                  approximate_quantiles=False):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if outlier_method not in OUTLIER_METHODS:
+        raise ValueError(f"Unknown outlier method: {outlier_method}")
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = [inputs]
+    files = find_inputs([os.fspath(item) for item in inputs], recursive)
+
+    options = {"remove_outliers": remove_outliers, "arrow_dtypes": arrow_dtypes, "output_format": output_format,
+               "force": force, "outlier_method": outlier_method, "approximate_quantiles": approximate_quantiles}
+    tasks = [(path, output_dir, name, options) for path, name in files]
+
+    workers = min(workers or MAX_WORKERS, MAX_WORKERS, len(tasks) or 1)
+    start = time.perf_counter()
+    if workers > 1:
+        results = worker_map(_process_task, tasks, workers=workers)
+    else:
+        results = map(_process_task, tasks)
+
+    records = []
+    for record in results:
+        records.append(record)
+        if progress:
+            progress(record)
+    return throughput_report(records, time.perf_counter() - start)
+
+
+# Files/sec and rows/sec over the files that were actually cleaned (skipped files cost only a hash)
+def throughput_report(records, seconds):
+    processed = [record for record in records if record["status"] == "processed"]
+    rows = sum(record["rows"] for record in processed)
+    return {
+        "files": len(records),
+        "processed": len(processed),
+        "skipped": sum(record["status"] == "skipped" for record in records),
+        "failed": sum(record["status"] == "failed" for record in records),
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "files_per_sec": round(len(processed) / seconds, 2) if seconds else 0.0,
+        "rows_per_sec": round(rows / seconds, 1) if seconds else 0.0,
+        "results": records,
+    }
+
+
+def _print_record(record):
+    detail = record.get("error") or f"{record['rows']:,} rows"
+    print(f"{record['status']:>9}  {record['name']}  ({detail}, {record['seconds']:.2f}s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean finance files without the UI.")
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns (quote them)")
+    parser.add_argument("--output", required=True, help="directory for the cleaned files and their sidecars")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="parquet")
+    parser.add_argument("--keep-outliers", action="store_true", help="don't remove IQR outliers")
+    parser.add_argument("--outlier-method", choices=OUTLIER_METHODS, default="sequential",
+                        help="sequential: each column's IQR bounds from the rows earlier columns kept, "
+                             "independent: from all rows")
+    parser.add_argument("--approximate-quantiles", action="store_true",
+                        help="take IQR quartiles from a sample of rows - faster on very large files")
+    parser.add_argument("--arrow-dtypes", action="store_true", help="Arrow-backed dtypes for the clean data")
+    parser.add_argument("--workers", type=int, help=f"files processed at once (default {MAX_WORKERS})")
+    parser.add_argument("--recursive", action="store_true", help="also look in subdirectories")
+    parser.add_argument("--force", action="store_true", help="reprocess files even when they're unchanged")
+    parser.add_argument("--report", help="write the run report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    share_column_buffers()
+    report = process_paths(args.inputs, args.output, remove_outliers=not args.keep_outliers,
+                           arrow_dtypes=args.arrow_dtypes, output_format=args.format, workers=args.workers,
+                           force=args.force, recursive=args.recursive, progress=_print_record,
+                           outlier_method=args.outlier_method, approximate_quantiles=args.approximate_quantiles)
+
+    print(f"{report['processed']} processed, {report['skipped']} skipped, {report['failed']} failed "
+          f"in {report['seconds']:.2f}s - {report['files_per_sec']} files/s, {report['rows_per_sec']:,} rows/s")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, default=_json_default)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Per-stage instrumentation for preprocessing
+# Every stage records its wall time, rows/columns in and out and the peak memory it allocated (peak_traced_mb, traced
+# with tracemalloc - FINANCE_TRACE_MEMORY=0 turns tracing off for faster stages). rss_high_water_growth_mb is how far
+# the stage raised the process's resident high-water mark: it is 0 whenever the stage stayed under an earlier peak, so
+# it only flags the stages that grew the process. Both are process-wide: stages running at the same time on other
+# threads (batch uploads) are counted in each other's numbers.
+# FINANCE_STRUCTURED_LOGS=1 writes each stage record as a JSON line to the "finance_insight.stages" logger
+
+TRACE_MEMORY = os.environ.get("FINANCE_TRACE_MEMORY") != "0"
+STRUCTURED_LOGS = os.environ.get("FINANCE_STRUCTURED_LOGS") == "1"
+
+stage_logger = logging.getLogger("finance_insight.stages")
+if STRUCTURED_LOGS and not stage_logger.handlers:
+    # One JSON object per line on stderr unless the app configures its own handler
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    stage_logger.addHandler(_handler)
+    stage_logger.setLevel(logging.INFO)
+
+
+# Peak resident memory of the process in MB (ru_maxrss is KB on Linux, bytes on macOS)
+def _max_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def _round(mb):
+    return round(mb, 1) if mb is not None else None
+
+
+# tracemalloc is process-wide - stages tracing on several threads share one trace, started by the first of them and
+# stopped by the last. The peak is only reset while a single stage traces, so no stage wipes another one's peak
+_trace_lock = threading.Lock()
+_tracers = 0
+_owns_trace = False
+
+
+# Traced bytes when the stage starts
+def _begin_trace():
+    global _tracers, _owns_trace
+    with _trace_lock:
+        if _tracers == 0:
+            # Someone else's trace (e.g. the benchmarks) is left running
+            _owns_trace = not tracemalloc.is_tracing()
+            if _owns_trace:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        _tracers += 1
+        return tracemalloc.get_traced_memory()[0]
+
+
+# Peak traced MB above where the stage started
+def _end_trace(start):
+    global _tracers
+    with _trace_lock:
+        peak = tracemalloc.get_traced_memory()[1] - start
+        _tracers -= 1
+        if _tracers == 0 and _owns_trace:
+            tracemalloc.stop()
+        return max(peak, 0) / 2 ** 20
+
+
+# (rows, cols) of the first frame / series in a stage's input or output
+def frame_shape(value):
+    if isinstance(value, (tuple, list)):
+        value = next((item for item in value if isinstance(item, (pd.DataFrame, pd.Series))), None)
+    if isinstance(value, pd.DataFrame):
+        return value.shape
+    if isinstance(value, pd.Series):
+        return len(value), 1
+    return None, None
+
+
+class StageRecorder:
+    def __init__(self, trace_memory=None, structured_logs=None):
+        self.trace_memory = TRACE_MEMORY if trace_memory is None else trace_memory
+        self.structured_logs = STRUCTURED_LOGS if structured_logs is None else structured_logs
+        self.records = []
+
+    # Run one stage and record it - frame_in is what the stage reads, the stage's return value is its output
+    def run(self, name, compute, frame_in=None):
+        traced_start = _begin_trace() if self.trace_memory else None
+        rss_before = _max_rss_mb()
+        traced_peak = None
+        start = time.perf_counter()
+        try:
+            result = compute()
+            seconds = time.perf_counter() - start
+        finally:
+            if self.trace_memory:
+                traced_peak = _end_trace(traced_start)
+        rss_after = _max_rss_mb()
+
+        rows_in, cols_in = frame_shape(frame_in)
+        rows_out, cols_out = frame_shape(result)
+        self.record({
+            "stage": name,
+            "seconds": round(seconds, 4),
+            "rows_in": rows_in,
+            "cols_in": cols_in,
+            "rows_out": rows_out,
+            "cols_out": cols_out,
+            "peak_traced_mb": _round(traced_peak),
+            "rss_high_water_growth_mb": _round(rss_after - rss_before) if rss_after is not None else None,
+        })
+        return result
+
+    def record(self, record):
+        self.records.append(record)
+        if self.structured_logs:
+            stage_logger.info(json.dumps(record))
+
+
+# Profiling time per column, slowest first (profiles carry their own "seconds")
+def column_costs(profiles):
+    costs = {col: round(profile.get("seconds", 0.0), 4) for col, profile in profiles.items()}
+    return dict(sorted(costs.items(), key=lambda item: -item[1]))
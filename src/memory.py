@@ -0,0 +1,216 @@
+import os
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Per-session memory budget
+# Frames share column buffers (copy-on-write), so memory is counted per buffer rather than per frame. When a session's
+# frames go over the budget, its pipeline drops the intermediate stage frames and the raw frame - only needed for the
+# side-by-side view and the change diff - is spilled to a Parquet file and read back a window of rows at a time.
+# FINANCE_SESSION_MEMORY_MB=0 turns the budget off
+
+SESSION_MEMORY_BUDGET = int(os.environ.get("FINANCE_SESSION_MEMORY_MB", "1024")) * 1024 * 1024
+SPILL_DIR = os.environ.get("FINANCE_SPILL_DIR", os.path.join(tempfile.gettempdir(), "finance-insight-spill"))
+SPILL_ROW_GROUP_SIZE = 50_000
+
+
+# Copy-on-write: frames derived from one another share column buffers until a column is replaced, so the raw frame,
+# every stage's output and the clean frame only hold the columns cleaning actually changed.
+# Set by the entry points (app pages, headless, benchmarks) - cleaning gives the same results without it
+def share_column_buffers():
+    pd.set_option("mode.copy_on_write", True)
+
+
+# Identity of the buffer behind a column - views of the same array count once
+def _buffer_key(series):
+    values = series.array
+    for attr in ["_ndarray", "codes", "_data"]:
+        data = getattr(values, attr, None)
+        if isinstance(data, np.ndarray):
+            return data.__array_interface__["data"][0], data.nbytes
+    return id(values)
+
+
+def _columns(frame):
+    if isinstance(frame, pd.Series):
+        return [frame]
+    if isinstance(frame, pd.DataFrame):
+        return [series for _, series in frame.items()]
+    return []
+
+
+# Bytes held by the frames / series, buffers and indexes shared between them counted once (spilled frames count
+# nothing). Buffers and indexes of the exclude frames aren't counted at all
+def frame_memory(*frames, exclude=()):
+    seen = {_buffer_key(series) for frame in exclude for series in _columns(frame)}
+    seen |= {id(frame.index) for frame in exclude if isinstance(frame, (pd.DataFrame, pd.Series))}
+    total = 0
+    for frame in frames:
+        if not isinstance(frame, (pd.DataFrame, pd.Series)):
+            continue
+        for series in _columns(frame):
+            key = _buffer_key(series)
+            if key not in seen:
+                seen.add(key)
+                total += series.memory_usage(index=False, deep=True)
+        if id(frame.index) not in seen:
+            seen.add(id(frame.index))
+            total += frame.index.memory_usage(deep=True)
+    return total
+
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _remove_all(paths):
+    for path in paths:
+        _remove(path)
+
+
+# A frame kept on disk - row groups are read back for the rows asked for, the index stays in memory.
+# Frames cleaned in chunks are spilled a chunk at a time with append(), one file per chunk, so the whole frame is
+# never in memory
+class SpilledFrame:
+    def __init__(self, df=None, spill_dir=SPILL_DIR):
+        os.makedirs(spill_dir, exist_ok=True)
+        self.spill_dir = spill_dir
+        # (path, rows, dtypes) of every part
+        self.parts = []
+        self.index = None
+        # The files go away with the last reference to the frame
+        self._paths = []
+        self._finalizer = weakref.finalize(self, _remove_all, self._paths)
+        if df is not None:
+            self.append(df)
+
+    def append(self, df):
+        fd, path = tempfile.mkstemp(dir=self.spill_dir, suffix=".parquet")
+        os.close(fd)
+        try:
+            df.to_parquet(path, index=False, row_group_size=SPILL_ROW_GROUP_SIZE)
+        except Exception:
+            # Columns Arrow can't store (mixed object values) - pickled, and read back whole
+            _remove(path)
+            path = path[:-len(".parquet")] + ".pkl"
+            df.to_pickle(path)
+
+        self.parts.append((path, len(df), df.dtypes))
+        self._paths.append(path)
+        self.index = df.index if self.index is None else self.index.append(df.index)
+        self.columns = df.columns
+        self.shape = (len(self.index), len(self.columns))
+        return self
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _part(self, i):
+        path, _, dtypes = self.parts[i]
+        if path.endswith(".pkl"):
+            return pd.read_pickle(path)
+        return self._restore(pd.read_parquet(path), dtypes)
+
+    # The frame a part at a time, each with its rows' index
+    def iter_parts(self):
+        start = 0
+        for i, (_, rows, _) in enumerate(self.parts):
+            yield self._part(i).set_axis(self.index[start:start + rows])
+            start += rows
+
+    def load(self):
+        df = pd.concat([self._part(i) for i in range(len(self.parts))]) if len(self.parts) > 1 else self._part(0)
+        return df.set_axis(self.index)
+
+    # Rows at these positions, read from the row groups that hold them
+    def take(self, positions):
+        positions = np.asarray(positions, dtype="int64")
+        starts = np.cumsum([0] + [rows for _, rows, _ in self.parts])
+        part_of = np.searchsorted(starts, positions, side="right") - 1
+        order = np.argsort(part_of, kind="stable")
+        frames = [self._take_part(i, positions[part_of == i] - starts[i]) for i in np.unique(part_of)]
+        if not frames:
+            return self._take_part(0, positions).set_axis(self.index[:0])
+        df = pd.concat(frames) if len(frames) > 1 else frames[0]
+        return df.iloc[np.argsort(order)].set_axis(self.index[positions])
+
+    def _take_part(self, i, positions):
+        path, _, dtypes = self.parts[i]
+        if path.endswith(".pkl"):
+            return pd.read_pickle(path).iloc[positions]
+
+        import pyarrow.parquet as pq
+
+        groups = np.unique(positions // SPILL_ROW_GROUP_SIZE)
+        table = pq.ParquetFile(path).read_row_groups(groups.tolist())
+        # Every row group but the last is full, so a row's place in the table follows from its group's rank
+        local = np.searchsorted(groups, positions // SPILL_ROW_GROUP_SIZE) * SPILL_ROW_GROUP_SIZE
+        local += positions % SPILL_ROW_GROUP_SIZE
+        return self._restore(table.take(local).to_pandas(), dtypes)
+
+    # Parquet gives object columns back typed (floats, or None for missing text) - back to what the frame held
+    @staticmethod
+    def _restore(df, dtypes):
+        for col in df.columns[dtypes == object]:
+            if df[col].dtype != object:
+                df[col] = df[col].astype(object)
+            elif df[col].hasnans:
+                df[col] = df[col].fillna(np.nan)
+        return df
+
+    # DataFrame.reindex() for the rows on screen
+    def reindex(self, labels):
+        if not self.index.is_unique:
+            return self.load().reindex(labels)
+        positions = self.index.get_indexer(labels)
+        return self.take(positions[positions >= 0]).reindex(labels)
+
+    # Lets the disk cache store a spilled frame like any other - a part at a time when the parts share one schema
+    # and the index is the default one (what read_parquet() gives back)
+    def to_parquet(self, path, **kwargs):
+        import pyarrow.parquet as pq
+
+        paths = [part[0] for part in self.parts]
+        if len(paths) > 1 and self.index.equals(pd.RangeIndex(len(self))) and not any(p.endswith(".pkl") for p in paths):
+            schema = pq.read_schema(paths[0])
+            if all(pq.read_schema(part).equals(schema, check_metadata=False) for part in paths[1:]):
+                with pq.ParquetWriter(path, schema) as writer:
+                    for part in paths:
+                        writer.write_table(pq.read_table(part))
+                return
+        self.load().to_parquet(path, **kwargs)
+
+    def to_pickle(self, path, **kwargs):
+        self.load().to_pickle(path, **kwargs)
+
+
+# The in-memory frame, reading it back if it was spilled
+def materialize(df):
+    return df.load() if isinstance(df, SpilledFrame) else df
+
+
+# Keep a session within its budget - returns raw_df, spilled to disk if the session's frames were over budget.
+# The pipeline (single file or batch) drops its intermediate frames and keeps the spilled raw frame instead.
+# Frames shared with other sessions (dataset store) count in equal parts against every session sharing them, a shared
+# raw frame is spilled in the store - for all of them. extra_bytes is anything else the session keeps (e.g. a prepared
+# export)
+def enforce_memory_budget(pipeline, raw_df, clean_df, budget=SESSION_MEMORY_BUDGET, extra_bytes=0):
+    if not budget:
+        return raw_df
+    held = pipeline.held_frames() if pipeline is not None else []
+    shared = pipeline.shared_frames() if pipeline is not None else []
+    used = frame_memory(raw_df, clean_df, *held, exclude=[frame for frames, _ in shared for frame in frames])
+    used += sum(frame_memory(*frames) / sharers for frames, sharers in shared) + extra_bytes
+    if used <= budget:
+        return raw_df
+
+    # A raw frame already on disk (spilled, streamed, or a batch's) leaves the pipeline's own frames to trim
+    if pipeline is None:
+        return raw_df if isinstance(raw_df, SpilledFrame) else SpilledFrame(raw_df)
+    if not isinstance(raw_df, SpilledFrame):
+        raw_df = pipeline.spill_raw(raw_df)
+    pipeline.trim(raw_df)
+    return raw_df
@@ -0,0 +1,176 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.workers import MAX_WORKERS, worker_map
+
+# Column-parallel preprocessing
+# Column profiling (datetime parsing, numeric coercion) and fill statistics are independent per column, so big frames
+# send them to the shared worker pool. Column values travel through shared memory - text columns as Arrow string
+# buffers (offsets + utf-8 bytes), float columns as raw float64 - instead of being pickled per task.
+# Columns are rebuilt exactly as they were, so every result matches the serial path
+
+PARALLEL_MIN_CELLS = 1_000_000
+
+
+def use_parallel(n_rows, n_cols, workers=None):
+    workers = min(workers or MAX_WORKERS, MAX_WORKERS)
+    return workers > 1 and n_cols > 1 and n_rows * n_cols >= PARALLEL_MIN_CELLS
+
+
+def _null_kind(series, isna):
+    if not isna.any():
+        return None
+    nulls = series[isna]
+    if all(value is None for value in nulls):
+        return "none"
+    if all(isinstance(value, float) for value in nulls):
+        return "nan"
+    return "mixed"
+
+
+# Arrow string buffers of a text column, or None when it holds anything else (numbers, dates, bytes...)
+def _string_buffers(series):
+    import pyarrow as pa
+
+    try:
+        array = pa.array(series, from_pandas=True)
+    except (pa.ArrowException, TypeError, ValueError):
+        return None
+    if array.type != pa.string():
+        return None
+    validity, offsets, data = array.buffers()
+    return array, validity, offsets, data
+
+
+# Copy a column into a shared memory block - returns (handle, block), or (series, None) when it has to be pickled
+def share_column(series):
+    values = series.to_numpy()
+    handle = {"name": series.name, "length": len(series)}
+
+    if series.dtype == "float64":
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype="float64", buffer=block.buf)[:] = values
+        handle.update(kind="float64", block=block.name)
+        return handle, block
+
+    if series.dtype != "object":
+        return series, None
+
+    null_kind = _null_kind(series, series.isna().to_numpy())
+    buffers = _string_buffers(series) if null_kind != "mixed" else None
+    if buffers is None:
+        return series, None
+
+    array, validity, offsets, data = buffers
+    parts = [offsets, data] + ([validity] if validity is not None else [])
+    block = shared_memory.SharedMemory(create=True, size=max(sum(part.size for part in parts), 1))
+    position = 0
+    sizes = []
+    for part in parts:
+        block.buf[position:position + part.size] = memoryview(part).cast("B")
+        position += part.size
+        sizes.append(part.size)
+    handle.update(kind="string", block=block.name, sizes=sizes, null_count=array.null_count, null_kind=null_kind)
+    return handle, block
+
+
+# Rebuild a shared column as a pandas Series (RangeIndex) - pickled series are returned as they are
+def attach_column(handle):
+    if isinstance(handle, pd.Series):
+        return handle.reset_index(drop=True)
+
+    block = shared_memory.SharedMemory(name=handle["block"])
+    try:
+        if handle["kind"] == "float64":
+            values = np.ndarray(handle["length"], dtype="float64", buffer=block.buf).copy()
+        else:
+            values = _read_strings(block, handle)
+    finally:
+        block.close()
+    return pd.Series(values, name=handle["name"])
+
+
+def _read_strings(block, handle):
+    import pyarrow as pa
+
+    position = 0
+    parts = []
+    for size in handle["sizes"]:
+        parts.append(pa.py_buffer(bytes(block.buf[position:position + size])))
+        position += size
+    offsets, data = parts[0], parts[1]
+    validity = parts[2] if len(parts) > 2 else None
+
+    array = pa.Array.from_buffers(pa.string(), handle["length"], [validity, offsets, data],
+                                  null_count=handle["null_count"])
+    values = array.to_numpy(zero_copy_only=False)
+    if handle["null_kind"] == "nan":
+        values[array.is_null().to_numpy(zero_copy_only=False)] = np.nan
+    return values
+
+
+def _release(blocks):
+    for block in blocks:
+        if block is not None:
+            block.close()
+            block.unlink()
+
+
+# Run fn(column, *args) for every column on the pool, results in column order
+def map_columns(fn, columns, args_per_column, workers=None):
+    shared = [share_column(series) for series in columns]
+    try:
+        return list(worker_map(fn, [handle for handle, _ in shared], *zip(*args_per_column), workers=workers))
+    finally:
+        _release(block for _, block in shared)
+
+
+def _profile_task(handle, numeric_threshold, schema, native_types, remembered):
+    from src.preprocess import (
+        timed_profile_column, remembered_datetime_format, _forget_datetime_format, _remember_datetime_format,
+    )
+
+    series = attach_column(handle)
+    # The worker starts from the caller's remembered datetime format (not one left over from an earlier task),
+    # and reports back what it remembers now
+    if remembered is None:
+        _forget_datetime_format((series.name, schema))
+    else:
+        _remember_datetime_format((series.name, schema), remembered)
+    profile = timed_profile_column(series, numeric_threshold, schema, native_types)
+    return profile, remembered_datetime_format(series.name, schema)
+
+
+# profile_columns() with the columns spread over the worker pool
+def profile_columns_parallel(df, cols, numeric_threshold, schema, native_types, workers=None):
+    from src.preprocess import remembered_datetime_format, _forget_datetime_format, _remember_datetime_format
+
+    args = [(numeric_threshold, schema, native_types, remembered_datetime_format(col, schema)) for col in cols]
+    results = map_columns(_profile_task, [df[col] for col in cols], args, workers)
+
+    profiles = {}
+    for col, (profile, remembered) in zip(cols, results):
+        # Profiled series come back with a RangeIndex
+        for name in ["datetime", "numeric", "percent"]:
+            if profile[name] is not None:
+                profile[name].index = df.index
+        profiles[col] = profile
+
+        if remembered is None:
+            _forget_datetime_format((col, schema))
+        else:
+            _remember_datetime_format((col, schema), remembered)
+    return profiles
+
+
+def _fill_value_task(handle, col_type):
+    from src.preprocess import column_fill_value
+    return column_fill_value(attach_column(handle), col_type)
+
+
+# column_fill_value() for every column in cols, on the worker pool
+def fill_values_parallel(df, cols, column_types, workers=None):
+    values = map_columns(_fill_value_task, [df[col] for col in cols], [(column_types[col],) for col in cols], workers)
+    return dict(zip(cols, values))
@@ -0,0 +1,231 @@
+import pandas as pd
+
+from src.cache import cache_key, file_hash, load_cached, store_cached
+from src.columnar import is_columnar, to_arrow_dtypes
+from src.dataset_store import dataset_store
+from src.instrument import StageRecorder, column_costs
+from src.memory import SpilledFrame
+from src.streaming import preprocess_chunked, scan_statistics
+from src.preprocess import (
+    APPROX_QUANTILE_SAMPLE_SIZE,
+    load_dataframe,
+    drop_sparse_columns,
+    profile_columns,
+    number_parse_log,
+    apply_datetime_profiles,
+    drop_duplicate_rows,
+    convert_erroneous_numeric_columns,
+    detect_column_types,
+    fill_nan_cells,
+    iqr_outliers,
+    outlier_log,
+    keep_rows,
+    compact_dtypes,
+    summarize_value_counts,
+)
+
+# Staged preprocessing pipeline
+# load → profile → dedup → coerce → type → fill → outlier-mask, the output of every stage is kept
+# so changing a downstream option (e.g. remove_outliers) never recomputes the stages before it.
+# Chunked CSVs keep their streaming statistics (the first two passes over the file) the same way
+
+STAGES = ["load", "profile", "dedup", "coerce", "type", "fill", "outlier_mask"]
+
+
+class PreprocessPipeline:
+    # workers only changes how fast the stages run, not their results, so it isn't part of the cache key.
+    # content_hash is the file's file_hash() when the caller already has it
+    def __init__(self, file, chunksize=None, sheets=None, workers=None, content_hash=None):
+        self.file = file
+        self.chunksize = chunksize
+        self.sheets = list(sheets) if sheets else None
+        self.workers = workers
+        self.content_hash = content_hash or file_hash(file)
+        self._results = {}
+        self._records = {}
+        self._handle = None
+
+    # Run a stage once and keep its output, with the timing / memory record of that run
+    # key tells apart runs of one stage with different options (defaults to the stage name)
+    def _stage(self, name, compute, key=None):
+        key = key or name
+        if key not in self._results:
+            recorder = StageRecorder()
+            self._results[key] = recorder.run(name, compute)
+            self._records[key] = recorder.records[0]
+        return self._results[key]
+
+    def _load(self):
+        def compute():
+            self.file.seek(0)
+            df = load_dataframe(self.file, self.sheets)
+            raw_df = df.copy(deep=False)
+            df, dropped = drop_sparse_columns(df)
+            return raw_df, df, dropped
+        return self._stage("load", compute)
+
+    def _profile(self):
+        def compute():
+            _, df, _ = self._load()
+            profiles = profile_columns(df, native_types=is_columnar(self.file.name), workers=self.workers)
+            return apply_datetime_profiles(df.copy(deep=False), profiles), profiles
+        return self._stage("profile", compute)
+
+    def _dedup(self):
+        return self._stage("dedup", lambda: drop_duplicate_rows(self._profile()[0]))
+
+    def _coerce(self):
+        def compute():
+            df, _ = self._dedup()
+            return convert_erroneous_numeric_columns(df, threshold=0.7, profiles=self._profile()[1])
+        return self._stage("coerce", compute)
+
+    def _type(self):
+        return self._stage("type", lambda: detect_column_types(self._coerce(), profiles=self._profile()[1]))
+
+    # (filled frame, fill value per filled column)
+    def _fill(self):
+        def compute():
+            column_types, df = self._type()
+            return fill_nan_cells(df, column_types, workers=self.workers)
+        return self._stage("fill", compute)
+
+    # (mask, per-column bounds) - one per outlier method (and exact / approximate quartiles), switching back and forth
+    # reuses them
+    def _outlier_mask(self, method, approximate=False):
+        return self._stage("outlier_mask", lambda: iqr_outliers(self._fill()[0], self._type()[0], method, approximate),
+                           key=("outlier_mask", method, approximate))
+
+    # Run every stage up to the final frame, reusing whatever was already computed
+    def _compute(self, remove_outliers, arrow_dtypes, outlier_method, approximate_quantiles=False):
+        # Chunks are filtered with bounds from the whole file - always the independent method
+        if self.chunksize and self.file.name.endswith(".csv"):
+            statistics = self._stage("statistics", lambda: scan_statistics(self.file, self.chunksize))
+            raw_df, df, column_types, logs = preprocess_chunked(self.file, remove_outliers=remove_outliers,
+                                                                chunksize=self.chunksize, statistics=statistics)
+            if arrow_dtypes:
+                df = to_arrow_dtypes(df)
+            return raw_df, df, column_types, logs
+
+        # Stages run in order, so each one's record only covers its own work
+        for stage in [self._load, self._profile, self._dedup, self._coerce, self._type, self._fill]:
+            stage()
+        if remove_outliers:
+            self._outlier_mask(outlier_method, approximate_quantiles)
+
+        raw_df, _, dropped = self._load()
+        _, duplicates_removed = self._dedup()
+        column_types, _ = self._type()
+        df, fill_values = self._fill()
+
+        logs = {
+            "dropped_columns": dropped,
+            "duplicates_removed": duplicates_removed,
+            "outliers_removed": 0,
+            "fill_values": fill_values,
+        }
+        recorder = StageRecorder()
+
+        # Toggling outlier removal only applies or drops the stored mask
+        if remove_outliers:
+            mask, outlier_columns = self._outlier_mask(outlier_method, approximate_quantiles)
+            df = recorder.run("outliers", lambda: keep_rows(df, mask), df)
+            logs["outliers_removed"] = int((~mask).sum())
+            sampled = approximate_quantiles and len(mask) > APPROX_QUANTILE_SAMPLE_SIZE
+            logs["outliers"] = outlier_log(outlier_method, outlier_columns, approximate=sampled)
+
+        df = recorder.run("compact", lambda: compact_dtypes(df, column_types), df)
+        logs["value_counts"] = summarize_value_counts(df, column_types)
+        if arrow_dtypes:
+            df = recorder.run("arrow_dtypes", lambda: to_arrow_dtypes(df), df)
+
+        records = [self._records[name] for name in STAGES[:-1]]
+        if remove_outliers:
+            records.append(self._records[("outlier_mask", outlier_method, approximate_quantiles)])
+        logs["stages"] = records + recorder.records
+        logs["column_costs"] = column_costs(self._profile()[1])
+        logs["number_parsing"] = number_parse_log(self._profile()[1], column_types)
+        return raw_df, df, column_types, logs
+
+    # Same return values as preprocess(), shared with other sessions through the dataset store and served from
+    # the disk cache when this file + options were seen before
+    def result(self, remove_outliers=True, arrow_dtypes=False, outlier_method="sequential", approximate_quantiles=False):
+        options = {"remove_outliers": remove_outliers}
+        if arrow_dtypes:
+            options["arrow_dtypes"] = True
+        if remove_outliers and outlier_method != "sequential":
+            options["outlier_method"] = outlier_method
+        if remove_outliers and approximate_quantiles:
+            options["approximate_quantiles"] = True
+        if self.chunksize:
+            options["chunksize"] = self.chunksize
+        if self.sheets:
+            options["sheets"] = self.sheets
+        key = cache_key(self.content_hash, options)
+        if self._handle is not None and self._handle.key == key:
+            return self._handle.result
+
+        def compute():
+            cached = load_cached(key)
+            if cached is not None:
+                return cached
+            result = self._compute(remove_outliers, arrow_dtypes, outlier_method, approximate_quantiles)
+            store_cached(key, result)
+            return result
+
+        # The session keeps one reference, to the result it shows
+        handle = dataset_store.acquire(key, compute)
+        if self._handle is not None:
+            self._handle.release()
+        self._handle = handle
+        return handle.result
+
+    # (frames, number of sessions sharing them) for the result shared through the dataset store - the session memory
+    # budget charges this session its part
+    def shared_frames(self):
+        if self._handle is None:
+            return []
+        return [([frame for frame in self._handle.result[:2] if isinstance(frame, pd.DataFrame)], self._handle.sharers)]
+
+    # raw_df on disk - the shared result's raw frame is spilled in the dataset store, for every session holding it
+    def spill_raw(self, raw_df):
+        if self._handle is not None and raw_df is self._handle.result[0]:
+            return self._handle.spill_raw()
+        return SpilledFrame(raw_df)
+
+    # Frames and series the stored stage results hold (for the session memory budget)
+    def held_frames(self):
+        held = []
+        for result in self._results.values():
+            items = result if isinstance(result, tuple) else [result]
+            for item in items:
+                if isinstance(item, (pd.DataFrame, pd.Series)):
+                    held.append(item)
+                elif isinstance(item, dict):
+                    # Profiles keep the parsed datetime / numeric series of every object column
+                    held += [value for profile in item.values() if isinstance(profile, dict)
+                             for value in profile.values() if isinstance(value, pd.Series)]
+        return held
+
+    # Drop the intermediate frames once the fill stage has run - later result() calls only read the filled frame,
+    # the outlier mask and a few small values. raw_df replaces the kept raw frame (e.g. with its spilled copy),
+    # spill=True spills the kept raw frame itself, and the shared result's raw frame in the dataset store
+    def trim(self, raw_df=None, spill=False):
+        if spill and self._handle is not None:
+            self._handle.spill_raw()
+        if "fill" not in self._results:
+            return
+        raw, _, dropped = self._load()
+        if raw_df is None and spill and not isinstance(raw, SpilledFrame):
+            raw_df = SpilledFrame(raw)
+        profiles = self._profile()[1]
+        column_types = self._type()[0]
+
+        self._results["load"] = (raw if raw_df is None else raw_df, None, dropped)
+        # column_costs() and number_parse_log() only read the profiling time and the number format
+        self._results["profile"] = (None, {col: {"seconds": profile.get("seconds", 0.0),
+                                                 "number_format": profile.get("number_format")}
+                                           for col, profile in profiles.items()})
+        self._results["dedup"] = (None, self._dedup()[1])
+        self._results["coerce"] = None
+        self._results["type"] = (column_types, None)
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from src.downsample import POINT_BUDGET, lttb_indices, minmax_indices, density_sample_indices
+from src.rollup import build_daily_rollup, rollup_series
+from src.stats_store import DatasetStats
+from src.text_index import build_term_index, top_terms
+
+# Figure builders for the plot specs stored in st.session_state["plots"]
+# Each builder returns (subheader, fig, note) - subheader is None when the title lives inside the figure,
+# note says how many points are drawn when the data was downsampled
+
+
+# Intermediate data (rollups, indexes...) from the dataset's cache when one is given
+def _derived(derived, key, build):
+    if derived is None:
+        return build()
+    return derived.get_or_build(key, build)
+
+
+# Value counts, correlations and crosstabs from the dataset's statistics store when one is given
+def _stats(df, stats):
+    return stats if stats is not None else DatasetStats(df)
+
+
+def _points_note(shown, total):
+    return f"Showing {shown:,} of {total:,} points"
+
+
+# x values for series plots - the index when it is numeric, row positions otherwise
+def _series_x(index):
+    if pd.api.types.is_numeric_dtype(index):
+        return index.to_numpy(dtype="float64")
+    return np.arange(len(index), dtype="float64")
+
+
+# Line traces are downsampled one by one with LTTB, so every series keeps its own shape
+def _downsampled_lines(df, cols, point_budget):
+    per_col = max(point_budget // len(cols), 3)
+    frames = []
+    for col in cols:
+        series = df[col].dropna()
+        keep = lttb_indices(_series_x(series.index), series.to_numpy(dtype="float64"), per_col)
+        frames.append(pd.DataFrame({"index": series.index[keep], "Variable": col, "Value": series.to_numpy()[keep]}))
+    return pd.concat(frames, ignore_index=True)
+
+
+# Areas are stacked on a shared x, so rows are picked by min/max buckets per column and the union is drawn
+def _downsampled_area_rows(df, cols, point_budget):
+    per_col = max(point_budget // len(cols) ** 2, 4)
+    keep = np.unique(np.concatenate([
+        minmax_indices(df[col].fillna(0).to_numpy(dtype="float64"), per_col) for col in cols
+    ]))
+    return df.iloc[keep]
+
+
+def _numeric_figure(df, plot_data, colors, point_budget, derived, stats):
+    cols = plot_data["columns"]
+    plot = plot_data["plot"]
+
+    if plot == "Histogram" and len(cols) == 1:
+        fig = px.histogram(df, x=cols[0], nbins=30, color_discrete_sequence=colors)
+        return f"🔸 Histogram of {cols[0]}", fig, None
+
+    elif plot == "Box Plot":
+        fig = px.box(df, y=cols, color_discrete_sequence=colors)
+        return f"🔸 Box Plot of {', '.join(cols)}", fig, None
+
+    elif plot == "Line Plot":
+        total = len(df) * len(cols)
+        if total > point_budget:
+            # Large series are thinned to the budget and drawn with WebGL
+            melted = _downsampled_lines(df, cols, point_budget)
+            note = _points_note(len(melted), total)
+        else:
+            melted = df[cols].reset_index().melt(id_vars="index", var_name="Variable", value_name="Value")
+            note = None
+        fig = px.line(melted, x="index", y="Value", color="Variable",
+                      color_discrete_sequence=colors, render_mode="webgl" if note else "auto")
+        return f"🔸 Line Plot of {', '.join(cols)}", fig, note
+
+    elif plot == "Scatter Plot" and len(cols) == 2:
+        points, note = df, None
+        if len(df) > point_budget:
+            points = df.iloc[density_sample_indices(df[cols].to_numpy(dtype="float64"), point_budget)]
+            note = _points_note(len(points), len(df))
+        fig = px.scatter(points, x=cols[0], y=cols[1], color_discrete_sequence=colors,
+                         render_mode="webgl" if note else "auto")
+        return f"🔸 Scatter Plot: {cols[0]} vs {cols[1]}", fig, note
+
+    elif plot == "Correlation Heatmap":
+        corr = _stats(df, stats).correlation(cols)
+        fig = px.imshow(corr, text_auto=True, color_continuous_scale="RdBu_r")
+        return "🔸 Correlation Heatmap", fig, None
+
+    elif plot == "Pair Plot":
+        # Every row is drawn once per panel, so the budget is shared between the panels
+        rows_budget = max(point_budget // len(cols) ** 2, 1)
+        points, note = df, None
+        if len(df) > rows_budget:
+            keep = density_sample_indices(df[cols].to_numpy(dtype="float64"), rows_budget, bins=8)
+            points = df.iloc[keep]
+            note = _points_note(len(points), len(df)) + " per panel"
+        fig = px.scatter_matrix(points, dimensions=cols, color_discrete_sequence=colors)
+        return "🔸 Pair Plot", fig, note
+
+    elif plot == "Area Plot":
+        rows, note = df, None
+        if len(df) * len(cols) > point_budget:
+            rows = _downsampled_area_rows(df, cols, point_budget)
+            note = _points_note(len(rows) * len(cols), len(df) * len(cols))
+        melted = rows[cols].reset_index().melt(id_vars="index", var_name="Variable", value_name="Value")
+        fig = px.area(melted, x="index", y="Value", color="Variable",
+                      color_discrete_sequence=colors)
+        return f"🔸 Area Plot of {', '.join(cols)}", fig, note
+
+    return None, None, None
+
+
+def _categorical_figure(df, plot_data, colors, point_budget, derived, stats):
+    colname = plot_data["column"]
+    plot_type = plot_data.get("plot", "Bar Plot")
+    value_col = plot_data.get("value_col", None)
+    counts = _stats(df, stats).value_counts(colname).reset_index()
+    counts.columns = [colname, 'count']
+
+    if plot_type == "Bar Plot":
+        fig = px.bar(counts, x=colname, y='count',
+                     color=colname, color_discrete_sequence=colors)
+        return f"🔸 Bar Plot of {colname}", fig, None
+
+    elif plot_type == "Pie Chart":
+        fig = px.pie(counts, names=colname, values='count',
+                     color=colname, color_discrete_sequence=colors, hole=0.4)
+        return f"🔸 Pie Chart of {colname}", fig, None
+
+    elif plot_type == "Treemap" and value_col:
+        fig = px.treemap(df, path=[colname], values=value_col,
+                         color=colname, color_discrete_sequence=colors)
+        return f"🔸 Treemap: {colname} by {value_col}", fig, None
+
+    raise ValueError("⚠️ Missing value column for Treemap.")
+
+
+def _boolean_figure(df, plot_data, colors, point_budget, derived, stats):
+    colname = plot_data["column"]
+    counts = _stats(df, stats).value_counts(colname).reset_index()
+    # Keep 0 and 1 as labels
+    counts.columns = [colname, 'count']
+    counts[colname] = counts[colname].astype(str)  # ensure string labels
+    fig = px.pie(counts, names=colname, values='count',
+                 color=colname, color_discrete_sequence=colors, hole=0.4)
+    return f"🔸 Pie Chart of Boolean Column {colname}", fig, None
+
+
+def _datetime_figure(df, plot_data, colors, point_budget, derived, stats):
+    colname = plot_data["column"]
+    freq = plot_data.get("freq", "ME")
+    agg = plot_data.get("agg", "count")
+    value_col = plot_data.get("value_col", None)
+
+    if agg == "count":
+        value_col = None
+        title = "Count"
+    elif agg in ["sum", "mean", "std"] and value_col:
+        title = f"{agg.title()} of {value_col}"
+    else:
+        raise ValueError("⚠️ Missing value column or invalid aggregation.")
+
+    # Daily rollup is built once per (date, value) column pair and shared by every frequency / aggregation
+    daily = _derived(derived, ("rollup", colname, value_col), lambda: build_daily_rollup(df, colname, value_col))
+    y_col = value_col or "__count"
+    ts = rollup_series(daily, freq, agg).rename(y_col).rename_axis(colname).reset_index()
+
+    fig = px.line(ts, x=colname, y=y_col, markers=True,
+                  title=f"> Time Series ({freq}) – {title}",
+                  labels={y_col: title, colname: "Date"},
+                  color_discrete_sequence=colors)
+    fig.update_layout(xaxis_title="Date", yaxis_title=title, hovermode="x unified")
+    return None, fig, None
+
+
+def _cat_heatmap_figure(df, plot_data, colors, point_budget, derived, stats):
+    row = plot_data["row"]
+    col_ = plot_data["col"]
+    heat_df = _stats(df, stats).crosstab(row, col_)
+    fig = px.imshow(heat_df, text_auto=True, color_continuous_scale="Viridis")
+    return f" 🔸Heatmap: {row} × {col_}", fig, None
+
+
+def _text_figure(df, plot_data, colors, point_budget, derived, stats):
+    colname = plot_data["column"]
+    top_n = plot_data["top_n"]
+    # Term index is built once per column, changing Top N only reads from it
+    index = _derived(derived, ("terms", colname), lambda: build_term_index(df[colname]))
+    freq_df = top_terms(index, top_n)
+    fig = px.bar(freq_df, x='Word', y='Frequency', color='Word',
+                 color_discrete_sequence=colors)
+    return f"🔸 Word Frequency for {colname}", fig, None
+
+
+FIGURE_BUILDERS = {
+    "numeric": _numeric_figure,
+    "categorical": _categorical_figure,
+    "boolean": _boolean_figure,
+    "datetime": _datetime_figure,
+    "cat_heatmap": _cat_heatmap_figure,
+    "text": _text_figure,
+}
+
+
+# Build the figure for one plot spec
+# derived is an optional cache (FigureCache) for intermediate data of this dataset, shared between plots, stats the
+# dataset's DatasetStats - kept apart, so statistics seeded from preprocessing are never evicted by rollups
+# Returns (None, None, None) for column/plot combinations that have nothing to draw, raises ValueError for invalid specs
+def build_figure(df, plot_data, colors, point_budget=POINT_BUDGET, derived=None, stats=None):
+    builder = FIGURE_BUILDERS.get(plot_data["type"])
+    if builder is None:
+        return None, None, None
+    return builder(df, plot_data, colors, point_budget, derived, stats)
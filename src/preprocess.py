@@ -1,35 +1,114 @@
 import pandas as pd
+import numpy as np
 import warnings
 import re
+import threading
+import time
+
+from src.columnar import is_columnar, read_columnar, to_arrow_dtypes
+from src.excel import is_excel, read_sheets, combine_sheets
+from src.finance_numbers import parse_finance_numbers
+from src.instrument import StageRecorder, column_costs
+from src.parallel import use_parallel, profile_columns_parallel, fill_values_parallel, _string_buffers
 
 # Suppress specific datetime parsing warnings globally
 warnings.filterwarnings("ignore", message="Could not infer format.*")
 
 # Datetime parser(converting common_formats into datetime datatype) 
-def safe_parse_datetime_column(series):
-    sample = series.dropna().astype(str)
-    if sample.empty:
+COMMON_DATETIME_FORMATS = [
+    "%Y-%m-%d", "%d-%m-%Y", "%m-%d-%Y",
+    "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d",
+    "%Y-%m", "%Y/%m",
+    "%b %Y", "%B %Y",
+    "%d %b %Y", "%d %B %Y",
+    "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y",
+]
+
+# Formats are scored on this many values spread evenly over the column, only the winner is applied to the full column
+DATETIME_SAMPLE_SIZE = 200
+
+# Winning format per (column name, schema) - later uploads with the same layout skip detection entirely.
+# Columns are profiled on batch threads, so changes go through the lock
+DATETIME_REGISTRY_SIZE = 1024
+_datetime_format_registry = {}
+_datetime_format_lock = threading.Lock()
+
+
+def _stratified_sample(values, size=DATETIME_SAMPLE_SIZE):
+    if len(values) <= size:
+        return values
+    positions = np.linspace(0, len(values) - 1, size).astype(int)
+    return values.iloc[positions]
+
+
+def _parse_with_format(series, fmt):
+    try:
+        return pd.to_datetime(series, format=fmt, errors="coerce")
+    except Exception:
+        return None
+
+
+def _remember_datetime_format(key, fmt):
+    if key is None:
+        return
+    with _datetime_format_lock:
+        _datetime_format_registry.pop(key, None)
+        if len(_datetime_format_registry) >= DATETIME_REGISTRY_SIZE:
+            _datetime_format_registry.pop(next(iter(_datetime_format_registry)))
+        _datetime_format_registry[key] = fmt
+
+
+def _forget_datetime_format(key):
+    with _datetime_format_lock:
+        _datetime_format_registry.pop(key, None)
+
+
+# Forget every remembered format (e.g. between benchmark runs, so each starts cold)
+def clear_datetime_formats():
+    with _datetime_format_lock:
+        _datetime_format_registry.clear()
+
+
+# Format that won detection for this column/schema, or None if nothing has been remembered
+def remembered_datetime_format(name, schema):
+    return _datetime_format_registry.get((name, schema))
+
+
+def safe_parse_datetime_column(series, schema=None):
+    non_null = series.dropna()
+    if non_null.empty:
         return pd.Series([pd.NaT] * len(series), index=series.index)
 
-    common_formats = [
-        "%Y-%m-%d", "%d-%m-%Y", "%m-%d-%Y",
-        "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d",
-        "%Y-%m", "%Y/%m",
-        "%b %Y", "%B %Y",
-        "%d %b %Y", "%d %B %Y",
-        "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M:%S",
-        "%Y-%m-%dT%H:%M:%S",
-        "%Y",
-    ]
+    # Sample scores are over non-null values, scale them so they compare against the full-column threshold
+    non_null_fraction = len(non_null) / len(series)
+    key = (series.name, schema) if schema is not None else None
 
-    for fmt in common_formats:
-        try:
-            parsed = pd.to_datetime(series, format=fmt, errors="coerce")
-            if parsed.notna().mean() > 0.7:
-                return parsed
-        except Exception:
+    cached_fmt = _datetime_format_registry.get(key) if key is not None else None
+    if cached_fmt is not None:
+        parsed = _parse_with_format(series, cached_fmt)
+        if parsed is not None and parsed.notna().mean() > 0.7:
+            return parsed
+        _forget_datetime_format(key)
+
+    sample = _stratified_sample(non_null)
+
+    for fmt in COMMON_DATETIME_FORMATS:
+        sample_parsed = _parse_with_format(sample, fmt)
+        if sample_parsed is None or sample_parsed.notna().mean() * non_null_fraction <= 0.7:
             continue
 
+        parsed = _parse_with_format(series, fmt)
+        if parsed is not None and parsed.notna().mean() > 0.7:
+            _remember_datetime_format(key, fmt)
+            return parsed
+
+    # No common format fits - only pay for the format-less parse if the sample suggests it could succeed
+    sample_parsed = pd.to_datetime(sample, errors="coerce")
+    if sample_parsed.notna().mean() * non_null_fraction < 0.5:
+        return pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+
     return pd.to_datetime(series, errors="coerce")
 
 
@@ -51,11 +130,104 @@ def contains_duration_like_phrases(text_series):
     return any(re.search(pat, sample_text) for pat in duration_patterns)
 
 
+BOOLEAN_VALUES = {"true", "false", "yes", "no", 1, 0}
+
+
+# Column Profiler
+# Inspects an object column once and caches everything the later stages need to know about it:
+# parsed datetimes, coerced numbers (with the column's number format and parse counts), boolean/duration flags and
+# cardinality
+# native_types: the file stores numbers and dates natively (Parquet / Arrow), so its text columns are
+# only checked for boolean values, never parsed into dates or numbers
+def profile_column(series, numeric_threshold=0.7, schema=None, native_types=False):
+    profile = {
+        "datetime": None,
+        "numeric": None,
+        "percent": None,
+        "number_format": None,
+        "boolean": False,
+        "duration": False,
+        "nunique": series.nunique(dropna=True),
+    }
+
+    if not native_types:
+        parsed = safe_parse_datetime_column(series, schema)
+        if parsed.notna().mean() >= 0.7:
+            profile["datetime"] = parsed
+            return profile
+
+    lower_series = series.astype(str).str.strip().str.lower()
+    profile["boolean"] = set(lower_series.unique()).issubset(BOOLEAN_VALUES)
+    if native_types:
+        return profile
+
+    profile["duration"] = contains_duration_like_phrases(series)
+    if profile["duration"]:
+        return profile
+
+    # Currency symbols / codes, separators, accounting negatives, % and K/M/B suffixes - values in no known number
+    # form are NaN
+    coerced, is_percent, parse_stats = parse_finance_numbers(series)
+    if coerced.notna().mean() >= numeric_threshold:
+        profile["numeric"] = coerced
+        profile["percent"] = is_percent
+        profile["number_format"] = parse_stats
+    return profile
+
+
+# Profile every object column of df, keyed by column name
+# Big frames are profiled on `workers` processes (default: all cores) - the result is the same as the serial loop
+def profile_columns(df, numeric_threshold=0.7, native_types=False, workers=None):
+    schema = tuple(df.columns)
+    cols = [col for col in df.columns if df[col].dtype == 'object']
+    if use_parallel(len(df), len(cols), workers):
+        return profile_columns_parallel(df, cols, numeric_threshold, schema, native_types, workers)
+    return {
+        col: timed_profile_column(df[col], numeric_threshold, schema, native_types)
+        for col in cols
+    }
+
+
+# profile_column() plus the time it took, kept as profile["seconds"] for the per-column cost log
+def timed_profile_column(series, numeric_threshold=0.7, schema=None, native_types=False):
+    start = time.perf_counter()
+    profile = profile_column(series, numeric_threshold, schema, native_types)
+    profile["seconds"] = time.perf_counter() - start
+    return profile
+
+
+# Number format and parse counts of every text column that became numeric, kept in logs["number_parsing"]
+def number_parse_log(profiles, column_types):
+    return {
+        col: profile["number_format"] for col, profile in profiles.items()
+        if profile.get("number_format") and column_types.get(col) == "numeric"
+    }
+
+
+# Profiles are taken before duplicates are dropped, so line cached series up with the current rows
+def _aligned(profiled, index):
+    if profiled is None or profiled.index.equals(index):
+        return profiled
+    return profiled.reindex(index)
+
+
+def _profile_for(profiles, series, numeric_threshold=0.7):
+    if profiles is not None and series.name in profiles:
+        return profiles[series.name]
+    return profile_column(series, numeric_threshold)
+
+
+
+
+# Lowercase + snake_case column names
+def normalize_column_names(df):
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+    return df
 
 
-# Main Preprocessing Function 
-def preprocess(file, remove_outliers=True):
-    
+# Read the uploaded csv/excel file into a dataframe with normalized column names
+# sheets picks the workbook sheets to read (default: the first one), several sheets are stacked into one frame
+def load_dataframe(file, sheets=None):
     if file.name.endswith(".csv"):
         try:
             df = pd.read_csv(file)
@@ -64,21 +236,25 @@ def preprocess(file, remove_outliers=True):
         except pd.errors.EmptyDataError:
             raise ValueError("The uploaded CSV file contains no data.")
         
-    elif file.name.endswith((".xlsx", ".xlsm", ".xls")):
-        try:
-            df = pd.read_excel(file, engine='openpyxl')
-        except ImportError as e:
-            raise ImportError("Install 'openpyxl' to handle Excel files.") from e
+    elif is_excel(file.name):
+        frames = [(sheet, normalize_column_names(frame)) for sheet, frame in read_sheets(file, sheets)]
+        df = combine_sheets(frames)
+        if df.empty:
+            raise ValueError("The selected sheets contain no data.")
+
+    elif is_columnar(file.name):
+        df = read_columnar(file)
+        if df.empty:
+            raise ValueError("The uploaded file contains no data.")
         
     else:
-        raise ValueError("Unsupported file format. Please upload a .csv or .xlsx file.")
+        raise ValueError("Unsupported file format. Please upload a .csv, Excel, Parquet or Feather file.")
 
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    original_df = df.copy()
+    return normalize_column_names(df)
 
-    logs = {}
 
-    # Drop fully empty cols and those with >= 50% missing
+# Drop fully empty cols and those with >= 50% missing
+def drop_sparse_columns(df):
     before_cols = set(df.columns)
     
     df = df.dropna(axis=1, how="all")
@@ -88,97 +264,141 @@ def preprocess(file, remove_outliers=True):
     after_cols = set(df.columns)
     
     dropped_cols = before_cols - after_cols
-    logs["dropped_columns"] = list(dropped_cols)
+    return df, list(dropped_cols)
 
 
-    # Try parsing object columns as datetime (safely)
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            parsed = safe_parse_datetime_column(df[col])
-            if parsed.notna().mean() > 0.7:
-                df[col] = parsed
+# Convert object columns that parsed as datetime
+def apply_datetime_profiles(df, profiles):
+    for col, profile in profiles.items():
+        parsed = profile["datetime"]
+        if parsed is not None and parsed.notna().mean() > 0.7:
+            df[col] = parsed
+    return df
 
 
-    # Drop duplicates
+# Drop duplicates
+def drop_duplicate_rows(df):
     before_dup = len(df)
     df = df.drop_duplicates()
-    logs["duplicates_removed"] = before_dup - len(df)
+    return df, before_dup - len(df)
+
+
+# Main Preprocessing Function 
+# Pass chunksize to clean large CSVs chunk by chunk (see src/streaming.py) instead of loading them whole
+# The same stages run one at a time, with their results kept, in src/pipeline.py
+# approximate_quantiles=True takes the IQR quartiles of big inputs from a sample of rows (see iqr_outliers())
+def preprocess(file, remove_outliers=True, chunksize=None, sheets=None, arrow_dtypes=False, workers=None,
+               outlier_method="sequential", approximate_quantiles=False):
+
+    # Chunks are filtered with bounds from the whole file - always the independent method
+    if chunksize and file.name.endswith(".csv"):
+        from src.streaming import preprocess_chunked
+        original_df, df, column_types, logs = preprocess_chunked(file, remove_outliers=remove_outliers, chunksize=chunksize)
+        if arrow_dtypes:
+            df = to_arrow_dtypes(df)
+        return original_df, df, column_types, logs
+
+    # Every stage is timed / measured, the records end up in logs["stages"]
+    recorder = StageRecorder()
+
+    df = recorder.run("load", lambda: load_dataframe(file, sheets))
+    original_df = df.copy(deep=False)
+
+    logs = {}
+
+    df, logs["dropped_columns"] = recorder.run("drop_sparse", lambda: drop_sparse_columns(df), df)
+
+
+    # Profile every object column once - the later stages reuse these results instead of re-parsing
+    native_types = is_columnar(file.name)
+    profiles = recorder.run("profile", lambda: profile_columns(df, native_types=native_types, workers=workers), df)
+    df = recorder.run("datetime", lambda: apply_datetime_profiles(df, profiles), df)
+
+
+    df, logs["duplicates_removed"] = recorder.run("dedup", lambda: drop_duplicate_rows(df), df)
 
 
     # Handle mostly-numeric object columns
-    df = convert_erroneous_numeric_columns(df, threshold=0.7)
+    df = recorder.run("coerce", lambda: convert_erroneous_numeric_columns(df, threshold=0.7, profiles=profiles), df)
 
 
     # Detect column types + update df
-    column_types, df = detect_column_types(df)
+    column_types, df = recorder.run("type", lambda: detect_column_types(df, profiles=profiles), df)
 
 
     # Fill NaNs
-    df = fill_nan_cells(df, column_types)
+    df, logs["fill_values"] = recorder.run("fill", lambda: fill_nan_cells(df, column_types, workers=workers), df)
 
 
     # Remove outliers
     if remove_outliers:
-        df, outliers_removed = remove_outliers_iqr(df, column_types)
-        logs["outliers_removed"] = outliers_removed
+        mask, outlier_columns = recorder.run(
+            "outliers", lambda: iqr_outliers(df, column_types, outlier_method, approximate_quantiles), df
+        )
+        df = keep_rows(df, mask)
+        logs["outliers_removed"] = int((~mask).sum())
+        sampled = approximate_quantiles and len(mask) > APPROX_QUANTILE_SAMPLE_SIZE
+        logs["outliers"] = outlier_log(outlier_method, outlier_columns, approximate=sampled)
     else:
         logs["outliers_removed"] = 0
 
+
+    # Store categorical/boolean columns compactly + remember their value counts
+    df = recorder.run("compact", lambda: compact_dtypes(df, column_types), df)
+    logs["value_counts"] = summarize_value_counts(df, column_types)
+
+    if arrow_dtypes:
+        df = recorder.run("arrow_dtypes", lambda: to_arrow_dtypes(df), df)
+
+    logs["stages"] = recorder.records
+    logs["column_costs"] = column_costs(profiles)
+    logs["number_parsing"] = number_parse_log(profiles, column_types)
+
     return original_df, df, column_types, logs
 
 
 
 # Detect Column Types 
-def detect_column_types(df):
-    cleaned_df = df.copy()
+def detect_column_types(df, profiles=None):
+    cleaned_df = df.copy(deep=False)
     column_types = {}
 
     for col in df.columns:
         series = df[col]
+        profile = None
 
         # Check for actual datetime dtype
         if pd.api.types.is_datetime64_any_dtype(series):
             column_types[col] = "datetime"
             continue
 
-        # Try parsing datetime strings
         if series.dtype == 'object':
-            parsed = safe_parse_datetime_column(series)
-            if parsed.notna().mean() >= 0.7:
+            profile = _profile_for(profiles, series)
+
+            # Try parsing datetime strings
+            parsed = _aligned(profile["datetime"], series.index)
+            if parsed is not None and parsed.notna().mean() >= 0.7:
                 cleaned_df[col] = parsed
                 column_types[col] = "datetime"
                 continue
 
-        # Detect boolean-like object columns, but keep original values
-        if series.dtype == 'object':
-            lower_series = series.astype(str).str.strip().str.lower()
-            unique_vals = set(lower_series.dropna().unique())
-            boolean_values = {"true", "false", "yes", "no", 1, 0}
-
-            if unique_vals.issubset(boolean_values):
+            # Detect boolean-like object columns, but keep original values
+            if profile["boolean"]:
                 column_types[col] = "boolean"
                 continue
 
-        # Detect numeric-like object columns
-        if series.dtype == 'object':
-            if contains_duration_like_phrases(series):
+            # Detect numeric-like object columns
+            if profile["duration"]:
                 column_types[col] = "categorical"
                 continue  # Don't try to make this numeric
-            
-            
-            # Such works will be converted & treated as NaN
-            cleaned = series.astype(str).str.strip()
-            cleaned = cleaned.replace(['$', '$-', '-', 'None', 'none', 'nan', 'NaN', ''], pd.NA)
-            cleaned = cleaned.str.replace(r'[^\d\.\-%]', '', regex=True)
-            is_percent = cleaned.str.contains('%')
-            cleaned = cleaned.str.replace('%', '', regex=False)
-
-            # Convert to numeric wherever possible
-            numeric_series = pd.to_numeric(cleaned, errors='coerce')
-            if is_percent.any():
-                numeric_series[is_percent] = numeric_series[is_percent] / 100.0
 
-            if numeric_series.notna().mean() >= 0.7:
+            # Words like '$', 'None', '-' were already converted & treated as NaN by the profiler
+            numeric_series = _aligned(profile["numeric"], series.index)
+            if numeric_series is not None and numeric_series.notna().mean() >= 0.7:
+                is_percent = _aligned(profile["percent"], series.index)
+                if is_percent is not None:
+                    numeric_series = numeric_series.copy()
+                    numeric_series[is_percent] = numeric_series[is_percent] / 100.0
 
                 cleaned_df[col] = numeric_series
                 column_types[col] = "numeric"
@@ -198,7 +418,7 @@ def detect_column_types(df):
 
 
         if series.dtype == 'object' or series.dtype.name == 'category':
-            nunique = series.nunique(dropna=True)
+            nunique = profile["nunique"] if profile is not None else series.nunique(dropna=True)
             if nunique < 0.5 * len(series):
                 column_types[col] = "categorical"
             else:
@@ -211,52 +431,188 @@ def detect_column_types(df):
 
 
 
-# Fill Missing Values
-def fill_nan_cells(df, column_types):
-    df = df.copy()
+# Memory-efficient dtypes for the cleaned frame
+# categorical / object-boolean columns → category, 0/1 and bool columns → nullable UInt8 / boolean,
+# integer columns → smallest integer type. Floats stay float64 so amounts keep their precision
+def compact_dtypes(df, column_types):
+    df = df.copy(deep=False)
     for col, col_type in column_types.items():
-        if df[col].isnull().sum() == 0:
+        series = df[col]
+
+        if col_type in ["categorical", "boolean"] and series.dtype == 'object':
+            df[col] = series.astype("category")
+
+        elif col_type == "boolean" and pd.api.types.is_bool_dtype(series):
+            df[col] = series.astype("boolean")
+
+        elif col_type == "boolean" and pd.api.types.is_integer_dtype(series):
+            df[col] = series.astype("UInt8")
+
+        elif col_type == "numeric" and pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="integer")
+
+    return df
+
+
+VALUE_COUNTS_MAX = 1000
+
+
+# Value counts of categorical/boolean columns, kept in logs so plots don't have to recount
+# Columns with more than VALUE_COUNTS_MAX distinct values are skipped
+def summarize_value_counts(df, column_types):
+    summary = {}
+    for col, col_type in column_types.items():
+        if col_type not in ["categorical", "boolean"]:
             continue
-        
+        counts = df[col].value_counts()
+        if len(counts) > VALUE_COUNTS_MAX:
+            continue
+        summary[col] = {"values": counts.index.tolist(), "counts": counts.tolist()}
+    return summary
+
+
+FILL_STAT_TYPES = ["numeric", "categorical", "boolean"]
+
+
+# pandas' nanops leave float noise below this out of the central moments
+def _zero_out_fperr(values):
+    return np.where(np.abs(values) < 1e-14, 0, values)
+
+
+# Fill values of the numeric columns from one pass over their float block - the same skew / mean as Series.skew()
+# and Series.mean(). if skew then fill with median and if normal col then fill with mean
+def numeric_fill_values(df, cols):
+    if not cols:
+        return {}
+    # Column-major, so each column is summed like a Series is
+    block = np.empty((len(df), len(cols)), dtype="float64", order="F")
+    for i, col in enumerate(cols):
+        block[:, i] = df[col].to_numpy(dtype="float64", na_value=np.nan)
+    missing = np.isnan(block)
+    count = (len(block) - missing.sum(axis=0)).astype("float64")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.copyto(block, 0, where=missing)
+        mean = block.sum(axis=0) / count
+        # The block becomes the deviations from the mean, squared and cubed in place
+        block -= mean
+        np.copyto(block, 0, where=missing)
+        powers = block * block
+        m2 = _zero_out_fperr(powers.sum(axis=0))
+        powers *= block
+        m3 = _zero_out_fperr(powers.sum(axis=0))
+        skew = (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2 ** 1.5)
+    skew = np.where(m2 == 0, 0, skew)
+    skew[count < 3] = np.nan
+
+    fill_values = {}
+    for col, skew_val, mean_val in zip(cols, skew, mean):
+        fill_values[col] = df[col].median() if skew_val > 1 or skew_val < -1 else mean_val
+    return fill_values
+
+
+# (distinct values, their counts) without NaNs - categoricals count their codes, text columns are counted on their
+# Arrow string buffers, anything else is factorized into codes first
+def _value_counts(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        buffers = _string_buffers(series) if series.dtype == object else None
+        if buffers is not None:
+            import pyarrow.compute as pc
+
+            counted = pc.value_counts(buffers[0].drop_null())
+            return (counted.field("values").to_numpy(zero_copy_only=False),
+                    counted.field("counts").to_numpy(zero_copy_only=False))
+        codes, uniques = pd.factorize(series)
+    return uniques, np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+
+# Most frequent value of a column from counted codes, ties broken like Series.mode()[0] - None when it's all NaN
+def column_mode(series):
+    uniques, counts = _value_counts(series)
+    if not counts.any():
+        return None
+    candidates = uniques[counts == counts.max()]
+    # Categories tie in category order, other values smallest first
+    if len(candidates) == 1 or isinstance(series.dtype, pd.CategoricalDtype):
+        return candidates[0]
+    try:
+        return sorted(candidates)[0]
+    except TypeError:
+        return series.mode()[0]
+
+
+# Value a column's NaNs are filled with - None when there is nothing to fill with (datetimes are forward-filled)
+def column_fill_value(series, col_type):
+    if col_type == "numeric":
+        return numeric_fill_values(series.to_frame(), [series.name])[series.name]
+
+    # if categorical or boolean fill with mode if it exists
+    if col_type in ["categorical", "boolean"]:
+        return column_mode(series)
+    return None
+
+
+# Fill statistics of every column in cols - numeric columns batched into one pass, modes of big frames computed
+# on `workers` processes like profile_columns()
+def fill_statistics(df, column_types, cols, workers=None):
+    numeric_cols = [col for col in cols if column_types[col] == "numeric"]
+    mode_cols = [col for col in cols if column_types[col] in ["categorical", "boolean"]]
+    fill_values = numeric_fill_values(df, numeric_cols)
+    if use_parallel(len(df), len(mode_cols), workers):
+        fill_values.update(fill_values_parallel(df, mode_cols, column_types, workers))
+    else:
+        fill_values.update({col: column_mode(df[col]) for col in mode_cols})
+    return fill_values
+
+
+# Fill Missing Values
+# Returns the filled frame and the fill value of every filled column. Values passed in fill_values are reused
+# (e.g. the ones in logs["fill_values"], for new rows of the same data), only missing ones are computed
+def fill_nan_cells(df, column_types, workers=None, fill_values=None):
+    df = df.copy(deep=False)
+    missing = [col for col in column_types if df[col].hasnans]
+    fill_values = dict(fill_values or {})
+    cols = [col for col in missing if column_types[col] in FILL_STAT_TYPES and col not in fill_values]
+    fill_values.update(fill_statistics(df, column_types, cols, workers))
+
+    # Only the filled columns get new buffers, the rest stay shared with the input frame
+    for col in missing:
+        col_type = column_types[col]
+
         # if datetime then ffill
         if col_type == "datetime":
             df[col] = df[col].ffill()
- 
-        # if numeric - if skew then fill with median and if normal col then fill with mean
+
         elif col_type == "numeric":
-            skew_val = df[col].skew()
-            if skew_val > 1 or skew_val < -1:
-                df[col] = df[col].fillna(df[col].median())
-            else:
-                df[col] = df[col].fillna(df[col].mean())
+            df[col] = df[col].fillna(fill_values[col])
 
-        # if categorical or boolean fill with mode if it exists
-        elif col_type in ["categorical", "boolean"]:
-            mode_val = df[col].mode()
-            if not mode_val.empty:
-                df[col] = df[col].fillna(mode_val[0])
-    return df
+        elif fill_values.get(col) is not None:
+            df[col] = df[col].fillna(fill_values[col])
+    return df, {col: fill_values[col] for col in missing if col in fill_values}
 
 
 # If some column exists that is majorly numeric but has some ambiguities then convert those erroneous values to NaN
 # Handle Mostly-Numeric Object Columns 
-def convert_erroneous_numeric_columns(df, threshold=0.7):
-    df_cleaned = df.copy()
+def convert_erroneous_numeric_columns(df, threshold=0.7, profiles=None):
+    df_cleaned = df.copy(deep=False)
 
     for col in df.columns:
         if df[col].dtype == 'object':
-            parsed = safe_parse_datetime_column(df[col])
-            if parsed.notna().mean() > 0.7:
+            profile = _profile_for(profiles, df[col], threshold)
+
+            parsed = _aligned(profile["datetime"], df[col].index)
+            if parsed is not None and parsed.notna().mean() > 0.7:
                 continue
             
-            if contains_duration_like_phrases(df[col]):
+            if profile["duration"]:
                 continue
             
-            cleaned = df[col].astype(str).str.strip()
-            cleaned = cleaned.replace(['$', '-', 'None', 'none', 'nan', 'NaN', ''], pd.NA)
-            cleaned = cleaned.str.replace(r'[^\d\.\-]', '', regex=True)
-            
-            coerced = pd.to_numeric(cleaned, errors='coerce')
+            coerced = _aligned(profile["numeric"], df[col].index)
+            if coerced is None:
+                continue
+
             numeric_fraction = coerced.notna().mean()
 
             if numeric_fraction >= threshold:
@@ -265,21 +621,99 @@ def convert_erroneous_numeric_columns(df, threshold=0.7):
     return df_cleaned
 
 
+# IQR outlier semantics
+# "sequential": columns are filtered one after another, each column's quartiles come from the rows earlier columns kept
+# "independent": every column's quartiles come from all rows, so column order doesn't matter
+OUTLIER_METHODS = ["sequential", "independent"]
+
+# Rows approximate=True takes the quartiles from - a fixed-seed sample, drawn without replacement
+APPROX_QUANTILE_SAMPLE_SIZE = 200_000
+
+
+# 25th / 75th percentiles along the first axis, NaNs ignored - NaN for columns without values
+def _quartiles(values):
+    if not len(values):
+        empty = np.full(values.shape[1:], np.nan)
+        return empty, empty
+    if not np.isnan(values).any():
+        # One partition pass over the whole block
+        q1, q3 = np.quantile(values, [0.25, 0.75], axis=0)
+        return q1, q3
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+    return q1, q3
+
+
+def _bounds(q1, q3):
+    iqr = q3 - q1
+    return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+
+def _column_stats(q1, q3, lower, upper, removed):
+    return {"q1": float(q1), "q3": float(q3), "lower": float(lower), "upper": float(upper), "removed": int(removed)}
+
+
+# IQR outliers of every numeric column, on the numeric block as one float array
+# Returns the keep-mask over df's index and per-column {q1, q3, lower, upper, removed} - in sequential mode a column's
+# "removed" only counts rows earlier columns kept, so the counts add up to the rows removed.
+# approximate=True trades exact bounds for speed on big inputs: quartiles come from APPROX_QUANTILE_SAMPLE_SIZE rows
+def iqr_outliers(df, column_types, method="sequential", approximate=False):
+    if method not in OUTLIER_METHODS:
+        raise ValueError(f"Unknown outlier method: {method}")
+    cols = [col for col, col_type in column_types.items() if col_type == "numeric"]
+    if not cols:
+        return pd.Series(True, index=df.index), {}
+
+    n = len(df)
+    values = df[cols].to_numpy(dtype="float64", na_value=np.nan)
+    sample = None
+    if approximate and n > APPROX_QUANTILE_SAMPLE_SIZE:
+        sample = np.sort(np.random.default_rng(0).choice(n, APPROX_QUANTILE_SAMPLE_SIZE, replace=False))
+
+    stats = {}
+    if method == "independent":
+        q1, q3 = _quartiles(values if sample is None else values[sample])
+        lower, upper = _bounds(q1, q3)
+        # NaN compares False, so missing values count as outliers like out-of-range ones
+        in_range = (values >= lower) & (values <= upper)
+        keep = in_range.all(axis=1)
+        removed = n - in_range.sum(axis=0)
+        for j, col in enumerate(cols):
+            stats[col] = _column_stats(q1[j], q3[j], lower[j], upper[j], removed[j])
+    else:
+        keep = np.ones(n, dtype=bool)
+        filtered = False
+        for j, col in enumerate(cols):
+            column = values[:, j]
+            if sample is not None:
+                kept = column[sample[keep[sample]]]
+            else:
+                # No rows dropped yet - the column itself, not a filtered copy of it
+                kept = column[keep] if filtered else column
+            q1, q3 = _quartiles(kept)
+            lower, upper = _bounds(q1, q3)
+            in_range = (column >= lower) & (column <= upper)
+            removed = keep & ~in_range
+            stats[col] = _column_stats(q1, q3, lower, upper, removed.sum())
+            keep &= in_range
+            filtered = filtered or removed.any()
+
+    return pd.Series(keep, index=df.index), stats
+
+
+# Method, whether quartiles were sampled, and the per-column bounds / counts
+def outlier_log(method, columns, approximate=False):
+    return {"method": method, "approximate": approximate, "columns": columns}
+
+
 # Remove Outliers Using IQR
-def remove_outliers_iqr(df, column_types):
-    df_out = df.copy()
-    original_rows = len(df_out)
+def remove_outliers_iqr(df, column_types, method="sequential", approximate=False):
+    mask, _ = iqr_outliers(df, column_types, method, approximate)
+    rows_removed = int((~mask).sum())
+    return keep_rows(df, mask), rows_removed
 
-    for col, col_type in column_types.items():
-        if col_type == "numeric":
-            Q1 = df_out[col].quantile(0.25)
-            Q3 = df_out[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower = Q1 - 1.5 * IQR
-            upper = Q3 + 1.5 * IQR
-            mask = (df_out[col] >= lower) & (df_out[col] <= upper)
-            mask = mask.fillna(False)
-            df_out = df_out[mask]
-
-    rows_removed = original_rows - len(df_out)
-    return df_out, rows_removed
\ No newline at end of file
+
+# df[mask], without copying the frame when every row is kept
+def keep_rows(df, mask):
+    return df if mask.all() else df[mask]
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Per-dataset statistics store
+# All pairwise numeric correlations are computed once as a single matrix operation and any subset is served from it;
+# categorical columns are kept as integer codes so a crosstab is one bincount, cached per column pair.
+# Value counts start from the ones preprocessing already stored for categorical/boolean columns (logs["value_counts"])
+
+
+class DatasetStats:
+    def __init__(self, df, value_counts=None):
+        self.df = df
+        self._corr = None
+        self._codes = {}
+        self._crosstabs = {}
+        self._value_counts = {
+            col: pd.Series(summary["counts"], index=pd.Index(summary["values"], name=col), name="count")
+            for col, summary in (value_counts or {}).items()
+        }
+
+    def value_counts(self, col):
+        if col not in self._value_counts:
+            self._value_counts[col] = self.df[col].value_counts()
+        return self._value_counts[col]
+
+    # Pearson correlation of every numeric column against every other
+    def _correlation_matrix(self):
+        if self._corr is None:
+            numeric = self.df.select_dtypes("number")
+            values = numeric.to_numpy(dtype="float64", na_value=np.nan)
+            if np.isnan(values).any():
+                # Missing values need pairwise-complete observations
+                self._corr = numeric.corr()
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    matrix = np.corrcoef(values, rowvar=False)
+                matrix = np.atleast_2d(matrix)
+                self._corr = pd.DataFrame(matrix, index=numeric.columns, columns=numeric.columns)
+        return self._corr
+
+    def correlation(self, cols):
+        return self._correlation_matrix().loc[cols, cols]
+
+    # (codes, labels) for a column - missing values get code -1, labels are sorted like crosstab's output
+    def _encoded(self, col):
+        if col not in self._codes:
+            series = self.df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, labels = pd.factorize(series, sort=True)
+            self._codes[col] = (np.asarray(codes, dtype="int64"), pd.Index(labels))
+        return self._codes[col]
+
+    # Same table as pd.crosstab(df[row], df[col])
+    def crosstab(self, row, col):
+        key = (row, col)
+        if key not in self._crosstabs:
+            try:
+                row_codes, row_labels = self._encoded(row)
+                col_codes, col_labels = self._encoded(col)
+            except TypeError:
+                # Mixed types that can't be sorted - let pandas handle them
+                self._crosstabs[key] = pd.crosstab(self.df[row], self.df[col])
+                return self._crosstabs[key]
+
+            valid = (row_codes >= 0) & (col_codes >= 0)
+            n_cols = len(col_labels)
+            flat = row_codes[valid] * n_cols + col_codes[valid]
+            counts = np.bincount(flat, minlength=len(row_labels) * n_cols).reshape(len(row_labels), n_cols)
+
+            table = pd.DataFrame(counts, index=row_labels.rename(row), columns=col_labels.rename(col))
+            # crosstab only lists values that occur together with a non-missing partner
+            table = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+            self._crosstabs[key] = table
+        return self._crosstabs[key]
@@ -0,0 +1,406 @@
+import pandas as pd
+import numpy as np
+from collections import Counter
+
+from src.preprocess import (
+    normalize_column_names,
+    profile_columns,
+    apply_datetime_profiles,
+    convert_erroneous_numeric_columns,
+    detect_column_types,
+    remembered_datetime_format,
+    compact_dtypes,
+    summarize_value_counts,
+    outlier_log,
+)
+from src.finance_numbers import merge_parse_stats, parse_finance_numbers
+from src.instrument import StageRecorder
+from src.memory import SESSION_MEMORY_BUDGET, SpilledFrame
+
+# Chunked CSV preprocessing - the raw file is never in memory as a whole, only a chunk of it at a time.
+# The file is read three times: once to count missing values (which columns get dropped),
+# once to collect running fill/IQR statistics over the de-duplicated rows, and once to clean and yield each chunk.
+# De-duplication remembers an 8-byte hash of every distinct row, so that part still grows with the row count
+
+STREAMING_CHUNK_SIZE = 100_000
+STREAMING_THRESHOLD_BYTES = 200 * 1024 * 1024
+QUANTILE_SAMPLE_SIZE = 100_000
+
+
+# Raw + clean frames of a parsed CSV take about this many times its size on disk
+CSV_MEMORY_FACTOR = 6
+
+
+# Uploads bigger than the threshold, or whose frames wouldn't fit the session memory budget, are cleaned in chunks
+def choose_chunksize(file, budget=SESSION_MEMORY_BUDGET):
+    size = getattr(file, "size", None)
+    if not file.name.endswith(".csv") or size is None:
+        return None
+    if size > STREAMING_THRESHOLD_BYTES or (budget and size * CSV_MEMORY_FACTOR > budget):
+        return STREAMING_CHUNK_SIZE
+    return None
+
+
+# Running statistics for one numeric column
+# Mean and skew come from merged central moments, median/quartiles from a fixed-size uniform sample of the rows
+class RunningStats:
+    def __init__(self, sample_size=QUANTILE_SAMPLE_SIZE, seed=0):
+        self.n = 0
+        self.missing = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.sample_size = sample_size
+        self._rng = np.random.default_rng(seed)
+        self._keys = np.empty(0)
+        self._sample = np.empty(0)
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        missing = np.isnan(values)
+        self.missing += int(missing.sum())
+        self._update_moments(values[~missing])
+        self._update_sample(values)
+
+    def _update_moments(self, x):
+        nb = len(x)
+        if nb == 0:
+            return
+        mb = x.mean()
+        d = x - mb
+        m2b = (d ** 2).sum()
+        m3b = (d ** 3).sum()
+
+        na, ma, m2a, m3a = self.n, self.mean, self.m2, self.m3
+        n = na + nb
+        delta = mb - ma
+        self.m3 = m3a + m3b + delta ** 3 * na * nb * (na - nb) / n ** 2 + 3 * delta * (na * m2b - nb * m2a) / n
+        self.m2 = m2a + m2b + delta ** 2 * na * nb / n
+        self.mean = ma + delta * nb / n
+        self.n = n
+
+    # Bottom-k sampling: every row gets a random key and the rows with the smallest keys are kept
+    def _update_sample(self, values):
+        keys = np.concatenate([self._keys, self._rng.random(len(values))])
+        sample = np.concatenate([self._sample, values])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            keys, sample = keys[keep], sample[keep]
+        self._keys, self._sample = keys, sample
+
+    # Whether the quartiles come from a sample rather than every row
+    @property
+    def sampled(self):
+        return self.n + self.missing > self.sample_size
+
+    # Same bias-corrected estimator as pandas Series.skew()
+    def skew(self):
+        n = self.n
+        if n < 3:
+            return np.nan
+        if self.m2 == 0:
+            return 0.0
+        m2 = self.m2 / n
+        m3 = self.m3 / n
+        return np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5
+
+    def median(self):
+        observed = self._sample[~np.isnan(self._sample)]
+        return float(np.median(observed)) if len(observed) else np.nan
+
+    # if skew then fill with median and if normal col then fill with mean
+    def fill_value(self):
+        skew_val = self.skew()
+        if skew_val > 1 or skew_val < -1:
+            return self.median()
+        return self.mean if self.n else np.nan
+
+    # Quartiles of the column after NaNs are filled, like remove_outliers_iqr() sees it
+    def quartiles(self, fill_value):
+        sample = np.where(np.isnan(self._sample), fill_value, self._sample)
+        sample = sample[~np.isnan(sample)]
+        if not len(sample):
+            return np.nan, np.nan
+        q1, q3 = np.quantile(sample, [0.25, 0.75])
+        return q1, q3
+
+
+# Most frequent value, ties broken like Series.mode()[0] (smallest value)
+def _mode_from_counts(counts):
+    if not counts:
+        return None
+    top = max(counts.values())
+    candidates = [value for value, count in counts.items() if count == top]
+    try:
+        return sorted(candidates)[0]
+    except TypeError:
+        return candidates[0]
+
+
+# text_columns: positions of the columns read as text in any chunk - read as text in every chunk, like the whole
+# file would be, so a value looks the same whichever chunk it's in
+def _read_chunks(file, chunksize, text_columns=()):
+    file.seek(0)
+    for chunk in pd.read_csv(file, chunksize=chunksize, dtype=_text_dtypes(text_columns)):
+        yield normalize_column_names(chunk)
+
+
+def _text_dtypes(text_columns):
+    return {position: str for position in text_columns} or None
+
+
+# Infer how every column is cleaned from the first chunk, with the regular in-memory helpers
+def _plan_from_chunk(chunk):
+    profiles = profile_columns(chunk)
+    df = apply_datetime_profiles(chunk.copy(), profiles)
+
+    converted = convert_erroneous_numeric_columns(df, threshold=0.7, profiles=profiles)
+    column_types, _ = detect_column_types(converted, profiles=profiles)
+
+    schema = tuple(chunk.columns)
+    plan = {}
+    for col, col_type in column_types.items():
+        if chunk[col].dtype != 'object':
+            plan[col] = ("native", None)
+        elif col_type == "datetime":
+            plan[col] = ("datetime", remembered_datetime_format(col, schema))
+        elif col_type == "numeric":
+            # detect_column_types() scales percentages only for columns convert_erroneous_numeric_columns() left alone
+            scaled = converted[col].dtype == 'object' and profiles[col]["percent"] is not None
+            # Every chunk is parsed with the number format the first chunk was detected with
+            number_format = (profiles[col]["number_format"] or {}).get("format")
+            plan[col] = ("numeric", (scaled, number_format))
+        else:
+            plan[col] = ("native", None)
+    return plan, column_types
+
+
+# Apply the first chunk's decisions to any chunk - parse counts of text columns are added to parse_stats if given
+def _clean_chunk(chunk, plan, column_types, keep_cols, parse_stats=None):
+    df = chunk[keep_cols].copy()
+    for col in keep_cols:
+        action, arg = plan[col]
+        col_type = column_types[col]
+        if action == "datetime":
+            df[col] = pd.to_datetime(df[col], format=arg, errors="coerce")
+        elif action == "numeric":
+            scaled, number_format = arg
+            coerced, is_percent, stats = parse_finance_numbers(df[col], number_format)
+            if parse_stats is not None:
+                parse_stats[col] = merge_parse_stats(parse_stats.get(col), stats)
+            if scaled and is_percent is not None:
+                coerced[is_percent] = coerced[is_percent] / 100.0
+            df[col] = coerced
+        elif col_type == "numeric" and df[col].dtype == 'object':
+            # Later chunks can infer a different dtype than the first one
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        elif col_type == "datetime" and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+# Pass 1 - row count and missing values per column, decides which columns are dropped, and which columns hold text
+def _scan_missing(file, chunksize):
+    first = None
+    rows = 0
+    non_null = None
+    text_columns = set()
+    for chunk in _read_chunks(file, chunksize):
+        if first is None:
+            first = chunk
+            non_null = chunk.notna().sum()
+        else:
+            non_null = non_null.add(chunk.notna().sum(), fill_value=0)
+        rows += len(chunk)
+        text_columns.update(i for i, dtype in enumerate(chunk.dtypes) if dtype == 'object')
+
+    if first is None or rows == 0:
+        raise ValueError("The uploaded CSV file is empty.")
+
+    keep_cols = [col for col in first.columns if non_null[col] > 0 and non_null[col] >= rows * 0.5]
+    dropped = [col for col in first.columns if col not in keep_cols]
+    text_columns = sorted(text_columns)
+    # The plan is made from the first chunk as later passes read it
+    if text_columns != [i for i, dtype in enumerate(first.dtypes) if dtype == 'object']:
+        file.seek(0)
+        first = normalize_column_names(pd.read_csv(file, nrows=chunksize, dtype=_text_dtypes(text_columns)))
+    return first, keep_cols, dropped, text_columns
+
+
+# Rows of a chunk seen for the first time - seen holds the sorted hashes of the rows kept so far
+def _first_seen(hashes, seen):
+    keep = ~pd.Series(hashes).duplicated().to_numpy()
+    if len(seen):
+        at = np.minimum(np.searchsorted(seen, hashes), len(seen) - 1)
+        keep &= seen[at] != hashes
+    # Two sorted runs - the stable sort merges them in linear time
+    return keep, np.sort(np.concatenate([seen, hashes[keep]]), kind="stable")
+
+
+# What rows are compared on to find duplicates - the same as preprocess(), which de-duplicates once datetimes are
+# parsed but before numbers are: datetime columns parsed (from the cleaned chunk df), every other column as read,
+# so values that don't parse ("unknown", "pending") still tell rows apart
+def _dedup_key(chunk, df, plan, keep_cols):
+    return pd.DataFrame({i: df[col] if plan[col][0] == "datetime" else chunk[col] for i, col in enumerate(keep_cols)})
+
+
+# Pass 2 - de-duplicate across chunks and collect fill / IQR statistics
+def _collect_statistics(file, chunksize, plan, column_types, keep_cols, text_columns):
+    seen = np.empty(0, dtype="uint64")
+    keep_masks = []
+    numeric_stats = {col: RunningStats() for col in keep_cols if column_types[col] == "numeric"}
+    mode_counts = {col: Counter() for col in keep_cols if column_types[col] in ["categorical", "boolean"]}
+
+    for chunk in _read_chunks(file, chunksize, text_columns):
+        df = _clean_chunk(chunk, plan, column_types, keep_cols)
+
+        key = _dedup_key(chunk, df, plan, keep_cols)
+        keep, seen = _first_seen(pd.util.hash_pandas_object(key, index=False).to_numpy(), seen)
+        keep_masks.append(np.packbits(keep))
+
+        df = df[keep]
+        for col, stats in numeric_stats.items():
+            stats.update(df[col].to_numpy(dtype="float64", na_value=np.nan))
+        for col, counts in mode_counts.items():
+            counts.update(df[col].value_counts(dropna=True).to_dict())
+
+    fill_values = {col: stats.fill_value() for col, stats in numeric_stats.items()}
+    fill_values.update({col: _mode_from_counts(counts) for col, counts in mode_counts.items()})
+
+    bounds = {}
+    for col, stats in numeric_stats.items():
+        q1, q3 = stats.quartiles(fill_values[col])
+        iqr = q3 - q1
+        bounds[col] = (q1, q3, q1 - 1.5 * iqr, q3 + 1.5 * iqr, stats.sampled)
+
+    return keep_masks, fill_values, bounds
+
+
+# Fill one chunk - datetimes are forward filled from the last value of the previous chunk
+def _fill_chunk(df, column_types, fill_values, last_dates):
+    for col, col_type in column_types.items():
+        if col not in df.columns or not df[col].isnull().any():
+            continue
+        if col_type == "datetime":
+            df[col] = df[col].ffill()
+            if col in last_dates:
+                df[col] = df[col].fillna(last_dates[col])
+        elif col in fill_values and fill_values[col] is not None and not pd.isna(fill_values[col]):
+            df[col] = df[col].fillna(fill_values[col])
+    return df
+
+
+# Pass 3 - clean, fill and filter every chunk with the final statistics
+def _iter_clean_chunks(file, chunksize, plan, column_types, keep_cols, text_columns, keep_masks, fill_values, bounds,
+                       remove_outliers, logs):
+    last_dates = {}
+    for i, chunk in enumerate(_read_chunks(file, chunksize, text_columns)):
+        df = _clean_chunk(chunk, plan, column_types, keep_cols, logs["number_parsing"])
+        keep = np.unpackbits(keep_masks[i], count=len(df)).astype(bool)
+        logs["duplicates_removed"] += int((~keep).sum())
+        df = df[keep]
+
+        df = _fill_chunk(df, column_types, fill_values, last_dates)
+        for col, col_type in column_types.items():
+            if col_type == "datetime" and df[col].notna().any():
+                last_dates[col] = df[col].dropna().iloc[-1]
+
+        if remove_outliers and bounds:
+            mask = pd.Series(True, index=df.index)
+            for col, (_, _, lower, upper, _) in bounds.items():
+                in_range = ((df[col] >= lower) & (df[col] <= upper)).fillna(False)
+                logs["outliers"]["columns"][col]["removed"] += int((~in_range).sum())
+                mask &= in_range
+            logs["outliers_removed"] += int((~mask).sum())
+            df = df[mask]
+
+        yield chunk, df
+
+
+# Passes 1 and 2 - everything the chunks are cleaned with. None of it depends on the cleaning options,
+# so a pipeline keeps it and toggling them only runs pass 3 again
+def scan_statistics(file, chunksize=STREAMING_CHUNK_SIZE):
+    recorder = StageRecorder()
+    try:
+        first, keep_cols, dropped, text_columns = recorder.run("scan_missing", lambda: _scan_missing(file, chunksize))
+    except pd.errors.EmptyDataError:
+        raise ValueError("The uploaded CSV file contains no data.")
+
+    plan, all_types = _plan_from_chunk(first[keep_cols])
+    column_types = {col: all_types[col] for col in keep_cols}
+
+    keep_masks, fill_values, bounds = recorder.run(
+        "collect_statistics", lambda: _collect_statistics(file, chunksize, plan, column_types, keep_cols, text_columns)
+    )
+    return {
+        "chunksize": chunksize,
+        "dropped": dropped,
+        "keep_cols": keep_cols,
+        "text_columns": text_columns,
+        "plan": plan,
+        "column_types": column_types,
+        "keep_masks": keep_masks,
+        "fill_values": fill_values,
+        "bounds": bounds,
+        "stages": recorder.records,
+    }
+
+
+# Streaming counterpart of preprocess()
+# Returns column_types, logs and a generator of (raw_chunk, clean_chunk) pairs.
+# Duplicate and outlier counts in logs are filled in as the generator is consumed.
+# Outlier bounds come from the whole file at once - the "independent" method of iqr_outliers()
+# statistics is a scan_statistics() result of the same file and chunksize, scanned here when not given.
+# Every pass is recorded in logs["stages"] - pass a recorder to add later stages to the same records
+def stream_preprocess(file, remove_outliers=True, chunksize=STREAMING_CHUNK_SIZE, recorder=None, statistics=None):
+    statistics = statistics or scan_statistics(file, chunksize)
+    recorder = recorder or StageRecorder()
+    recorder.records.extend(statistics["stages"])
+    column_types, keep_masks = statistics["column_types"], statistics["keep_masks"]
+    fill_values, bounds = statistics["fill_values"], statistics["bounds"]
+
+    logs = {
+        "dropped_columns": list(statistics["dropped"]),
+        "duplicates_removed": 0,
+        "outliers_removed": 0,
+        "streaming": {"chunksize": chunksize, "chunks": len(keep_masks)},
+        "stages": recorder.records,
+        # Every chunk is filled with these, so every numeric / categorical column has one
+        "fill_values": dict(fill_values),
+        # Counted as the chunks are cleaned
+        "number_parsing": {},
+    }
+    if remove_outliers:
+        # Quartiles come from the whole file (a sample of it past QUANTILE_SAMPLE_SIZE rows), every column is bounded
+        # on its own
+        columns = {
+            col: {"q1": float(q1), "q3": float(q3), "lower": float(lower), "upper": float(upper), "removed": 0}
+            for col, (q1, q3, lower, upper, _) in bounds.items()
+        }
+        sampled = any(bound[4] for bound in bounds.values())
+        logs["outliers"] = outlier_log("independent", columns, approximate=sampled)
+    chunks = _iter_clean_chunks(file, chunksize, statistics["plan"], column_types, statistics["keep_cols"],
+                                statistics["text_columns"], keep_masks, fill_values, bounds, remove_outliers, logs)
+    return dict(column_types), logs, chunks
+
+
+# Same return values as preprocess(), built from streamed chunks.
+# Raw chunks are spilled to disk as they come (raw_df is a SpilledFrame), only the clean frame - the one every page
+# works on - is kept in memory
+def preprocess_chunked(file, remove_outliers=True, chunksize=STREAMING_CHUNK_SIZE, statistics=None):
+    recorder = StageRecorder()
+    column_types, logs, chunks = stream_preprocess(file, remove_outliers=remove_outliers, chunksize=chunksize,
+                                                   recorder=recorder, statistics=statistics)
+
+    # Pass 3 runs while the chunks are collected - clean frame first, so the stage records its shape
+    def clean_all():
+        raw_df, clean_chunks = SpilledFrame(), []
+        for raw_chunk, clean_chunk in chunks:
+            raw_df.append(raw_chunk)
+            clean_chunks.append(clean_chunk)
+        return pd.concat(clean_chunks), raw_df
+
+    clean_df, raw_df = recorder.run("clean_chunks", clean_all)
+    clean_df = recorder.run("compact", lambda: compact_dtypes(clean_df, column_types), clean_df)
+    logs["value_counts"] = summarize_value_counts(clean_df, column_types)
+    return raw_df, clean_df, column_types, logs
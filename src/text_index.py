@@ -0,0 +1,43 @@
+from collections import Counter
+
+import pandas as pd
+
+from src.workers import MAX_WORKERS, worker_map
+
+# Term-frequency index for text columns
+# The column is tokenized in chunks (lowercased, split on whitespace) and the per-chunk counts are merged,
+# so no giant joined string is ever built. Big columns are tokenized on the shared worker pool
+
+TOKEN_CHUNK_SIZE = 50_000
+PARALLEL_MIN_ROWS = 200_000
+
+
+def _count_terms(texts):
+    counts = Counter()
+    for text in texts:
+        counts.update(text.lower().split())
+    return counts
+
+
+# Series of term → frequency, most frequent first (ties keep first-seen order, like Counter.most_common)
+def build_term_index(series, chunksize=TOKEN_CHUNK_SIZE, workers=None):
+    texts = series.dropna().astype(str).tolist()
+    chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+
+    workers = workers or MAX_WORKERS
+    if workers > 1 and len(texts) >= PARALLEL_MIN_ROWS and len(chunks) > 1:
+        # worker_map() yields in submission order, so merged counts match the serial order
+        partial_counts = worker_map(_count_terms, chunks, workers=workers)
+    else:
+        partial_counts = map(_count_terms, chunks)
+
+    counts = Counter()
+    for partial in partial_counts:
+        counts.update(partial)
+
+    terms = counts.most_common()
+    return pd.Series([count for _, count in terms], index=[term for term, _ in terms], dtype="int64", name="Frequency")
+
+
+def top_terms(index, top_n):
+    return index.head(top_n).rename_axis("Word").reset_index()
@@ -0,0 +1,53 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Shared process pool for CPU-heavy work (tokenizing, per-column preprocessing...)
+# Created lazily and reused, so each call doesn't pay for starting new interpreters.
+# "spawn" workers are used because forking a threaded Streamlit server is not safe.
+# There is one pool, sized for MAX_WORKERS (processes start as work arrives) - a call that wants fewer workers keeps
+# fewer of its tasks in flight instead of resizing a pool other threads are using
+
+MAX_WORKERS = int(os.environ.get("FINANCE_MAX_WORKERS", "0")) or os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    global _pool
+    # Batch uploads ask for the pool from several threads at once
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+# map() on the shared pool with at most `workers` of these tasks running at once - results in submission order
+def worker_map(fn, *iterables, workers=None):
+    workers = min(workers or MAX_WORKERS, MAX_WORKERS)
+    pool = get_worker_pool()
+    futures = []
+    running = set()
+    next_result = 0
+    try:
+        for args in zip(*iterables):
+            while len(running) >= workers:
+                _, running = wait(running, return_when=FIRST_COMPLETED)
+            future = pool.submit(fn, *args)
+            futures.append(future)
+            running.add(future)
+            # Hand out finished results early, like Executor.map()
+            while next_result < len(futures) and futures[next_result].done():
+                yield futures[next_result].result()
+                futures[next_result] = None
+                next_result += 1
+        for i in range(next_result, len(futures)):
+            yield futures[i].result()
+            futures[i] = None
+    finally:
+        # Abandoned or failed: tasks that haven't started yet are dropped
+        for future in futures:
+            if future is not None:
+                future.cancel()
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests never read or write the app's own preprocessing cache
+os.environ.setdefault("FINANCE_CACHE_DIR", tempfile.mkdtemp(prefix="finance-cache-"))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "Txn Date": pd.date_range("2024-01-01", periods=n, freq="h").strftime("%Y-%m-%d %H:%M"),
+        "Amount": [f"${value:,.2f}" for value in rng.normal(1000, 300, n)],
+        "Qty": rng.integers(1, 10, n).astype(float),
+        "Category": rng.choice(["Food", "Rent", "Travel"], n),
+        "Sparse": np.nan,
+    })
+    df.loc[rng.choice(n, 100, replace=False), "Qty"] = np.nan
+    df.loc[rng.choice(n, 50, replace=False), "Category"] = np.nan
+    df = pd.concat([df, df.iloc[:30]], ignore_index=True)
+    path = tmp_path / "transactions.csv"
+    df.to_csv(path, index=False)
+    return path
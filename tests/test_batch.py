@@ -0,0 +1,82 @@
+import pandas as pd
+
+from src import pipeline as pipeline_module
+from src.batch import SOURCE_COLUMN, BatchPipeline, _merged_logs, combine_results, reconcile_column_types
+from src.dataset_store import DatasetStore
+from src.memory import SpilledFrame
+from src.pipeline import PreprocessPipeline
+
+
+def file_result(raw_df, clean_df, column_types, **logs):
+    return raw_df, clean_df, column_types, {"duplicates_removed": 0, "outliers_removed": 0, **logs}
+
+
+def test_type_ties_go_to_the_earliest_file():
+    resolved, conflicts = reconcile_column_types([
+        ("a.csv", 10, {"amount": "numeric", "memo": "text"}),
+        ("b.csv", 10, {"amount": "categorical", "memo": "text"}),
+        ("c.csv", 15, {"memo": "categorical"}),
+    ])
+    assert resolved == {"amount": "numeric", "memo": "text"}
+    assert conflicts["amount"] == {"types": {"a.csv": "numeric", "b.csv": "categorical"}, "resolved": "numeric"}
+    assert conflicts["memo"]["resolved"] == "text"
+
+
+def test_numbers_losing_to_dates_become_missing():
+    dates = pd.DataFrame({"when": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"])})
+    numbers = pd.DataFrame({"when": [1234.5, 7.0]})
+    _, clean_df, column_types, conflicts = combine_results([
+        ("dates.csv", file_result(dates, dates, {"when": "datetime"})),
+        ("numbers.csv", file_result(numbers, numbers, {"when": "numeric"})),
+    ])
+    assert column_types["when"] == "datetime" and "when" in conflicts
+    assert clean_df["when"].dtype == "datetime64[ns]"
+    assert clean_df["when"].isna().tolist() == [False, False, False, True, True]
+
+
+def test_clean_rows_point_at_their_raw_rows():
+    first_raw = pd.DataFrame({"amount": ["1", "2", "2", "900"]}, index=[0, 1, 2, 3])
+    first_clean = pd.DataFrame({"amount": [1.0, 2.0]}, index=[0, 1])
+    second_raw = SpilledFrame(pd.DataFrame({"amount": ["5", "x"]})).append(pd.DataFrame({"amount": ["6"]}, index=[2]))
+    second_clean = pd.DataFrame({"amount": [5.0, 6.0]}, index=[0, 2])
+
+    raw_df, clean_df, _, _ = combine_results([
+        ("a.csv", file_result(first_raw, first_clean, {"amount": "numeric"})),
+        ("b.csv", file_result(second_raw, second_clean, {"amount": "numeric"})),
+    ])
+    # Every file part is its own part on disk, the raw frame is never loaded whole
+    assert isinstance(raw_df, SpilledFrame) and len(raw_df.parts) == 3
+    assert raw_df.index.tolist() == list(range(7))
+    assert clean_df.index.tolist() == [0, 1, 4, 6]
+    matched = raw_df.reindex(clean_df.index)
+    assert matched["amount"].astype(float).tolist() == clean_df["amount"].tolist()
+    assert matched[SOURCE_COLUMN].tolist() == clean_df[SOURCE_COLUMN].tolist() == ["a.csv"] * 2 + ["b.csv"] * 2
+
+
+def test_merged_logs_add_up_per_file():
+    outliers = {"method": "sequential", "approximate": False, "columns": {"amount": {"removed": 1}}}
+    named_results = [
+        ("a.csv", file_result(None, pd.DataFrame({"amount": [1.0], "memo": ["x"]}), {}, duplicates_removed=2,
+                              outliers_removed=1, dropped_columns=["empty"], outliers=outliers,
+                              column_costs={"memo": 0.5})),
+        ("b.csv", file_result(None, pd.DataFrame({"amount": [2.0, 3.0]}), {}, duplicates_removed=1,
+                              dropped_columns=["empty", "notes"], column_costs={"memo": 0.25})),
+    ]
+    logs = _merged_logs(named_results, {})
+    assert logs["duplicates_removed"] == 3 and logs["outliers_removed"] == 1
+    assert logs["dropped_columns"] == ["empty", "notes"]
+    assert logs["files"]["b.csv"]["missing_columns"] == ["memo"]
+    assert logs["files"]["a.csv"]["rows"] == 1
+    assert logs["outliers"]["columns"] == {"amount": {"removed": 1}}
+    assert logs["column_costs"] == {"memo": 0.75}
+
+
+def test_batch_result_is_kept_per_options(csv_path, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "dataset_store", DatasetStore())
+    with open(csv_path, "rb") as first, open(csv_path, "rb") as second:
+        batch = BatchPipeline([PreprocessPipeline(first), PreprocessPipeline(second, chunksize=500)], ["a", "b"])
+        result = batch.result()
+        assert batch.result() is result
+        assert isinstance(result[0], SpilledFrame)
+        assert set(result[1][SOURCE_COLUMN]) == {"a", "b"}
+        assert batch.result(remove_outliers=False) is not result
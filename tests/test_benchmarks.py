@@ -0,0 +1,19 @@
+import csv
+import json
+
+from benchmarks.run import run_case, write_results
+
+
+def test_benchmark_writes_stage_records(tmp_path):
+    records = run_case(300, 9, seed=0)
+    stages = [record["stage"] for record in records]
+    assert stages[:2] == ["load_dataframe", "drop_sparse_columns"]
+    assert all(record["peak_traced_mb"] is not None for record in records)
+
+    json_path, csv_path = write_results(records, {"timestamp": "now"}, str(tmp_path), "case")
+    with open(csv_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["stage"] for row in rows] == stages
+    assert set(rows[0]) == set(records[0])
+    with open(json_path) as f:
+        assert json.load(f)["results"] == records
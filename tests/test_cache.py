@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src import cache
+from src.cache import cache_key, evict, load_cached, store_cached
+from src.memory import SpilledFrame
+from src.preprocess import preprocess
+
+
+def result():
+    raw_df = pd.DataFrame({"amount": ["$1,000", "(5.00)", None], "mixed": [1, "a", 2.5]})
+    clean_df = pd.DataFrame({"amount": [1000.0, -5.0, np.nan], "category": pd.Categorical(["x", "y", "x"])})
+    logs = {"dropped_columns": [], "duplicates_removed": np.int64(2), "fill_values": {"amount": np.float64(497.5)}}
+    return raw_df, clean_df, {"amount": "numeric", "category": "categorical"}, logs
+
+
+def test_round_trip(tmp_path):
+    key = cache_key("abc", {"remove_outliers": True})
+    store_cached(key, result(), cache_dir=tmp_path)
+    raw_df, clean_df, column_types, logs = load_cached(key, cache_dir=tmp_path)
+
+    expected = result()
+    # Mixed object columns can't go to Parquet - the frame is pickled instead
+    pd.testing.assert_frame_equal(raw_df, expected[0])
+    pd.testing.assert_frame_equal(clean_df, expected[1])
+    assert column_types == expected[2]
+    assert logs == {"dropped_columns": [], "duplicates_removed": 2, "fill_values": {"amount": 497.5}}
+
+
+def test_key_depends_on_file_options_and_version(monkeypatch):
+    key = cache_key("abc", {"remove_outliers": True})
+    assert key == cache_key("abc", {"remove_outliers": True})
+    assert key != cache_key("abd", {"remove_outliers": True})
+    assert key != cache_key("abc", {"remove_outliers": False})
+    monkeypatch.setattr(cache, "CACHE_VERSION", cache.CACHE_VERSION + 1)
+    assert key != cache_key("abc", {"remove_outliers": True})
+
+
+def test_miss_and_eviction(tmp_path):
+    assert load_cached("missing", cache_dir=tmp_path) is None
+    store_cached("old", result(), cache_dir=tmp_path)
+    store_cached("new", result(), cache_dir=tmp_path)
+    os.utime(tmp_path / "old", (0, 0))
+    size = sum(f.stat().st_size for f in (tmp_path / "new").iterdir())
+    evict(tmp_path, max_bytes=size)
+    assert load_cached("old", cache_dir=tmp_path) is None
+    assert load_cached("new", cache_dir=tmp_path) is not None
+
+
+def test_chunked_raw_frame_stays_on_disk(tmp_path, csv_path, monkeypatch):
+    monkeypatch.setattr(cache, "SPILL_ROW_GROUP_SIZE", 500)
+    with open(csv_path, "rb") as file:
+        result = preprocess(file, chunksize=300)
+    store_cached("chunked", result, cache_dir=tmp_path)
+    raw_df, clean_df, _, _ = load_cached("chunked", cache_dir=tmp_path)
+
+    assert isinstance(raw_df, SpilledFrame) and len(raw_df.parts) == 5
+    pd.testing.assert_frame_equal(raw_df.load(), result[0].load())
+    pd.testing.assert_frame_equal(raw_df.take([1999, 3]), result[0].take([1999, 3]))
+    # Evicting the entry leaves the loaded frame readable
+    evict(tmp_path, max_bytes=0)
+    pd.testing.assert_frame_equal(raw_df.load(), result[0].load())
+    assert isinstance(clean_df, pd.DataFrame)
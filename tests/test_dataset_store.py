@@ -0,0 +1,74 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.dataset_store import DatasetStore
+from src.memory import SpilledFrame
+
+
+def result(rows=1000):
+    raw_df = pd.DataFrame({"amount": np.arange(rows, dtype="float64"), "memo": ["x"] * rows})
+    clean_df = raw_df[["amount"]].copy()
+    return raw_df, clean_df, {"amount": "numeric"}, {}
+
+
+def test_computes_once_and_counts_references_under_threads():
+    store = DatasetStore(max_bytes=1 << 30)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return result()
+
+    handles = []
+    lock = threading.Lock()
+
+    def session():
+        handle = store.acquire("key", compute)
+        with lock:
+            handles.append(handle)
+
+    threads = [threading.Thread(target=session) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    stats = store.stats()
+    assert (stats["entries"], stats["referenced"], stats["misses"]) == (1, 1, 1)
+    assert stats["hits"] + stats["misses"] == 16
+    assert handles[0].sharers == 16
+
+    releases = [threading.Thread(target=handle.release) for handle in handles]
+    for thread in releases:
+        thread.start()
+    for thread in releases:
+        thread.join()
+    assert store.stats()["referenced"] == 0
+
+
+def test_unreferenced_entries_are_evicted_first():
+    store = DatasetStore(max_bytes=1)
+    store.acquire("old", result).release()
+    handle = store.acquire("new", result)
+    stats = store.stats()
+    assert (stats["entries"], stats["evictions"]) == (1, 1)
+    handle.release()
+
+
+def test_referenced_entries_over_the_cap_spill_their_raw_frame():
+    store = DatasetStore(max_bytes=1)
+    first = store.acquire("first", result)
+    second = store.acquire("second", result)
+
+    assert store.stats()["spills"] == 2
+    for handle in [first, second]:
+        raw_df = handle.result[0]
+        assert isinstance(raw_df, SpilledFrame)
+        pd.testing.assert_frame_equal(raw_df.load(), result()[0])
+        # Clean frames stay in memory, the cap is soft for them
+        assert isinstance(handle.result[1], pd.DataFrame)
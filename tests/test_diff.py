@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from src.diff import compute_change_mask, surviving_rows
+
+
+def test_change_mask_skips_dropped_rows():
+    raw = pd.DataFrame({"amount": ["$1", "$2", "$2", None], "memo": ["a", "b", "b", "c"]})
+    clean = pd.DataFrame({"amount": [1.0, 2.0, 1.5], "memo": ["a", "b", "c"]}, index=[0, 1, 3])
+    mask, counts = compute_change_mask(raw, clean)
+    assert mask.index.tolist() == [0, 1, 3]
+    assert counts.to_dict() == {"amount": 3, "memo": 0}
+
+
+def test_change_mask_treats_missing_on_both_sides_as_equal():
+    raw = pd.DataFrame({
+        "amount": [1.0, np.nan, np.nan, 4.0],
+        "date": pd.to_datetime(["2024-01-01", None, "2024-01-03", None]),
+        "memo": ["a", None, np.nan, "d"],
+    })
+    clean = pd.DataFrame({
+        "amount": [1.0, np.nan, 3.0, np.nan],
+        "date": pd.to_datetime(["2024-01-01", None, "2024-01-03", "2024-01-04"]),
+        "memo": ["a", np.nan, None, "e"],
+    })
+    mask, counts = compute_change_mask(raw, clean)
+    assert mask.to_numpy().tolist() == [
+        [False, False, False],
+        [False, False, False],
+        [True, False, False],
+        [True, True, True],
+    ]
+    assert counts.to_dict() == {"amount": 2, "date": 1, "memo": 1}
+
+
+def test_change_mask_lines_raw_rows_up_with_the_clean_index():
+    raw = pd.DataFrame({"amount": ["$5", "$1", "$2", "$3"], "memo": ["e", "a", "b", "c"]}, index=[4, 0, 1, 2])
+    # Row 1 was dropped, rows came back in a different order and a derived column was added
+    clean = pd.DataFrame({"amount": [3.0, 5.0, 1.0], "memo": ["c", "x", "a"], "month": [1, 2, 3]}, index=[2, 4, 0])
+    mask, counts = compute_change_mask(raw, clean)
+    assert mask.index.tolist() == [2, 4, 0]
+    assert mask["memo"].tolist() == [False, True, False]
+    assert mask["month"].all()
+    assert counts.to_dict() == {"amount": 3, "memo": 1, "month": 3}
+
+
+def test_surviving_rows():
+    clean = pd.DataFrame({"amount": np.arange(5.0)}, index=[0, 2, 3, 7, 9])
+    assert surviving_rows(clean, pd.RangeIndex(2, 8)).index.tolist() == [2, 3, 7]
+    assert surviving_rows(clean, pd.RangeIndex(4, 7)).empty
+    assert surviving_rows(clean, pd.Index([9, 0])).index.tolist() == [0, 9]
+    assert surviving_rows(clean, pd.RangeIndex(0)).empty
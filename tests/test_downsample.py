@@ -0,0 +1,19 @@
+import numpy as np
+
+from src.downsample import density_sample_indices
+
+
+def test_density_sample_keeps_sparse_points():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(0, 1, (20_000, 2)), [[50.0, 50.0]]])
+    keep = density_sample_indices(values, 2000)
+    assert len(keep) <= 2000
+    assert len(values) - 1 in keep
+
+
+def test_density_sample_many_columns():
+    # 8 bins over 40 columns would be 8 ** 40 cells - more than int64 holds
+    values = np.random.default_rng(0).normal(size=(5000, 40))
+    keep = density_sample_indices(values, 300, bins=8)
+    assert len(keep) == 300
+    assert len(np.unique(keep)) == 300 and keep.max() < 5000
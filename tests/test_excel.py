@@ -0,0 +1,57 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from src import excel
+from src.excel import is_excel, read_sheets, sheet_names
+
+
+# Two-sheet legacy workbook (BIFF8), written with xlwt
+XLS_FIXTURE = os.path.join(os.path.dirname(__file__), "data", "statements.xls")
+
+
+class Upload(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def workbook(sheets):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for sheet, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=sheet, index=False)
+    return Upload(buffer.getvalue(), "statements.xlsx")
+
+
+def test_parallel_sheets_match_read_excel(monkeypatch):
+    sheets = {f"2024-{month:02d}": pd.DataFrame({"Amount": [month * 10.5, None, 3], "Memo": ["a", "b", None]})
+              for month in range(1, 4)}
+    file = workbook(sheets)
+    # Every sheet is read in a worker, from the shared copy of the workbook
+    monkeypatch.setattr(excel, "read_sheet", None)
+
+    frames = read_sheets(file, list(sheets), workers=2)
+    assert [sheet for sheet, _ in frames] == list(sheets)
+    for sheet, frame in frames:
+        pd.testing.assert_frame_equal(frame, pd.read_excel(io.BytesIO(file.getvalue()), sheet_name=sheet))
+
+
+def test_xls_sheets_are_read(monkeypatch):
+    pytest.importorskip("xlrd")
+    with open(XLS_FIXTURE, "rb") as f:
+        file = Upload(f.read(), "statements.XLS")
+    assert is_excel(file.name)
+    assert sheet_names(file) == ["January", "February"]
+    monkeypatch.setattr(excel, "read_sheet", None)
+
+    frames = dict(read_sheets(file, ["January", "February"], workers=2))
+    january, february = frames["January"], frames["February"]
+    assert list(january.columns) == ["Date", "Amount", "Category"]
+    assert list(january["Date"]) == list(pd.to_datetime(["2024-01-03", "2024-01-15", "2024-01-28"]))
+    assert list(january["Amount"]) == [120.5, -40.25, 1500.0]
+    assert list(january["Category"]) == ["Rent", "Groceries", "Salary"]
+    assert february["Amount"].isna().tolist() == [False, True]
+    assert list(february["Category"]) == ["Utilities", "Refund"]
@@ -0,0 +1,41 @@
+import pandas as pd
+
+from src.figure_cache import FigureCache, dataframe_fingerprint
+
+
+def test_key_ignores_spec_order_and_follows_the_data():
+    df = pd.DataFrame({"amount": [1.0, 2.0], "memo": ["a", "b"]})
+    fingerprint = dataframe_fingerprint(df)
+    spec = {"type": "numeric", "plot": "Histogram", "columns": ["amount"]}
+    reordered = {"columns": ["amount"], "plot": "Histogram", "type": "numeric"}
+    assert FigureCache.key(spec, fingerprint) == FigureCache.key(reordered, fingerprint)
+    assert FigureCache.key(spec, fingerprint) != FigureCache.key({**spec, "plot": "Box Plot"}, fingerprint)
+
+    # A changed value, a renamed column or a new dtype gives a different fingerprint
+    assert dataframe_fingerprint(df.assign(amount=[1.0, 3.0])) != fingerprint
+    assert dataframe_fingerprint(df.rename(columns={"memo": "note"})) != fingerprint
+    assert dataframe_fingerprint(df.astype({"amount": "float32"})) != fingerprint
+    assert dataframe_fingerprint(df.copy()) == fingerprint
+
+
+def test_builds_once_and_evicts_least_recently_used():
+    cache = FigureCache(max_entries=2)
+    builds = []
+
+    def get(key):
+        return cache.get_or_build(key, lambda: builds.append(key) or key.upper())
+
+    assert get("a") == "A"
+    assert get("b") == "B"
+    assert get("a") == "A"
+    assert builds == ["a", "b"]
+
+    # "b" is the least recently used entry once "a" has been read again
+    get("c")
+    assert len(cache) == 2
+    get("a")
+    get("b")
+    assert builds == ["a", "b", "c", "b"]
+
+    cache.clear()
+    assert len(cache) == 0
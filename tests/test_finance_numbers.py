@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.finance_numbers import detect_number_format, merge_parse_stats, parse_finance_numbers
+
+
+def parsed(values):
+    return parse_finance_numbers(pd.Series(values))[0].tolist()
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["$1,234.50", "(1,234.50)", "$ -", "1 234-"], [1234.5, -1234.5, np.nan, -1234.0]),
+    (["1.234,50 €", "12,5", "-3,75"], [1234.5, 12.5, -3.75]),
+    (["USD 12.5M", "3K", "1.2bn"], [12.5e6, 3e3, 1.2e9]),
+    (["payment 1", "1-3", "15.4"], [np.nan, np.nan, 15.4]),
+])
+def test_formats(values, expected):
+    np.testing.assert_allclose(parsed(values), expected)
+
+
+def test_currency_code_dot_is_not_a_decimal_point():
+    assert parsed(["Rs 500", "RS. 100", "rs 20"]) == [500, 100, 20]
+    assert parsed(["Rs. 500", "Rs.1,234.50"]) == [500.0, 1234.5]
+
+
+def test_scientific_notation():
+    assert parsed(["1e5", "1.5E-3", "-2e2", "(3e1)"]) == [100000.0, 0.0015, -200.0, -30.0]
+
+
+def test_whole_numbers_stay_integers():
+    values = parse_finance_numbers(pd.Series(["1", "2", "-3"]))[0]
+    assert values.dtype == "int64"
+    assert parse_finance_numbers(pd.Series(["1", "2e3"]))[0].dtype == "float64"
+
+
+def test_percent_and_stats():
+    values, is_percent, stats = parse_finance_numbers(pd.Series(["15%", "(2.5%)", "abc", None]))
+    assert values.tolist()[:2] == [15.0, -2.5]
+    assert is_percent.tolist() == [True, True, False, False]
+    assert (stats["values"], stats["parsed"], stats["failed"], stats["negative"], stats["percent"]) == (3, 2, 1, 1, 2)
+
+
+def test_detect_number_format():
+    number_format = detect_number_format(pd.Series(["1.234,50", "€ 12,00", "(5,25)"]))
+    assert (number_format["decimal"], number_format["thousands"]) == (",", ".")
+    assert number_format["currency"] == ["€"] and number_format["parentheses"]
+
+
+def test_merge_parse_stats():
+    first = parse_finance_numbers(pd.Series(["1", "x"]))[2]
+    second = parse_finance_numbers(pd.Series(["-2"]), first["format"])[2]
+    total = merge_parse_stats(merge_parse_stats(None, first), second)
+    assert (total["parsed"], total["failed"], total["negative"]) == (2, 1, 1)
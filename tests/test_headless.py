@@ -0,0 +1,62 @@
+import json
+import os
+
+import pandas as pd
+
+from src.headless import META_SUFFIX, output_paths, process_file
+
+
+def test_unchanged_files_are_skipped(csv_path, tmp_path):
+    csv_path = str(csv_path)
+    out = str(tmp_path / "out")
+    first = process_file(csv_path, out)
+    assert first["status"] == "processed"
+    output_path, meta_path = output_paths(out, os.path.basename(csv_path), "parquet")
+    assert meta_path.endswith(META_SUFFIX)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    assert meta["output"] == output_path
+    assert (meta["rows_in"], meta["rows_out"]) == (first["rows"], first["rows_out"])
+    assert len(pd.read_parquet(output_path)) == meta["rows_out"]
+
+    assert process_file(csv_path, out)["status"] == "skipped"
+    # Other options, --force or new file contents are processed again
+    assert process_file(csv_path, out, remove_outliers=False)["status"] == "processed"
+    assert process_file(csv_path, out, remove_outliers=False)["status"] == "skipped"
+    assert process_file(csv_path, out, remove_outliers=False, force=True)["status"] == "processed"
+    with open(csv_path, "a") as f:
+        f.write("2025-01-01 00:00,$5.00,1,Food,\n")
+    assert process_file(csv_path, out, remove_outliers=False)["status"] == "processed"
+
+
+def test_failed_write_keeps_the_previous_output(csv_path, tmp_path, monkeypatch):
+    csv_path = str(csv_path)
+    out = str(tmp_path / "out")
+    assert process_file(csv_path, out)["status"] == "processed"
+    output_path, meta_path = output_paths(out, os.path.basename(csv_path), "parquet")
+    with open(output_path, "rb") as f:
+        previous_output = f.read()
+    with open(meta_path) as f:
+        previous_meta = f.read()
+
+    # The next write dies half way through
+    def broken_to_parquet(self, path, *args, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"PAR1")
+        raise OSError("disk full")
+
+    with open(csv_path, "a") as f:
+        f.write("2025-01-01 00:00,$5.00,1,Food,\n")
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", broken_to_parquet)
+    result = process_file(csv_path, out)
+    assert result["status"] == "failed" and "disk full" in result["error"]
+
+    assert sorted(os.listdir(out)) == sorted([os.path.basename(output_path), os.path.basename(meta_path)])
+    with open(output_path, "rb") as f:
+        assert f.read() == previous_output
+    with open(meta_path) as f:
+        assert f.read() == previous_meta
+
+    # Nothing marks the new contents as done, so the next run processes them
+    monkeypatch.undo()
+    assert process_file(csv_path, out)["status"] == "processed"
@@ -0,0 +1,52 @@
+import threading
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.instrument import StageRecorder
+
+
+def test_stage_record():
+    recorder = StageRecorder(trace_memory=True, structured_logs=False)
+    result = recorder.run("alloc", lambda: pd.DataFrame(np.ones((1000, 1000))))
+    record = recorder.records[0]
+    assert result.shape == (1000, 1000)
+    assert (record["stage"], record["rows_out"], record["cols_out"]) == ("alloc", 1000, 1000)
+    assert record["peak_traced_mb"] >= 7.5
+    assert record["rss_high_water_growth_mb"] is None or record["rss_high_water_growth_mb"] >= 0
+    assert not tracemalloc.is_tracing()
+
+
+def test_traces_by_default():
+    recorder = StageRecorder(structured_logs=False)
+    recorder.run("alloc", lambda: np.ones(1_000_000))
+    assert recorder.records[0]["peak_traced_mb"] >= 7.5
+
+
+def test_tracing_stages_on_several_threads():
+    errors = []
+
+    def stage():
+        try:
+            for _ in range(20):
+                StageRecorder(trace_memory=True, structured_logs=False).run("alloc", lambda: np.ones(100_000))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=stage) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert not tracemalloc.is_tracing()
+
+
+def test_leaves_an_outside_trace_running():
+    tracemalloc.start()
+    try:
+        StageRecorder(trace_memory=True, structured_logs=False).run("alloc", lambda: np.ones(1000))
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from src import pipeline as pipeline_module
+from src.dataset_store import DatasetStore
+from src.memory import SpilledFrame, enforce_memory_budget, frame_memory
+from src.pipeline import PreprocessPipeline
+
+
+@pytest.fixture
+def sessions(csv_path, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "dataset_store", DatasetStore())
+    files = [open(csv_path, "rb") for _ in range(2)]
+    pipelines = [PreprocessPipeline(file) for file in files]
+    yield pipelines, [pipeline.result() for pipeline in pipelines]
+    for file in files:
+        file.close()
+
+
+def test_frames_within_budget_stay_in_memory():
+    raw_df = pd.DataFrame({"amount": range(100)})
+    assert enforce_memory_budget(None, raw_df, raw_df, budget=0) is raw_df
+    assert enforce_memory_budget(None, raw_df, raw_df, budget=1 << 20) is raw_df
+
+
+def test_kept_exports_count_against_the_budget():
+    raw_df = pd.DataFrame({"amount": range(100)})
+    size = frame_memory(raw_df)
+    assert enforce_memory_budget(None, raw_df, raw_df, budget=size) is raw_df
+    assert isinstance(enforce_memory_budget(None, raw_df, raw_df, budget=size, extra_bytes=1), SpilledFrame)
+
+
+def test_over_budget_spills_raw_frame():
+    raw_df = pd.DataFrame({"amount": range(100)})
+    spilled = enforce_memory_budget(None, raw_df, raw_df.copy(), budget=1)
+    assert isinstance(spilled, SpilledFrame)
+    pd.testing.assert_frame_equal(spilled.load(), raw_df)
+
+
+def test_shared_frames_are_charged_in_parts(sessions):
+    pipelines, results = sessions
+    raw_df, clean_df = results[1][:2]
+    size = frame_memory(raw_df, clean_df)
+
+    # The second session got the first one's result from the store - each is charged half of it
+    assert enforce_memory_budget(pipelines[1], raw_df, clean_df, budget=size // 2 + 1) is raw_df
+    spilled = enforce_memory_budget(pipelines[1], raw_df, clean_df, budget=size // 3)
+    assert isinstance(spilled, SpilledFrame)
+    pd.testing.assert_frame_equal(spilled.load(), raw_df)
+
+    # The stored copy is spilled, so the other session's raw frame goes to disk too
+    assert isinstance(pipelines[0].result()[0], SpilledFrame)
+    assert pipeline_module.dataset_store.stats()["spills"] == 1
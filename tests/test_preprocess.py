@@ -0,0 +1,139 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import preprocess as preprocess_module
+from src.preprocess import compact_dtypes, iqr_outliers, preprocess, summarize_value_counts
+
+BASELINE_CSV = """Txn Date,Amount,Qty,Category,Notes
+2024-01-01,"$1,200.50",2,Food,
+2024-01-02,$80.00,,Rent,
+2024-01-03,$95.25,3,,
+2024-01-04,"$105.00",4,Food,
+2024-01-05,$99.99,5,Travel,
+2024-01-06,$101.00,3,Food,
+2024-01-07,$98.00,2,Rent,
+2024-01-08,$102.50,4,Food,
+2024-01-06,$101.00,3,Food,
+"""
+
+
+def outlier_frame(n=5000):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"amount": rng.normal(100, 10, n), "qty": rng.normal(5, 1, n), "label": "x"})
+    df.loc[::97, "amount"] = 1000.0
+    return df, {"amount": "numeric", "qty": "numeric", "label": "categorical"}
+
+
+# Output of the original single-pass preprocess() on BASELINE_CSV - with or without copy-on-write, the stages
+# sharing column buffers must neither change it nor write into the raw frame
+@pytest.mark.parametrize("copy_on_write", [False, True])
+def test_preprocess_matches_baseline(tmp_path, copy_on_write):
+    path = tmp_path / "baseline.csv"
+    path.write_text(BASELINE_CSV)
+    with pd.option_context("mode.copy_on_write", copy_on_write), open(path, "rb") as file:
+        raw, clean, column_types, logs = preprocess(file)
+
+    expected = pd.DataFrame({
+        "txn_date": pd.date_range("2024-01-03", periods=6),
+        "amount": [95.25, 105.0, 99.99, 101.0, 98.0, 102.5],
+        "qty": [3.0, 4.0, 5.0, 3.0, 2.0, 4.0],
+        "category": ["Food", "Food", "Travel", "Food", "Rent", "Food"],
+    }, index=range(2, 8))
+    pd.testing.assert_frame_equal(clean.astype({"category": object}), expected)
+    pd.testing.assert_frame_equal(raw, pd.read_csv(path).set_axis(raw.columns, axis=1))
+    assert column_types == {"txn_date": "datetime", "amount": "numeric", "qty": "numeric", "category": "categorical"}
+    assert logs["dropped_columns"] == ["notes"]
+    assert logs["duplicates_removed"] == 1 and logs["outliers_removed"] == 2
+
+
+def test_iqr_outliers_are_exact_by_default(monkeypatch):
+    df, column_types = outlier_frame()
+    monkeypatch.setattr(preprocess_module, "APPROX_QUANTILE_SAMPLE_SIZE", 100)
+    for method in ["sequential", "independent"]:
+        mask, columns = iqr_outliers(df, column_types, method)
+        q1, q3 = df["amount"].quantile([0.25, 0.75])
+        assert columns["amount"]["q1"] == q1 and columns["amount"]["q3"] == q3
+        assert not mask[df["amount"] == 1000.0].any()
+
+
+def test_iqr_outliers_methods():
+    df, column_types = outlier_frame()
+    sequential, sequential_columns = iqr_outliers(df, column_types, "sequential")
+    independent, independent_columns = iqr_outliers(df, column_types, "independent")
+    # Sequential counts only what earlier columns kept, so the per-column counts add up
+    assert sum(col["removed"] for col in sequential_columns.values()) == (~sequential).sum()
+    assert set(independent_columns) == {"amount", "qty"}
+    assert (~independent).sum() <= sum(col["removed"] for col in independent_columns.values())
+
+
+def test_approximate_quartiles_are_opt_in(monkeypatch):
+    df, column_types = outlier_frame()
+    monkeypatch.setattr(preprocess_module, "APPROX_QUANTILE_SAMPLE_SIZE", 1000)
+    exact = iqr_outliers(df, column_types, "independent")[1]
+    approximate = iqr_outliers(df, column_types, "independent", approximate=True)[1]
+    assert approximate["amount"]["q1"] != exact["amount"]["q1"]
+    assert abs(approximate["amount"]["q1"] - exact["amount"]["q1"]) < 2
+
+
+def test_datetime_format_registry_under_threads(monkeypatch):
+    monkeypatch.setattr(preprocess_module, "_datetime_format_registry", {})
+    monkeypatch.setattr(preprocess_module, "DATETIME_REGISTRY_SIZE", 8)
+    errors = []
+
+    def remember(worker):
+        try:
+            for i in range(500):
+                preprocess_module._remember_datetime_format((f"col{i}", worker), "%Y-%m-%d")
+                preprocess_module._forget_datetime_format((f"col{i - 1}", worker))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=remember, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(preprocess_module._datetime_format_registry) <= 8
+
+
+def test_compact_dtypes_round_trip():
+    df = pd.DataFrame({
+        "category": ["Food", "Rent", None, "Food"],
+        "flag": [True, False, True, True],
+        "flag_int": [1, 0, 0, 1],
+        "flag_text": ["yes", "no", "no", None],
+        "qty": [2, 300, 5, -7],
+        "amount": [1.5, 2.25, np.nan, 4.0],
+        "memo": ["a", "b", "c", "d"],
+    })
+    df = pd.concat([df] * 250, ignore_index=True)
+    column_types = {"category": "categorical", "flag": "boolean", "flag_int": "boolean", "flag_text": "boolean",
+                    "qty": "numeric", "amount": "numeric", "memo": "text"}
+    compact = compact_dtypes(df, column_types)
+
+    assert compact.dtypes.astype(str).to_dict() == {
+        "category": "category", "flag": "boolean", "flag_int": "UInt8", "flag_text": "category",
+        "qty": "int16", "amount": "float64", "memo": "object",
+    }
+    assert compact.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+    for col in df.columns:
+        pd.testing.assert_series_equal(compact[col].astype(object), df[col].astype(object))
+    assert df["qty"].dtype == "int64"
+
+
+def test_value_counts_survive_compaction(monkeypatch):
+    df = pd.DataFrame({"category": ["Food", "Rent", None, "Food", "Travel"], "id": list("abcde"),
+                       "amount": [1.0, 2.0, 3.0, 4.0, 5.0]})
+    column_types = {"category": "categorical", "id": "categorical", "amount": "numeric"}
+    monkeypatch.setattr(preprocess_module, "VALUE_COUNTS_MAX", 4)
+
+    summary = summarize_value_counts(compact_dtypes(df, column_types), column_types)
+    # Only categorical / boolean columns with at most VALUE_COUNTS_MAX distinct values are kept
+    assert list(summary) == ["category"]
+    assert dict(zip(summary["category"]["values"], summary["category"]["counts"])) == {"Food": 2, "Rent": 1,
+                                                                                      "Travel": 1}
+    assert summary == summarize_value_counts(df, column_types)
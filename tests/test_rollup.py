@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.rollup import ROLLUP_FREQS, build_daily_rollup, rollup_series
+
+
+@pytest.fixture
+def transactions():
+    rng = np.random.default_rng(3)
+    dates = pd.Series(pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 500, 3000), unit="D"))
+    dates[rng.random(3000) < 0.05] = pd.NaT
+    amounts = pd.Series(rng.normal(250, 900, 3000)).round(2)
+    amounts[rng.random(3000) < 0.1] = np.nan
+    return pd.DataFrame({"Date": dates, "Amount": amounts})
+
+
+@pytest.mark.parametrize("freq", ROLLUP_FREQS)
+@pytest.mark.parametrize("agg", ["sum", "mean", "std"])
+def test_rollup_matches_resample(transactions, freq, agg):
+    daily = build_daily_rollup(transactions, "Date", "Amount")
+    expected = getattr(transactions.set_index("Date")["Amount"].resample(freq), agg)()
+    result = rollup_series(daily, freq, agg)
+    pd.testing.assert_series_equal(result, expected, check_names=False, check_freq=False, rtol=1e-9)
+
+
+def test_rollup_count_matches_resample(transactions):
+    daily = build_daily_rollup(transactions, "Date")
+    expected = transactions.dropna(subset=["Date"]).set_index("Date").resample("W").size()
+    pd.testing.assert_series_equal(rollup_series(daily, "W", "count"), expected, check_names=False,
+                                   check_freq=False)
+
+
+def test_std_of_single_values_is_missing():
+    df = pd.DataFrame({"Date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-02-01"]),
+                       "Amount": [1.0, np.nan, 5.0]})
+    std = rollup_series(build_daily_rollup(df, "Date", "Amount"), "ME", "std")
+    assert std.isna().all()
@@ -0,0 +1,21 @@
+import pandas as pd
+
+from src.figure_cache import FigureCache
+from src.plots import build_figure
+from src.preprocess import summarize_value_counts
+from src.stats_store import DatasetStats
+
+
+def test_seeded_value_counts_stay_out_of_the_figure_cache():
+    df = pd.DataFrame({"Category": ["Rent", "Food", "Food", None], "Date": pd.date_range("2024-01-01", periods=4)})
+    stats = DatasetStats(df, summarize_value_counts(df, {"Category": "categorical"}))
+    derived = FigureCache(max_entries=1)
+
+    build_figure(df, {"type": "categorical", "column": "Category"}, ["#000"], derived=derived, stats=stats)
+    build_figure(df, {"type": "datetime", "column": "Date", "freq": "D", "agg": "count"}, ["#000"],
+                 derived=derived, stats=stats)
+
+    # Only the rollup is in the LRU - the seeded counts are still the ones preprocessing kept
+    assert len(derived) == 1
+    assert stats.value_counts("Category").to_dict() == {"Food": 2, "Rent": 1}
+    assert stats.value_counts("Category") is stats.value_counts("Category")
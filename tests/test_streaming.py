@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import pipeline as pipeline_module
+from src.dataset_store import DatasetStore
+from src.memory import SpilledFrame
+from src.pipeline import PreprocessPipeline
+from src.preprocess import preprocess
+from src.streaming import _first_seen, scan_statistics, stream_preprocess
+
+
+def run(path, **options):
+    with open(path, "rb") as file:
+        return preprocess(file, **options)
+
+
+@pytest.mark.parametrize("remove_outliers", [False, True])
+def test_chunked_matches_in_memory(csv_path, remove_outliers):
+    raw, clean, column_types, logs = run(csv_path, remove_outliers=remove_outliers, outlier_method="independent")
+    chunked_raw, chunked_clean, chunked_types, chunked_logs = run(csv_path, remove_outliers=remove_outliers,
+                                                                  chunksize=300)
+
+    assert isinstance(chunked_raw, SpilledFrame)
+    pd.testing.assert_frame_equal(chunked_raw.load(), raw)
+    assert chunked_types == column_types
+    for key in ["dropped_columns", "duplicates_removed", "outliers_removed"]:
+        assert chunked_logs[key] == logs[key]
+    # Chunks are filled with a value for every column, the in-memory path only logs the columns it filled
+    for col, value in logs["fill_values"].items():
+        assert chunked_logs["fill_values"][col] == pytest.approx(value)
+    pd.testing.assert_frame_equal(chunked_clean, clean, check_exact=False)
+
+
+def test_chunked_dedup_matches_in_memory(tmp_path):
+    rows = [f"2024-01-{day:02d},${day * 10}.00,{day % 3},Food" for day in range(1, 29)]
+    rows += [
+        # Same except for amounts that don't parse - different rows in both modes
+        "2024-02-01,unknown,1,Rent",
+        "2024-02-01,pending,1,Rent",
+        # Exact duplicates, in another chunk than the row they repeat
+        "2024-01-03,$30.00,0,Food",
+        "2024-02-01,pending,1,Rent",
+        # qty holds text ("x"), so it's text in the whole file - "2.0" isn't the "2" of the first chunk, which reads
+        # qty as numbers on its own
+        "2024-01-05,$50.00,2.0,Food",
+        "2024-01-06,$60.00,x,Food",
+    ]
+    path = tmp_path / "dupes.csv"
+    path.write_text("Date,Amount,Qty,Category\n" + "\n".join(rows) + "\n")
+
+    _, clean, _, logs = run(path, remove_outliers=False)
+    with open(path, "rb") as file:
+        _, chunked_logs, chunks = stream_preprocess(file, remove_outliers=False, chunksize=10)
+        chunked_clean = pd.concat([clean_chunk for _, clean_chunk in chunks])
+
+    assert logs["duplicates_removed"] == chunked_logs["duplicates_removed"] == 2
+    assert chunked_clean.index.tolist() == clean.index.tolist()
+
+
+def test_first_seen_across_chunks():
+    seen = np.empty(0, dtype="uint64")
+    keep, seen = _first_seen(np.array([5, 3, 5, 9], dtype="uint64"), seen)
+    assert keep.tolist() == [True, True, False, True]
+    keep, seen = _first_seen(np.array([9, 1, 1, 3, 10], dtype="uint64"), seen)
+    assert keep.tolist() == [False, True, False, False, True]
+    assert seen.tolist() == [1, 3, 5, 9, 10]
+
+
+def test_pipeline_scans_chunked_file_once(csv_path, monkeypatch):
+    scans = []
+    monkeypatch.setattr(pipeline_module, "scan_statistics", lambda *args: scans.append(args) or scan_statistics(*args))
+    monkeypatch.setattr(pipeline_module, "dataset_store", DatasetStore())
+    monkeypatch.setattr(pipeline_module, "load_cached", lambda key: None)
+
+    with open(csv_path, "rb") as file:
+        pipeline = PreprocessPipeline(file, chunksize=300)
+        results = {remove_outliers: pipeline.result(remove_outliers=remove_outliers)
+                   for remove_outliers in [True, False, True]}
+    assert len(scans) == 1
+
+    for remove_outliers, (raw, clean, column_types, logs) in results.items():
+        expected = run(csv_path, remove_outliers=remove_outliers, chunksize=300)
+        pd.testing.assert_frame_equal(raw.load(), expected[0].load())
+        pd.testing.assert_frame_equal(clean, expected[1])
+        assert column_types == expected[2]
+        assert logs["outliers_removed"] == expected[3]["outliers_removed"]
+        assert [record["stage"] for record in logs["stages"]] == [record["stage"] for record in expected[3]["stages"]]
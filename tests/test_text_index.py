@@ -0,0 +1,38 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import text_index
+from src.text_index import build_term_index, top_terms
+
+
+# The word counts the text plot built before the index: one joined string, split and counted at once
+def pooled_counts(series):
+    words = [word.lower() for word in series.dropna().astype(str).str.cat(sep=" ").split()]
+    return Counter(words).most_common()
+
+
+@pytest.fixture
+def memos():
+    rng = np.random.default_rng(11)
+    words = np.array(["Rent", "rent", "GROCERIES", "fuel", "Salary", "refund", "fee", "ATM", "transfer"])
+    texts = [" ".join(rng.choice(words, rng.integers(0, 5))) for _ in range(5000)]
+    series = pd.Series(texts, dtype=object)
+    series[rng.random(5000) < 0.1] = None
+    series[::97] = 42
+    return series
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_chunked_index_matches_pooled_counts(memos, monkeypatch, workers):
+    # Small chunks, and the worker pool even for this small column
+    monkeypatch.setattr(text_index, "PARALLEL_MIN_ROWS", 0)
+    index = build_term_index(memos, chunksize=333, workers=workers)
+    assert list(index.items()) == pooled_counts(memos)
+
+
+def test_top_terms():
+    index = build_term_index(pd.Series(["b a", "A c b", None, "b"]))
+    assert top_terms(index, 2).to_dict("list") == {"Word": ["b", "a"], "Frequency": [3, 2]}
@@ -0,0 +1,13 @@
+from src.workers import get_worker_pool, worker_map
+
+
+def test_results_in_submission_order():
+    assert list(worker_map(pow, range(10), [2] * 10, workers=2)) == [i ** 2 for i in range(10)]
+    assert list(worker_map(abs, [], workers=1)) == []
+
+
+def test_one_pool_for_every_worker_count():
+    pool = get_worker_pool()
+    list(worker_map(abs, [-1, -2], workers=1))
+    list(worker_map(abs, [-1, -2], workers=64))
+    assert get_worker_pool() is pool